@@ -1,43 +1,65 @@
 from gevent import monkey
 monkey.patch_all()
 
-from flask import Flask, request, render_template, url_for, redirect, jsonify, session, g, Response, make_response, Request
+from flask import Flask, request, render_template, url_for, redirect, jsonify, session, g, Response, make_response, Request, after_this_request, send_file, has_request_context
 from werkzeug.middleware.proxy_fix import ProxyFix
 from bleach.css_sanitizer import CSSSanitizer
 from werkzeug.utils import secure_filename
+from werkzeug.formparser import FormDataParser
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_sqlalchemy import SQLAlchemy
 from flask_wtf.csrf import CSRFProtect
 from gevent.queue import Queue, Empty
+from gevent.threadpool import ThreadPool
+from gevent.event import AsyncResult
+from gevent.lock import BoundedSemaphore
 from nfcl.core import ComciganAPI
 from cachetools import TTLCache
 from flask_bcrypt import Bcrypt
 from flask_caching import Cache
 from dotenv import load_dotenv
 from functools import wraps
+from array import array
 from flask import jsonify
-from PIL import Image, ImageOps
-from urllib.parse import urlparse
+from markupsafe import Markup
+from PIL import Image, ImageOps, ImageSequence, features
+from urllib.parse import urlparse, unquote_plus, unquote_to_bytes
 import datetime
 import requests
+import bisect
+import ipaddress
 import hashlib
 import secrets
 import sqlite3
 import shutil
+import gevent
 import bleach
 import socket
 import uuid
+import time
 import json
 import math
 import html
+import io
+import base64
+import binascii
+import codecs
+import tempfile
 import os
 import re
 
 load_dotenv()
 
 # Werkzeug 2.2+에서 max_form_memory_size 기본값이 500KB로 변경됨
-# Base64 이미지 데이터를 처리하려면 이 값을 늘려야 함
+# 글쓰기/수정 폼의 Base64 이미지는 StreamingPostFormParser가 읽는 즉시 비공개 스풀 파일로 내보내므로
+# 메모리에 남는 것은 이미지를 뺀 텍스트 필드뿐 (요청 전체 크기 제한은 MAX_CONTENT_LENGTH)
 class CustomRequest(Request):
-    max_form_memory_size = 50 * 1024 * 1024  # 50MB
+    max_form_memory_size = 2 * 1024 * 1024  # 2MB
+
+    def make_form_data_parser(self):
+        if self.endpoint in POST_MEDIA_FORM_ENDPOINTS:
+            self.form_data_parser_class = StreamingPostFormParser
+        return super().make_form_data_parser()
 
 app = Flask(__name__)
 app.request_class = CustomRequest
@@ -49,6 +71,8 @@ app.config['CACHE_TYPE'] = 'SimpleCache'  # 메모리 기반 캐시
 app.config['CACHE_DEFAULT_TIMEOUT'] = 300  # 5분 캐시
 cache = Cache(app)
 
+# 비밀번호 해시 비용 (변경하면 다음 로그인 시 자동으로 재해시됨)
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
 bcrypt = Bcrypt(app)
 csrf = CSRFProtect(app)
 
@@ -59,21 +83,40 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 31536000
 
+# 비회원 글/댓글 비밀번호는 수정·삭제 확인용이므로 더 낮은 비용의 bcrypt 프로필 사용 (솔트는 동일하게 적용)
+GUEST_PASSWORD_LOG_ROUNDS = int(os.getenv('GUEST_PASSWORD_LOG_ROUNDS', 8))
+# bcrypt 연산은 gevent 허브를 막지 않도록 별도 스레드 풀에서 실행
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+password_hash_pool = ThreadPool(PASSWORD_HASH_WORKERS)
+# 글 본문 검증/정제(bleach, Base64 이미지 검사)도 허브를 오래 막지 않도록 별도 풀에서 실행
+# 동시에 맡길 수 있는 작업 수는 CONTENT_WORKER_MAX_PENDING 으로 제한하고, 넘치면 제출한 greenlet이 대기함
+CONTENT_WORKERS = int(os.getenv('CONTENT_WORKERS', 2))
+CONTENT_WORKER_MAX_PENDING = int(os.getenv('CONTENT_WORKER_MAX_PENDING', 32))
+content_worker_pool = ThreadPool(CONTENT_WORKERS)
+
 DATABASE = 'data.db'
 LOG_DATABASE = 'log.db'
-STATIC_ASSET_VERSION = '20260609-2'
+RATE_LIMIT_DATABASE = 'ratelimit.db'  # 워커 간 공유되는 요청 제한 상태 (별도 파일로 data.db 쓰기 경합 방지)
+STATIC_ASSET_VERSION = '20261019-5'
 
 BASE_EXP_PER_LEVEL = 500
 LEVEL_EXP_GROWTH_RATE = 1.12
 BASE_LEVEL_UP_POINT_REWARD = 100
 LEVEL_REWARD_STEP = 20
 LEVEL_REWARD_STEP_INTERVAL = 5
+LEVEL_TABLE_MAX_LEVEL = 300  # 누적 EXP 표 크기 (int64 범위 안, 실제 도달 불가능한 수준)
+POST_EXP_REWARD = 50
+COMMENT_EXP_REWARD = 10
 MAX_POST_CONTENT_CHARS = 5000
 MAX_COMMENT_CONTENT_CHARS = 1000
 MAX_POST_IMAGES = 5
 MAX_ETACONS_PER_PACK = 100
 PROFILE_IMAGE_MAX_SIZE = (300, 300)
 ETACON_IMAGE_MAX_SIZE = (512, 512)
+# 움직이는 인곽콘(GIF 등)은 모든 프레임을 줄여 애니메이션 WEBP로 저장. 프레임 수/재생 시간을 넘는 뒷부분은 잘라냄
+ETACON_MAX_FRAMES = 80
+ETACON_MAX_DURATION_MS = 8000
+ETACON_DEFAULT_FRAME_MS = 100   # duration이 없거나 0인 프레임 (브라우저 기본값과 같음)
 TRUSTED_IFRAME_HOSTS = {
     'www.youtube.com',
     'youtube.com',
@@ -111,9 +154,39 @@ GUEST_USER_ID = '__guest__'
 
 ETACON_UPLOAD_FOLDER = 'static/images/etacons'
 ALLOWED_ETACON_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ETACON_SPRITE_CELL_SIZE = 160
+ETACON_SPRITE_COLUMNS = 10
+ETACON_SPRITE_MANIFEST_NAME = 'sprite.json'
 
 os.makedirs(ETACON_UPLOAD_FOLDER, exist_ok=True)
 
+# 글 본문 이미지 저장소: 본문의 data:image/...;base64 를 내용 해시 이름의 파일로 옮겨 저장
+POST_MEDIA_FOLDER = 'static/images/posts'
+# 폼을 읽는 시점(로그인/CSRF/요청 제한 검사 전)에 이미지를 쓰는 곳. static 밖이라 공개되지 않으며,
+# 라우트가 글을 저장한 뒤 publish_post_media()가 본문에 쓰인 파일만 POST_MEDIA_FOLDER로 옮김
+POST_MEDIA_SPOOL_FOLDER = 'cache/post_media_spool'
+POST_MEDIA_URL_PREFIX = '/static/images/posts/'
+POST_MEDIA_FORM_ENDPOINTS = {'post_write', 'post_write_guest', 'post_edit', 'post_edit_guest'}
+POST_MEDIA_READ_CHUNK = 64 * 1024
+POST_MEDIA_MAX_IMAGE_BYTES = 5 * 1000 * 1000  # check_content_image_size 개별 제한과 같음
+# 변형을 만드는 픽셀 수 상한 (약 8000x5000). 넘는 이미지는 원본만 제공해 디코딩에 메모리를 크게 쓰지 않음
+POST_MEDIA_MAX_PIXELS = 40 * 1000 * 1000
+POST_MEDIA_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'jpg': 'jpg', 'gif': 'gif', 'webp': 'webp'}
+POST_MEDIA_ORPHAN_TTL = 3600          # 초. 이 시간이 지나도 어떤 글에도 쓰이지 않은 파일은 삭제
+POST_MEDIA_CLEANUP_INTERVAL = 600
+# 반응형 변형: 폭별로 줄인 사본을 만들어 post_detail에서 <picture> srcset으로 제공 (AVIF는 Pillow가 지원할 때만)
+POST_MEDIA_VARIANT_FOLDER = 'static/images/posts/variants'
+POST_MEDIA_VARIANT_URL_PREFIX = '/static/images/posts/variants/'
+POST_MEDIA_VARIANT_WIDTHS = (320, 640, 1280)
+POST_MEDIA_VARIANT_FORMATS = ('avif', 'webp') if features.check('avif') else ('webp',)
+POST_MEDIA_VARIANT_QUALITY = {'avif': 60, 'webp': 80}
+POST_MEDIA_VARIANT_SIZES = '(max-width: 800px) 100vw, 800px'
+POST_MEDIA_VARIANT_INTERVAL = 5
+POST_MEDIA_VARIANT_BATCH = 20
+
+os.makedirs(POST_MEDIA_VARIANT_FOLDER, exist_ok=True)
+os.makedirs(POST_MEDIA_SPOOL_FOLDER, exist_ok=True)
+
 
 @app.context_processor
 def inject_static_asset_version():
@@ -132,8 +205,123 @@ def get_client_identifier():
     return f"ip:{request.remote_addr or 'unknown'}"
 
 
-def rate_limit(limit, window_seconds, methods=('POST',)):
-    cache = TTLCache(maxsize=10000, ttl=window_seconds)
+# 라우트별 요청 제한 정책 (토큰 버킷: window 동안 limit회, 버스트는 최대 limit회)
+RATE_LIMIT_POLICIES = {
+    'riro_reauth': {'limit': 5, 'window': 600},
+    'check_register': {'limit': 20, 'window': 60},
+    'register': {'limit': 5, 'window': 600},
+    'login': {'limit': 10, 'window': 600},
+    'post_write': {'limit': 10, 'window': 600},
+    'post_write_guest': {'limit': 5, 'window': 600},
+    'post_edit': {'limit': 15, 'window': 600},
+    'add_comment': {'limit': 20, 'window': 60},
+    'add_etacon_comment': {'limit': 20, 'window': 60},
+    'edit_comment': {'limit': 20, 'window': 120},
+    'react': {'limit': 60, 'window': 60},
+    'update_profile_image': {'limit': 10, 'window': 600},
+    'post_edit_guest': {'limit': 5, 'window': 600},
+    'comment_edit_guest': {'limit': 10, 'window': 300},
+    'etacon_request': {'limit': 5, 'window': 1800},
+    'buy_etacon': {'limit': 10, 'window': 300},
+    # 바이트 단위: 클라이언트별로 10분에 100MB까지 본문 이미지를 스풀
+    'post_media_bytes': {'limit': 100_000_000, 'window': 600},
+}
+RATE_LIMIT_PURGE_INTERVAL = 600
+
+
+def init_rate_limit_db():
+    with app.app_context():
+        conn = get_rate_limit_db()
+        cursor = conn.cursor()
+        # 여러 워커가 동시에 쓰므로 WAL 모드 사용
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                bucket_key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                full_at REAL NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_full_at ON rate_limit_buckets (full_at)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_rejections (
+                policy TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0,
+                last_rejected_at REAL
+            )
+        ''')
+
+
+def consume_rate_limit_token(bucket_key, limit, window_seconds, now=None, cost=1):
+    """
+    토큰 버킷에서 cost개(기본 1개)를 꺼냅니다. 허용되면 (True, 0), 거부되면 (False, 재시도까지 남은 초)를 반환합니다.
+    버킷 상태는 공유 SQLite에 저장되므로 워커가 여러 개여도 한도가 합산되지 않습니다.
+    """
+    now = time.time() if now is None else now
+    refill_per_second = limit / window_seconds
+    conn = get_rate_limit_db()
+    cursor = conn.cursor()
+    # 읽기-계산-쓰기를 원자적으로 처리 (다른 워커는 잠금이 풀릴 때까지 대기)
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        cursor.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE bucket_key = ?", (bucket_key,))
+        row = cursor.fetchone()
+        if row:
+            tokens = min(float(limit), row[0] + max(now - row[1], 0) * refill_per_second)
+        else:
+            tokens = float(limit)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        full_at = now + (limit - tokens) / refill_per_second
+        cursor.execute(
+            "INSERT OR REPLACE INTO rate_limit_buckets (bucket_key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+            (bucket_key, tokens, now, full_at)
+        )
+        cursor.execute("COMMIT")
+    except sqlite3.Error:
+        cursor.execute("ROLLBACK")
+        raise
+
+    if allowed:
+        return True, 0
+    return False, max(math.ceil((cost - tokens) / refill_per_second), 1)
+
+
+def record_rate_limit_rejection(policy_name, now=None):
+    conn = get_rate_limit_db()
+    conn.execute("""
+        INSERT INTO rate_limit_rejections (policy, count, last_rejected_at) VALUES (?, 1, ?)
+        ON CONFLICT(policy) DO UPDATE SET count = count + 1, last_rejected_at = excluded.last_rejected_at
+    """, (policy_name, time.time() if now is None else now))
+
+
+def purge_idle_rate_limit_buckets():
+    """가득 찬(= 기본 상태와 같은) 버킷은 지워도 결과가 같으므로 정리합니다. 요청 컨텍스트 밖에서 호출됩니다."""
+    conn = sqlite3.connect(RATE_LIMIT_DATABASE, timeout=5)
+    try:
+        conn.execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (time.time(),))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def rate_limit_purge_loop():
+    while True:
+        gevent.sleep(RATE_LIMIT_PURGE_INTERVAL)
+        try:
+            purge_idle_rate_limit_buckets()
+        except sqlite3.Error as e:
+            print(f"Rate limit purge failed: {e}")
+
+
+def rate_limit(policy_name):
+    policy = RATE_LIMIT_POLICIES[policy_name]
+    limit = policy['limit']
+    window_seconds = policy['window']
+    methods = policy.get('methods', ('POST',))
 
     def decorator(f):
         @wraps(f)
@@ -141,12 +329,20 @@ def rate_limit(limit, window_seconds, methods=('POST',)):
             if methods and request.method not in methods:
                 return f(*args, **kwargs)
 
-            key = f"{f.__name__}:{get_client_identifier()}"
-            hit_count = cache.get(key, 0) + 1
-            cache[key] = hit_count
+            key = f"{policy_name}:{get_client_identifier()}"
+            try:
+                allowed, retry_after = consume_rate_limit_token(key, limit, window_seconds)
+            except sqlite3.Error as e:
+                # 제한 저장소 장애로 서비스 전체가 멈추지 않도록 통과시킴
+                print(f"Rate limit storage error ({policy_name}): {e}")
+                return f(*args, **kwargs)
+
+            if not allowed:
+                try:
+                    record_rate_limit_rejection(policy_name)
+                except sqlite3.Error as e:
+                    print(f"Rate limit counter error ({policy_name}): {e}")
 
-            if hit_count > limit:
-                retry_after = max(window_seconds, 1)
                 message = f"요청이 너무 빠릅니다. {retry_after}초 뒤 다시 시도해주세요."
                 if request.is_json or request.path.startswith('/api/') or request.path.startswith('/react/'):
                     response = jsonify({'status': 'error', 'message': message})
@@ -227,6 +423,638 @@ def sanitize_plain_text_content(content, max_length=MAX_COMMENT_CONTENT_CHARS):
     return cleaned
 
 
+content_worker_slots = BoundedSemaphore(CONTENT_WORKER_MAX_PENDING)
+content_worker_stats = {
+    'submitted': 0,
+    'completed': 0,
+    'failed': 0,
+    'pending': 0,        # 슬롯 대기 + 풀 대기 + 실행 중
+    'max_pending': 0,
+    'total_wait_ms': 0.0,  # 제출 ~ 실행 시작
+    'total_run_ms': 0.0,
+}
+
+
+def run_content_task(func, *args):
+    """func(*args)를 content_worker_pool에서 실행하고 결과를 돌려줍니다. 호출한 greenlet만 대기하고 예외는 그대로 전달됩니다."""
+    stats = content_worker_stats
+    stats['submitted'] += 1
+    stats['pending'] += 1
+    stats['max_pending'] = max(stats['max_pending'], stats['pending'])
+    submitted_at = time.perf_counter()
+
+    def timed():
+        return time.perf_counter(), func(*args)
+
+    try:
+        with content_worker_slots:
+            started_at, result = content_worker_pool.apply(timed)
+        finished_at = time.perf_counter()
+        stats['completed'] += 1
+        stats['total_wait_ms'] += (started_at - submitted_at) * 1000
+        stats['total_run_ms'] += (finished_at - started_at) * 1000
+        return result
+    except Exception:
+        stats['failed'] += 1
+        raise
+    finally:
+        stats['pending'] -= 1
+
+
+def analyze_post_content(content, check_images=True, image_sizes=()):
+    """
+    글 본문 검증/정제 (run_content_task로 워커 스레드에서 실행). 라우트는 결과를 보고 기존 순서대로 오류 메시지를 고릅니다.
+    image_error: check_content_image_size 실패 시 idx (-1 = 총 용량 초과), plain_length: 태그를 뺀 글자 수,
+    sanitized/image_count: 글자 수가 1~MAX_POST_CONTENT_CHARS 일 때만 채움. image_sizes는 폼 파싱 중 파일로 옮겨진 이미지 크기
+    """
+    result = {'image_error': None, 'plain_length': 0, 'sanitized': None, 'image_count': 0}
+    if check_images:
+        is_valid_size, img_idx = check_content_image_size(content, image_sizes=image_sizes)
+        if not is_valid_size:
+            result['image_error'] = img_idx
+            return result
+
+    result['plain_length'] = len(bleach.clean(content, tags=[], strip=True))
+    if 0 < result['plain_length'] <= MAX_POST_CONTENT_CHARS:
+        result['sanitized'] = sanitize_rich_content(content)
+        result['image_count'] = result['sanitized'].count('<img')
+    return result
+
+
+# Post Media Store
+DATA_URI_IMAGE_MARKER = 'data:image/'
+DATA_URI_HEADER_MAX_CHARS = 32
+BASE64_RUN_RE = re.compile(r'[A-Za-z0-9+/=]*')
+FORM_SEPARATOR_RE = re.compile(rb'[&=]')
+
+
+def partial_suffix_length(text, marker):
+    """text 끝부분이 marker의 앞부분과 겹치는 최대 길이 (조각 경계에 걸친 마커를 놓치지 않도록)"""
+    for length in range(min(len(text), len(marker) - 1), 0, -1):
+        if marker.startswith(text[-length:]):
+            return length
+    return 0
+
+
+class DataUriImageExtractor:
+    """
+    글 본문을 조각(feed)으로 받아 data:image/<type>;base64, 이미지를 만나면 디코딩하면서 바로 파일에 쓰고
+    본문에는 POST_MEDIA_URL_PREFIX + '<sha256>.<ext>' 주소만 남깁니다. 메모리에는 이미지를 뺀 텍스트만 쌓입니다.
+    images: 본문 순서대로 [{'name', 'size', 'width', 'height', 'error'}]
+    (저장하지 못한 이미지는 name=None, src는 빈 값이고 error에 이유: too_large | invalid | quota | unsaved)
+    verify(path)는 이미지면 (폭, 높이), 아니면 None을 돌려주는 함수
+    charge(size)는 저장할 이미지 바이트를 요청 한도에 반영하고 허용 여부를 돌려주는 함수
+    folder가 None이면 파일을 쓰지 않고 모든 이미지를 버립니다.
+    """
+
+    def __init__(self, folder, max_image_bytes=POST_MEDIA_MAX_IMAGE_BYTES, verify=None, charge=None):
+        self.folder = folder
+        self.max_image_bytes = max_image_bytes
+        self.verify = verify
+        self.charge = charge
+        self.parts = []
+        self.text_size = 0
+        self.pending = ''     # 아직 판단할 수 없는 꼬리 (마커 일부 또는 헤더)
+        self.state = 'text'   # text | header | body
+        self.images = []
+        self._file = None
+
+    def feed(self, text):
+        data = self.pending + text
+        self.pending = ''
+        while data:
+            if self.state == 'text':
+                index = data.find(DATA_URI_IMAGE_MARKER)
+                if index == -1:
+                    keep = partial_suffix_length(data, DATA_URI_IMAGE_MARKER)
+                    self._emit(data[:len(data) - keep])
+                    self.pending = data[len(data) - keep:]
+                    return
+                self._emit(data[:index])
+                data = data[index + len(DATA_URI_IMAGE_MARKER):]
+                self.state = 'header'
+            elif self.state == 'header':
+                index = data.find(',', 0, DATA_URI_HEADER_MAX_CHARS + 1)
+                if index == -1 and len(data) <= DATA_URI_HEADER_MAX_CHARS:
+                    self.pending = data
+                    return
+                subtype, _, encoding = data[:index].partition(';') if index != -1 else ('', '', '')
+                ext = POST_MEDIA_EXTENSIONS.get(subtype.lower())
+                if not ext or encoding.lower() != 'base64':
+                    # 이미지 data URI가 아니면 원문 그대로 둠
+                    self._emit(DATA_URI_IMAGE_MARKER)
+                    self.state = 'text'
+                    continue
+                self._start_image(ext)
+                data = data[index + 1:]
+                self.state = 'body'
+            else:
+                run = BASE64_RUN_RE.match(data).end()
+                self._write_base64(data[:run])
+                if run == len(data):
+                    return
+                self._finish_image()
+                data = data[run:]
+                self.state = 'text'
+
+    def close(self):
+        """남은 조각을 정리하고 최종 본문 텍스트를 돌려줍니다."""
+        if self.state == 'body':
+            self._finish_image()
+        elif self.state == 'header':
+            self._emit(DATA_URI_IMAGE_MARKER)
+        self._emit(self.pending)
+        self.pending = ''
+        self.state = 'text'
+        return ''.join(self.parts)
+
+    def discard(self):
+        """파싱이 중간에 실패했을 때 쓰던 임시 파일을 지웁니다."""
+        if self._file:
+            self._file.close()
+            os.remove(self._file.name)
+            self._file = None
+
+    def _emit(self, text):
+        if text:
+            self.parts.append(text)
+            self.text_size += len(text)
+
+    def _start_image(self, ext):
+        self._file = tempfile.NamedTemporaryFile('wb', dir=self.folder, suffix='.part', delete=False) if self.folder else None
+        self._ext = ext
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._b64_tail = ''
+        self._corrupt = False
+
+    def _write_bytes(self, raw):
+        self._size += len(raw)
+        if self._file and self._size <= self.max_image_bytes:
+            self._file.write(raw)
+            self._hash.update(raw)
+
+    def _write_base64(self, chunk):
+        data = self._b64_tail + chunk
+        usable = len(data) - len(data) % 4
+        self._b64_tail = data[usable:]
+        if usable and not self._corrupt:
+            try:
+                self._write_bytes(base64.b64decode(data[:usable]))
+            except binascii.Error:
+                self._corrupt = True
+
+    def _finish_image(self):
+        if self._b64_tail and not self._corrupt:
+            try:
+                self._write_bytes(base64.b64decode(self._b64_tail + '=' * (-len(self._b64_tail) % 4)))
+            except binascii.Error:
+                self._corrupt = True
+        if self._corrupt or not self._size:
+            error = 'invalid'
+        elif self._size > self.max_image_bytes:
+            error = 'too_large'
+        else:
+            error = None if self._file else 'unsaved'
+        name, dimensions = None, None
+        if self._file:
+            self._file.close()
+            temp_path, self._file = self._file.name, None
+            if not error and self.verify:
+                dimensions = self.verify(temp_path)
+                error = None if dimensions else 'invalid'
+            if not error and self.charge and not self.charge(self._size):
+                error = 'quota'
+            if not error:
+                name = f"{self._hash.hexdigest()[:32]}.{self._ext}"
+                os.replace(temp_path, os.path.join(self.folder, name))
+            else:
+                os.remove(temp_path)
+
+        width, height = dimensions or (None, None)
+        self.images.append({'name': name, 'size': self._size, 'width': width, 'height': height, 'error': error})
+        self._emit(POST_MEDIA_URL_PREFIX + name if name else '')
+
+
+class StreamingUrlencodedReader:
+    """
+    x-www-form-urlencoded 본문을 조각 단위로 해석합니다. sinks에 있는 필드 값은 퍼센트 디코딩한 텍스트를
+    조각마다 sink.feed()로 넘기고, 나머지 필드는 모았다가 한 번에 디코딩합니다.
+    sink가 남긴 텍스트와 나머지 필드의 합이 max_text_bytes를 넘으면 RequestEntityTooLarge
+    """
+
+    def __init__(self, sinks, max_text_bytes=None):
+        self.sinks = sinks
+        self.max_text_bytes = max_text_bytes
+        self.items = []
+        self.buffered_size = 0
+        self._reset()
+
+    def _reset(self):
+        self.key = bytearray()
+        self.value = bytearray()
+        self.in_value = False
+        self.sink = None
+        self.decoder = None
+        self.escape_tail = b''
+
+    def feed(self, chunk):
+        pos = 0
+        for match in FORM_SEPARATOR_RE.finditer(chunk):
+            self._append(chunk[pos:match.start()])
+            if match.group() == b'&':
+                self._finish_pair()
+            elif self.in_value:
+                self._append(b'=')
+            else:
+                self._start_value()
+            pos = match.end()
+        self._append(chunk[pos:])
+
+    def close(self):
+        self._finish_pair()
+        return self.items
+
+    def _start_value(self):
+        self.in_value = True
+        self.sink = self.sinks.get(unquote_plus(self.key.decode('ascii', 'replace')))
+        if self.sink:
+            self.decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+    def _append(self, raw):
+        if not raw:
+            return
+        if self.sink:
+            self._feed_sink(raw)
+        else:
+            (self.value if self.in_value else self.key).extend(raw)
+            self.buffered_size += len(raw)
+        self._check_size()
+
+    def _feed_sink(self, raw, final=False):
+        data = self.escape_tail + raw
+        # 조각 끝에 걸친 %XX 는 다음 조각과 합쳐서 디코딩
+        cut = data.rfind(b'%', max(0, len(data) - 2))
+        if cut != -1 and not final:
+            data, self.escape_tail = data[:cut], data[cut:]
+        else:
+            self.escape_tail = b''
+        text = self.decoder.decode(unquote_to_bytes(data.replace(b'+', b' ')), final)
+        self.sink.feed(text)
+
+    def _check_size(self):
+        total = self.buffered_size + sum(sink.text_size for sink in self.sinks.values())
+        if self.max_text_bytes is not None and total > self.max_text_bytes:
+            raise RequestEntityTooLarge()
+
+    def _finish_pair(self):
+        if self.key or self.in_value:
+            key = unquote_plus(self.key.decode('ascii', 'replace'))
+            if self.sink:
+                self._feed_sink(b'', final=True)
+                self.items.append((key, self.sink.close()))
+            else:
+                self.items.append((key, unquote_plus(self.value.decode('ascii', 'replace'))))
+        self._reset()
+
+
+def read_streaming_urlencoded(stream, sinks, max_text_bytes=None, chunk_size=POST_MEDIA_READ_CHUNK):
+    reader = StreamingUrlencodedReader(sinks, max_text_bytes)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        reader.feed(chunk)
+    return reader.close()
+
+
+def verify_post_media_image(path):
+    """
+    이미지 파일이면 화면에 보이는 (폭, 높이)를 (EXIF 회전 반영), 아니면 None.
+    POST_MEDIA_MAX_PIXELS를 넘는 이미지(파노라마 등)도 받으며, 변형 없이 원본만 제공합니다.
+    """
+    try:
+        with Image.open(path) as image:
+            width, height = image.size
+            rotated = image.getexif().get(0x0112) in (5, 6, 7, 8)
+            image.verify()
+        return (height, width) if rotated else (width, height)
+    except Exception:
+        return None
+
+
+def get_post_media_spool_owner():
+    """
+    폼은 CSRFProtect가 load_logged_in_user/check_auto_login보다 먼저 읽으므로 g.user가 아직 없습니다.
+    세션(없으면 remember-me 토큰)으로 글쓴이를 직접 확인해, 이미지를 써도 되면 요청 한도 버킷 키를, 아니면 None을 돌려줍니다.
+    로그인 사용자는 사용자별, 비회원은 IP별 버킷 (비회원 글쓰기는 세션 조건 없이 post_media_bytes 한도로만 제한)
+    """
+    user_id = session.get('user_id')
+    if not user_id and request.endpoint in ('post_write', 'post_edit') and 'remember_token' in request.cookies:
+        token_row = find_auth_token(get_db().cursor(), request.cookies.get('remember_token'))
+        user_id = token_row[1] if token_row else None
+    if request.endpoint in ('post_write', 'post_edit') and not user_id:
+        return None
+    if request.endpoint == 'post_edit_guest' and not session.get(f"guest_auth_post_{(request.view_args or {}).get('post_id')}"):
+        return None
+    return f"user:{user_id}" if user_id else get_client_identifier()
+
+
+def charge_post_media_bytes(owner, size):
+    """스풀한 이미지 바이트를 owner의 post_media_bytes 버킷에서 차감합니다. 한도를 넘으면 False"""
+    policy = RATE_LIMIT_POLICIES['post_media_bytes']
+    try:
+        allowed, _ = consume_rate_limit_token(
+            f"post_media_bytes:{owner}", policy['limit'], policy['window'], cost=size
+        )
+        if not allowed:
+            record_rate_limit_rejection('post_media_bytes')
+    except sqlite3.Error as e:
+        print(f"Rate limit storage error (post_media_bytes): {e}")
+        return True
+    return allowed
+
+
+class StreamingPostFormParser(FormDataParser):
+    """글쓰기/수정 폼 전용: content 필드의 Base64 이미지를 읽는 즉시 요청별 비공개 스풀 폴더에 저장합니다."""
+
+    def _parse_urlencoded(self, stream, mimetype, content_length, options):
+        owner = get_post_media_spool_owner()
+        spool = tempfile.mkdtemp(dir=POST_MEDIA_SPOOL_FOLDER) if owner else None
+        # 요청이 끝나면 discard_post_media_spool()이 옮겨지지 않은 파일과 함께 지움
+        g.post_media_spool = spool
+        extractor = DataUriImageExtractor(
+            spool, verify=verify_post_media_image, charge=lambda size: charge_post_media_bytes(owner, size)
+        )
+        try:
+            items = read_streaming_urlencoded(stream, {'content': extractor}, self.max_form_memory_size)
+        except Exception:
+            extractor.discard()
+            raise
+        g.post_media_images = [image for image in extractor.images if image['name']]
+        # 저장하지 못한 이미지 (번호, 이유). 라우트가 get_post_media_error()로 확인해 글 저장을 막음
+        g.post_media_dropped = [(index, image['error']) for index, image in enumerate(extractor.images, 1) if image['error']]
+        # 라우트의 이미지 용량 검사(check_content_image_size)에 넘길 원본 크기
+        g.post_media_sizes = [image['size'] for image in extractor.images]
+        return stream, self.cls(items), self.cls()
+
+
+POST_MEDIA_ERROR_MESSAGES = {
+    'too_large': '{index}번째 이미지의 용량이 5MB를 초과합니다.',
+    'invalid': '{index}번째 이미지를 읽을 수 없습니다. 다른 이미지로 다시 첨부해주세요.',
+    'quota': '짧은 시간에 너무 많은 이미지를 올렸습니다. 잠시 후 다시 시도해주세요.',
+    'unsaved': '로그인 정보를 확인할 수 없어 이미지를 저장하지 못했습니다. 다시 로그인한 뒤 시도해주세요.',
+}
+
+
+def get_post_media_error():
+    """폼을 읽을 때 저장하지 못한 본문 이미지가 있으면 알림 문구를, 없으면 None (빈 <img>로 글이 저장되지 않도록)"""
+    dropped = g.get('post_media_dropped')
+    if not dropped:
+        return None
+    index, error = dropped[0]
+    return POST_MEDIA_ERROR_MESSAGES[error].format(index=index)
+
+
+def publish_post_media(content):
+    """
+    라우트가 글을 저장(커밋)한 뒤 호출합니다. 스풀한 이미지 중 저장된 본문에 쓰인 것만
+    공개 저장소(POST_MEDIA_FOLDER)로 옮기고 post_media에 등록합니다.
+    """
+    spool = g.get('post_media_spool')
+    if not spool:
+        return
+    images = {
+        image['name']: image for image in g.get('post_media_images', ())
+        if POST_MEDIA_URL_PREFIX + image['name'] in (content or '')
+    }
+    published = []
+    for name, image in images.items():
+        try:
+            os.replace(os.path.join(spool, name), os.path.join(POST_MEDIA_FOLDER, name))
+        except FileNotFoundError:
+            continue
+        published.append(image)
+    register_post_media(published)
+
+
+@app.teardown_request
+def discard_post_media_spool(exception):
+    spool = g.pop('post_media_spool', None)
+    if spool:
+        shutil.rmtree(spool, ignore_errors=True)
+
+
+def purge_post_media_spool(now=None):
+    """프로세스 종료 등으로 남은 요청별 스풀 폴더를 정리합니다."""
+    cutoff = (now or time.time()) - POST_MEDIA_ORPHAN_TTL
+    for entry in os.scandir(POST_MEDIA_SPOOL_FOLDER):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def init_post_media():
+    with app.app_context():
+        conn = get_db()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS post_media (
+                name TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created_at INTEGER NOT NULL,
+                referenced INTEGER NOT NULL DEFAULT 0,
+                width INTEGER,
+                height INTEGER,
+                variants TEXT
+            )
+        """)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(post_media)")}
+        for column in ('width', 'height', 'variants'):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE post_media ADD COLUMN {column} {'TEXT' if column == 'variants' else 'INTEGER'}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_post_media_pending_variants ON post_media (name) WHERE variants IS NULL")
+        conn.commit()
+
+
+def register_post_media(images):
+    """공개 저장소로 옮긴 파일을 미확인 상태로 기록 (이미 있는 파일은 그대로). 변형은 post_media_variant_loop가 만듦"""
+    rows = [
+        (image['name'], image['size'], int(time.time()), image.get('width'), image.get('height'))
+        for image in images if image['name']
+    ]
+    if rows:
+        conn = get_db()
+        conn.executemany(
+            "INSERT OR IGNORE INTO post_media (name, size, created_at, width, height) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        conn.commit()
+
+
+def get_post_media_variant_widths(width):
+    """원본 폭 기준 변형 폭 목록. 원본보다 넓은 폭은 원본 폭으로 대체 (320/640/1280, 900px 원본이면 320/640/900)"""
+    return sorted({min(target, width) for target in POST_MEDIA_VARIANT_WIDTHS})
+
+
+def build_post_media_variants(name):
+    """
+    원본을 폭별로 줄여 포맷마다 저장하고 {포맷: [폭, ...]} 을 돌려줍니다. (run_content_task로 워커 스레드에서 실행)
+    애니메이션 이미지와 POST_MEDIA_MAX_PIXELS를 넘는 이미지는 변형을 만들지 않습니다.
+    """
+    stem = name.rsplit('.', 1)[0]
+    variants = {fmt: [] for fmt in POST_MEDIA_VARIANT_FORMATS}
+    with Image.open(os.path.join(POST_MEDIA_FOLDER, name)) as source:
+        if getattr(source, 'is_animated', False) or source.width * source.height > POST_MEDIA_MAX_PIXELS:
+            return variants
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        for width in get_post_media_variant_widths(image.width):
+            height = max(1, round(image.height * width / image.width))
+            resized = image if width == image.width else image.resize((width, height), RESAMPLING_LANCZOS)
+            for fmt in POST_MEDIA_VARIANT_FORMATS:
+                resized.save(
+                    os.path.join(POST_MEDIA_VARIANT_FOLDER, f"{stem}-{width}.{fmt}"),
+                    format=fmt.upper(), quality=POST_MEDIA_VARIANT_QUALITY[fmt]
+                )
+                variants[fmt].append(width)
+    return variants
+
+
+def remove_post_media_variants(name, variants):
+    """{포맷: [폭, ...]} 에 해당하는 변형 파일을 지웁니다."""
+    stem = name.rsplit('.', 1)[0]
+    for fmt, widths in variants.items():
+        for width in widths:
+            try:
+                os.remove(os.path.join(POST_MEDIA_VARIANT_FOLDER, f"{stem}-{width}.{fmt}"))
+            except FileNotFoundError:
+                pass
+
+
+def build_pending_post_media_variants(conn, limit=POST_MEDIA_VARIANT_BATCH):
+    """
+    변형이 없는 파일을 최대 limit개 처리하고 처리한 개수를 반환합니다. 실패한 파일은 빈 변형으로 기록해 다시 시도하지 않음
+    만드는 사이에 cleanup_post_media가 행을 지웠으면 방금 만든 변형 파일도 지웁니다.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM post_media WHERE variants IS NULL LIMIT ?", (limit,))
+    names = [row[0] for row in cursor.fetchall()]
+    for name in names:
+        try:
+            variants = run_content_task(build_post_media_variants, name)
+        except Exception as e:
+            # Pillow는 OSError 외에도 DecompressionBombError 등을 던지므로 파일 하나 때문에 루프가 멈추지 않게 함
+            print(f"Post media variants failed ({name}): {e}")
+            variants = {}
+        cursor.execute("UPDATE post_media SET variants = ? WHERE name = ?", (json.dumps(variants), name))
+        updated = cursor.rowcount
+        conn.commit()
+        if not updated:
+            remove_post_media_variants(name, variants)
+    return len(names)
+
+
+def post_media_variant_loop():
+    while True:
+        gevent.sleep(POST_MEDIA_VARIANT_INTERVAL)
+        conn = sqlite3.connect(DATABASE)
+        try:
+            while build_pending_post_media_variants(conn):
+                pass
+        except sqlite3.Error as e:
+            print(f"Post media variant build failed: {e}")
+        finally:
+            conn.close()
+
+
+POST_MEDIA_NAME_RE = re.compile(re.escape(POST_MEDIA_URL_PREFIX) + r'([0-9a-f]{32}\.[a-z]+)')
+POST_MEDIA_IMG_SRC_RE = re.compile(r'\bsrc="' + re.escape(POST_MEDIA_URL_PREFIX) + r'([0-9a-f]{32}\.[a-z]+)"')
+
+
+def render_post_media(cursor, content):
+    """
+    본문의 저장소 이미지에 width/height(레이아웃 이동 방지)를 채우고, 변형이 있으면
+    <picture><source type=... srcset=... sizes=...><img></picture> 로 감쌉니다. (저장된 본문은 그대로, 표시할 때만)
+    """
+    names = set(POST_MEDIA_IMG_SRC_RE.findall(content or ''))
+    if not names:
+        return content
+
+    placeholders = ', '.join('?' for _ in names)
+    cursor.execute(f"SELECT name, width, height, variants FROM post_media WHERE name IN ({placeholders})", tuple(names))
+    media = {row[0]: row for row in cursor.fetchall()}
+
+    def replace_img(match):
+        tag = match.group(0)
+        src_match = POST_MEDIA_IMG_SRC_RE.search(tag)
+        row = media.get(src_match.group(1)) if src_match else None
+        if not row:
+            return tag
+        name, width, height, variants = row
+        if width and height and not re.search(r'\s(width|height)\s*=', tag, flags=re.IGNORECASE):
+            tag = set_html_tag_attr(tag, 'width', width)
+            tag = set_html_tag_attr(tag, 'height', height)
+
+        stem = name.rsplit('.', 1)[0]
+        sources = []
+        for fmt, widths in json.loads(variants or '{}').items():
+            if widths:
+                srcset = ', '.join(f"{POST_MEDIA_VARIANT_URL_PREFIX}{stem}-{w}.{fmt} {w}w" for w in widths)
+                sources.append(f'<source type="image/{fmt}" srcset="{srcset}" sizes="{POST_MEDIA_VARIANT_SIZES}">')
+        if not sources:
+            return tag
+        return f"<picture>{''.join(sources)}{tag}</picture>"
+
+    return re.sub(r'<img\b[^>]*>', replace_img, content, flags=re.IGNORECASE)
+
+
+def release_post_media(cursor, old_content, new_content=''):
+    """
+    글 삭제/수정으로 본문에서 빠진 이미지를 커밋 없이 미확인 상태로 되돌립니다.
+    다른 글이 같은 파일을 쓰고 있으면 cleanup_post_media가 다시 확인 처리하고, 아니면 TTL 뒤에 지웁니다.
+    """
+    names = set(POST_MEDIA_NAME_RE.findall(old_content or '')) - set(POST_MEDIA_NAME_RE.findall(new_content or ''))
+    cursor.executemany(
+        "UPDATE post_media SET referenced = 0, created_at = ? WHERE name = ?",
+        [(int(time.time()), name) for name in names]
+    )
+
+
+def cleanup_post_media(conn, now=None):
+    """
+    POST_MEDIA_ORPHAN_TTL이 지난 미확인 파일 중 글 본문에서 쓰이는 것은 확인 처리하고,
+    어디에도 쓰이지 않는 것(검증 실패로 저장되지 않은 글, 삭제·수정으로 빠진 이미지 등)은 파일과 함께 지웁니다. 지운 개수를 반환
+    """
+    cutoff = (now or time.time()) - POST_MEDIA_ORPHAN_TTL
+    cursor = conn.cursor()
+    cursor.execute("SELECT name, variants FROM post_media WHERE referenced = 0 AND created_at < ?", (cutoff,))
+    removed = 0
+    for name, variants in cursor.fetchall():
+        cursor.execute("SELECT 1 FROM posts WHERE instr(content, ?) > 0 LIMIT 1", (POST_MEDIA_URL_PREFIX + name,))
+        if cursor.fetchone():
+            cursor.execute("UPDATE post_media SET referenced = 1 WHERE name = ?", (name,))
+            continue
+        try:
+            os.remove(os.path.join(POST_MEDIA_FOLDER, name))
+        except FileNotFoundError:
+            pass
+        remove_post_media_variants(name, json.loads(variants or '{}'))
+        cursor.execute("DELETE FROM post_media WHERE name = ?", (name,))
+        removed += 1
+    conn.commit()
+    return removed
+
+
+def post_media_cleanup_loop():
+    while True:
+        gevent.sleep(POST_MEDIA_CLEANUP_INTERVAL)
+        conn = sqlite3.connect(DATABASE)
+        try:
+            cleanup_post_media(conn)
+            purge_post_media_spool()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Post media cleanup failed: {e}")
+        finally:
+            conn.close()
+
+
 def ensure_riro_reauth_tracking(conn=None):
     """Add Riro re-auth tracking columns without requiring a manual DB migration."""
     conn = conn or get_db()
@@ -246,6 +1074,144 @@ def ensure_riro_reauth_tracking(conn=None):
         conn.commit()
 
 
+def ensure_etacon_size_columns(conn=None):
+    """etacons.original_bytes(업로드 원본 크기) 컬럼을 추가합니다. 승인 시 절감 용량 보고에 사용"""
+    conn = conn or get_db()
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(etacons)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if columns and 'original_bytes' not in columns:
+        cursor.execute("ALTER TABLE etacons ADD COLUMN original_bytes INTEGER")
+        conn.commit()
+
+
+def ensure_post_timestamp_columns(conn=None):
+    """
+    posts.created_at(TEXT)에서 계산되는 정수 epoch 컬럼(created_ts)과 인덱스를 추가합니다.
+    VIRTUAL 생성 컬럼이라 기존 INSERT/UPDATE 경로는 손댈 필요가 없고, 기간 필터는 정수 인덱스 범위 검색이 됩니다.
+    값은 저장된 로컬 시각 문자열을 그대로 UTC로 본 초 단위이므로 비교 값은 to_db_epoch()로 만듭니다.
+    """
+    conn = conn or get_db()
+    cursor = conn.cursor()
+    # 생성 컬럼은 table_info에 나오지 않으므로 table_xinfo로 확인
+    cursor.execute("PRAGMA table_xinfo(posts)")
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'created_ts' not in columns:
+        cursor.execute(
+            "ALTER TABLE posts ADD COLUMN created_ts INTEGER "
+            "GENERATED ALWAYS AS (CAST(strftime('%s', created_at) AS INTEGER)) VIRTUAL"
+        )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_ts ON posts (created_ts)")
+    conn.commit()
+
+
+# g.user 로 쓰는 좁은 컬럼 목록 (pw, autologin_token 같은 비밀 값은 싣지 않음)
+USER_IDENTITY_COLUMNS = (
+    'login_id', 'nickname', 'role', 'status', 'banned_until', 'gen', 'point',
+    'level', 'exp', 'profile_image', 'riro_reauth_required',
+    'hakbun', 'name', 'post_count', 'comment_count'
+)
+# 프로세스별 로그인 사용자 캐시. 캐시 적중 시 DB를 조회하지 않습니다.
+user_identity_cache = TTLCache(maxsize=4096, ttl=60)
+# 다른 프로세스의 변경은 이 파일에 한 줄씩 남긴 login_id로 전달합니다. (보드 레지스트리 스탬프 파일과 같은 방식)
+# 각 프로세스는 요청마다 stat 1회로 새로 붙은 줄만 읽어 해당 사용자를 캐시에서 지웁니다.
+USER_IDENTITY_LOG_FILE = os.getenv('USER_IDENTITY_LOG_FILE', 'user_identity.log')
+USER_IDENTITY_LOG_MAX_BYTES = 1024 * 1024  # 넘으면 빈 파일로 교체 (읽는 쪽은 캐시 전체를 비움)
+
+user_identity_log = {'inode': None, 'offset': 0}
+
+
+def sync_user_identity_cache():
+    """USER_IDENTITY_LOG_FILE에 새로 기록된 사용자를 이 프로세스의 캐시에서 지웁니다."""
+    try:
+        stat = os.stat(USER_IDENTITY_LOG_FILE)
+    except FileNotFoundError:
+        return
+    offset = user_identity_log['offset']
+    if stat.st_ino != user_identity_log['inode'] or stat.st_size < offset:
+        # 처음 보거나 교체된 로그: 놓친 줄이 있을 수 있으므로 전부 비우고 끝에서부터 따라감
+        user_identity_cache.clear()
+        user_identity_log.update(inode=stat.st_ino, offset=stat.st_size)
+        return
+    if stat.st_size == offset:
+        return
+    with open(USER_IDENTITY_LOG_FILE, 'rb') as f:
+        f.seek(offset)
+        data = f.read(stat.st_size - offset)
+    # 쓰는 중인 마지막 줄은 다음 확인에서 읽음
+    data = data[:data.rfind(b'\n') + 1]
+    user_identity_log['offset'] = offset + len(data)
+    for user_id in data.decode('utf-8').splitlines():
+        user_identity_cache.pop(user_id, None)
+
+
+def log_user_identity_changes(user_ids):
+    if not user_ids:
+        return
+    with open(USER_IDENTITY_LOG_FILE, 'a', encoding='utf-8') as f:
+        f.write(''.join(f"{user_id}\n" for user_id in user_ids))
+    if os.path.getsize(USER_IDENTITY_LOG_FILE) > USER_IDENTITY_LOG_MAX_BYTES:
+        temp_path = f"{USER_IDENTITY_LOG_FILE}.{uuid.uuid4().hex[:8]}.part"
+        open(temp_path, 'w').close()
+        os.replace(temp_path, USER_IDENTITY_LOG_FILE)
+
+
+def fetch_user_identity(user_id):
+    """로그인 사용자 정보를 캐시에서 꺼내고, 없으면 좁은 projection으로 1회 조회합니다."""
+    sync_user_identity_cache()
+    identity = user_identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    # 스키마 보정은 캐시 미스(프로세스당 사용자별 최초 1회)에서만 수행
+    ensure_riro_reauth_tracking(conn)
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(USER_IDENTITY_COLUMNS)} FROM users WHERE login_id = ?", (user_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+
+    identity = dict(row)
+    user_identity_cache[user_id] = identity
+    return identity
+
+
+def fetch_password_hash(user_id):
+    """g.user에는 비밀번호 해시가 없으므로, 비밀번호 확인이 필요한 곳에서만 따로 조회합니다."""
+    cursor = get_db().cursor()
+    cursor.execute("SELECT pw FROM users WHERE login_id = ?", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def fetch_user_profile(user_id):
+    """마이페이지처럼 g.user에 없는 프로필 컬럼(생일, 가입일, 동아리 등)까지 필요한 곳에서 쓰는 전체 행 조회"""
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE login_id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+def touch_user_identity(*user_ids):
+    """
+    사용자 행이 바뀌었음을 모든 프로세스에 알리고 캐시된 g.user를 무효화합니다.
+    커밋 전에 다른 요청이 옛 행을 다시 캐시할 수 있으므로, 요청 중이면 커밋 뒤(요청 종료 시)에 한 번 더 기록합니다.
+    """
+    for user_id in user_ids:
+        user_identity_cache.pop(user_id, None)
+    log_user_identity_changes(user_ids)
+    if has_request_context():
+        g.setdefault('touched_user_ids', set()).update(user_ids)
+
+
+@app.teardown_request
+def publish_user_identity_changes(exception):
+    log_user_identity_changes(sorted(g.pop('touched_user_ids', ())))
+
+
 def normalize_riro_identity_value(value):
     return str(value or '').strip()
 
@@ -296,6 +1262,7 @@ def apply_riro_reauth_result(user_id, api_result):
         """,
         (new_hakbun, new_gen, reauth_at, user_id)
     )
+    touch_user_identity(user_id)
     conn.commit()
 
     if collision_detected:
@@ -353,12 +1320,7 @@ def load_session_user_for_reauth_gate():
     if not user_id:
         return None
 
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
-    ensure_riro_reauth_tracking(conn)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE login_id = ?", (user_id,))
-    g.user = cursor.fetchone()
+    g.user = fetch_user_identity(user_id)
     return g.user
 
 
@@ -387,12 +1349,36 @@ def enforce_required_riro_reauth():
     )
 
 
-def optimize_and_save_image(file_obj, save_path, max_size, keep_gif=False):
+def save_animated_webp(image, save_path, max_size):
+    """
+    애니메이션 이미지의 프레임을 모두 max_size 안으로 줄여 애니메이션 WEBP로 저장합니다.
+    ETACON_MAX_FRAMES 프레임 또는 ETACON_MAX_DURATION_MS 재생 시간을 넘는 프레임은 버립니다. 저장한 프레임 수를 반환
+    """
+    frames, durations, elapsed = [], [], 0
+    for frame in ImageSequence.Iterator(image):
+        duration = frame.info.get('duration') or ETACON_DEFAULT_FRAME_MS
+        if frames and (len(frames) >= ETACON_MAX_FRAMES or elapsed + duration > ETACON_MAX_DURATION_MS):
+            break
+        # 프레임마다 바로 줄여서 원본 크기 프레임을 여러 장 들고 있지 않도록 함
+        resized = frame.convert('RGBA')
+        resized.thumbnail(max_size, RESAMPLING_LANCZOS)
+        frames.append(resized)
+        durations.append(duration)
+        elapsed += duration
+
+    frames[0].save(
+        save_path, format='WEBP', save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0), quality=80, method=4
+    )
+    return len(frames)
+
+
+def optimize_and_save_image(file_obj, save_path, max_size, keep_animation=False):
     file_obj.stream.seek(0)
     image = Image.open(file_obj.stream)
 
-    if keep_gif and getattr(image, 'is_animated', False) and image.format == 'GIF':
-        image.save(save_path, save_all=True, optimize=True, loop=0)
+    if keep_animation and getattr(image, 'is_animated', False):
+        save_animated_webp(image, save_path, max_size)
         file_obj.stream.seek(0)
         return
 
@@ -413,10 +1399,8 @@ def optimize_and_save_image(file_obj, save_path, max_size, keep_gif=False):
 
 
 def save_etacon_image(file, sub_folder):
-    filename = secure_filename(file.filename)
-    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'webp'
-    final_ext = 'gif' if ext == 'gif' else 'webp'
-    unique_filename = f"{uuid.uuid4().hex[:8]}.{final_ext}"
+    # 정지 이미지는 WEBP, 움직이는 이미지는 애니메이션 WEBP로 저장되므로 확장자는 항상 webp
+    unique_filename = f"{uuid.uuid4().hex[:8]}.webp"
 
     save_dir = os.path.join(ETACON_UPLOAD_FOLDER, sub_folder)
     os.makedirs(save_dir, exist_ok=True)
@@ -424,12 +1408,197 @@ def save_etacon_image(file, sub_folder):
     save_path = os.path.join(save_dir, unique_filename)
 
     try:
-        optimize_and_save_image(file, save_path, ETACON_IMAGE_MAX_SIZE, keep_gif=True)
+        run_content_task(optimize_and_save_image, file, save_path, ETACON_IMAGE_MAX_SIZE, True)
         return f"images/etacons/{sub_folder}/{unique_filename}"
     except Exception as e:
         print(f"이미지 저장 실패: {e}")
         return None
 
+
+def get_upload_size(file):
+    file.stream.seek(0, os.SEEK_END)
+    size = file.stream.tell()
+    file.stream.seek(0)
+    return size
+
+
+def optimize_etacon_pack(pack_id):
+    """
+    승인 직전에 패키지 이미지를 점검합니다. 예전 방식으로 GIF 그대로 저장된 인곽콘은 애니메이션 WEBP로 바꾸고,
+    업로드 원본 대비 저장 용량을 집계해 {'images', 'converted', 'original_bytes', 'stored_bytes', 'saved_bytes'} 로 반환
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, image_path, original_bytes FROM etacons WHERE pack_id = ? ORDER BY id", (pack_id,))
+    report = {'images': 0, 'converted': 0, 'original_bytes': 0, 'stored_bytes': 0}
+
+    for etacon_id, image_path, original_bytes in cursor.fetchall():
+        full_path = os.path.join('static', image_path)
+        if not os.path.exists(full_path):
+            continue
+        stored_bytes = os.path.getsize(full_path)
+        original_bytes = original_bytes or stored_bytes
+
+        if image_path.lower().endswith('.gif'):
+            new_path = image_path[:-4] + '.webp'
+            try:
+                with Image.open(full_path) as image:
+                    if getattr(image, 'is_animated', False):
+                        run_content_task(save_animated_webp, image, os.path.join('static', new_path), ETACON_IMAGE_MAX_SIZE)
+                    else:
+                        image.convert('RGBA').save(os.path.join('static', new_path), format='WEBP', quality=82, method=6)
+                cursor.execute("UPDATE etacons SET image_path = ?, original_bytes = ? WHERE id = ?",
+                               (new_path, original_bytes, etacon_id))
+                os.remove(full_path)
+                stored_bytes = os.path.getsize(os.path.join('static', new_path))
+                report['converted'] += 1
+            except (OSError, ValueError) as e:
+                print(f"인곽콘 변환 실패 ({image_path}): {e}")
+
+        report['images'] += 1
+        report['original_bytes'] += original_bytes
+        report['stored_bytes'] += stored_bytes
+
+    conn.commit()
+    report['saved_bytes'] = report['original_bytes'] - report['stored_bytes']
+    return report
+
+
+def get_etacon_pack_folder(pack_id):
+    return os.path.join(ETACON_UPLOAD_FOLDER, f"pack_{pack_id}")
+
+
+def parse_etacon_pack_id(etacon_code):
+    """'~15_3' 형식의 인곽콘 코드에서 패키지 ID(15)를 추출합니다."""
+    try:
+        return int(str(etacon_code).split('_')[0].replace('~', ''))
+    except (TypeError, ValueError):
+        return None
+
+
+def build_etacon_sprite_sheet(pack_id):
+    """
+    패키지의 정지 이미지 인곽콘들을 하나의 WEBP 스프라이트 시트로 합치고,
+    코드별 셀 좌표를 담은 JSON 매니페스트를 패키지 폴더에 저장합니다.
+    애니메이션 GIF는 스프라이트에서 제외되어 기존처럼 개별 이미지로 제공됩니다.
+    """
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT code, image_path FROM etacons WHERE pack_id = ? ORDER BY id ASC", (pack_id,))
+    rows = cursor.fetchall()
+
+    cell = ETACON_SPRITE_CELL_SIZE
+    frames = []
+    for code, image_path in rows:
+        try:
+            with Image.open(os.path.join('static', image_path)) as image:
+                if getattr(image, 'is_animated', False):
+                    continue
+                frame = image.convert('RGBA')
+        except Exception as e:
+            print(f"스프라이트용 이미지 로드 실패 ({image_path}): {e}")
+            continue
+        frame.thumbnail((cell, cell), RESAMPLING_LANCZOS)
+        frames.append((code, frame))
+
+    pack_folder = get_etacon_pack_folder(pack_id)
+    manifest_path = os.path.join(pack_folder, ETACON_SPRITE_MANIFEST_NAME)
+    old_sprites = [name for name in os.listdir(pack_folder) if name.startswith('sprite_')] if os.path.isdir(pack_folder) else []
+
+    manifest = None
+    if frames:
+        columns = min(ETACON_SPRITE_COLUMNS, len(frames))
+        rows_count = math.ceil(len(frames) / columns)
+        sheet = Image.new('RGBA', (columns * cell, rows_count * cell), (0, 0, 0, 0))
+        items = {}
+        for idx, (code, frame) in enumerate(frames):
+            col, row = idx % columns, idx // columns
+            # 셀보다 작은 이미지는 셀 중앙에 배치
+            offset = (col * cell + (cell - frame.width) // 2, row * cell + (cell - frame.height) // 2)
+            sheet.paste(frame, offset, frame)
+            items[code] = [col, row]
+
+        buffer = io.BytesIO()
+        sheet.save(buffer, format='WEBP', quality=82, method=6)
+        sprite_bytes = buffer.getvalue()
+
+        # 정적 파일은 immutable 캐시되므로 내용 해시를 파일명에 포함
+        sprite_filename = f"sprite_{hashlib.sha256(sprite_bytes).hexdigest()[:8]}.webp"
+        os.makedirs(pack_folder, exist_ok=True)
+        with open(os.path.join(pack_folder, sprite_filename), 'wb') as f:
+            f.write(sprite_bytes)
+
+        manifest = {
+            'image': f"images/etacons/pack_{pack_id}/{sprite_filename}",
+            'cell': cell,
+            'columns': columns,
+            'rows': rows_count,
+            'items': items
+        }
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+    elif os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    for name in old_sprites:
+        if not manifest or not manifest['image'].endswith(name):
+            try:
+                os.remove(os.path.join(pack_folder, name))
+            except OSError:
+                pass
+
+    return manifest
+
+
+def get_etacon_sprite_stamp(pack_id):
+    """
+    스프라이트 매니페스트 파일의 mtime(ns). 없으면 0.
+    재생성(승인, flask build-etacon-sprites)은 다른 프로세스에서도 일어나므로 메모리 무효화 대신 이 값으로 버전을 구분합니다.
+    """
+    try:
+        return os.stat(os.path.join(get_etacon_pack_folder(pack_id), ETACON_SPRITE_MANIFEST_NAME)).st_mtime_ns
+    except (OSError, TypeError):
+        return 0
+
+
+def load_etacon_sprite_manifest(pack_id):
+    return read_etacon_sprite_manifest(pack_id, get_etacon_sprite_stamp(pack_id))
+
+
+@cache.memoize(timeout=3600)
+def read_etacon_sprite_manifest(pack_id, stamp):
+    if not stamp:
+        return None
+    manifest_path = os.path.join(get_etacon_pack_folder(pack_id), ETACON_SPRITE_MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"스프라이트 매니페스트 로드 실패 (pack {pack_id}): {e}")
+        return None
+
+
+def get_etacon_sprite_ref(manifest, code):
+    """
+    스프라이트 매니페스트에서 인곽콘 코드의 위치를 CSS background 값으로 변환합니다.
+    표시 크기와 무관하게 동작하도록 백분율 좌표를 사용합니다.
+    """
+    if not manifest:
+        return None
+    position = manifest.get('items', {}).get(code)
+    if not position:
+        return None
+
+    col, row = position
+    columns, rows = manifest['columns'], manifest['rows']
+    x_percent = col * 100 / (columns - 1) if columns > 1 else 0
+    y_percent = row * 100 / (rows - 1) if rows > 1 else 0
+    return {
+        'image': manifest['image'],
+        'background_size': f"{columns * 100}% {rows * 100}%",
+        'background_position': f"{x_percent:g}% {y_percent:g}%"
+    }
+
 # DB connect (first line of all route)
 def get_db():
     db = getattr(g, '_database', None)
@@ -474,6 +1643,14 @@ def get_grade_class(hakbun):
         pass
     return None, None
 
+def get_timetable_updated_at(grade, class_num):
+    # 조건부 GET마다 호출되므로 테이블 생성(init_timetable_storage)은 서버 시작 시에만 수행
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT updated_at FROM timetables WHERE grade = ? AND class_num = ?", (grade, class_num))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
 def get_timetable_data(grade, class_num):
     """
     DB에서 시간표를 조회하고, 없거나 날짜가 지났으면 nfcl로 크롤링하여 갱신합니다.
@@ -542,6 +1719,79 @@ def close_log_connection(exception):
     if db is not None:
         db.close()
 
+# Rate limit DB connect
+def get_rate_limit_db():
+    db = getattr(g, '_rate_limit_database', None)
+    if db is None:
+        db = g._rate_limit_database = sqlite3.connect(RATE_LIMIT_DATABASE, timeout=5, isolation_level=None)
+    return db
+
+@app.teardown_appcontext
+def close_rate_limit_connection(exception):
+    db = getattr(g, '_rate_limit_database', None)
+    if db is not None:
+        db.close()
+
+# Board Registry
+# 게시판 목록은 거의 바뀌지 않으므로 프로세스 메모리에 두고 dict 조회로 처리합니다.
+# 다른 워커/프로세스에서 게시판이 바뀌면 스탬프 파일의 mtime 변경으로 감지해 다시 읽습니다.
+BOARD_REGISTRY_STAMP_FILE = os.getenv('BOARD_REGISTRY_STAMP_FILE', 'board_registry.stamp')
+BOARD_REGISTRY_CHECK_INTERVAL = 5  # 스탬프 확인 주기(초) - 요청마다 stat 하지 않도록
+
+board_registry = {'boards': {}, 'stamp': None, 'checked_at': 0}
+
+
+def get_board_registry_stamp():
+    try:
+        return os.path.getmtime(BOARD_REGISTRY_STAMP_FILE)
+    except OSError:
+        return None
+
+
+def load_board_registry(conn=None):
+    conn = conn or get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT board_id, board_name, is_public FROM board ORDER BY board_id")
+    board_registry['boards'] = {
+        row[0]: {'board_id': row[0], 'board_name': row[1], 'is_public': row[2]}
+        for row in cursor.fetchall()
+    }
+    board_registry['stamp'] = get_board_registry_stamp()
+    board_registry['checked_at'] = time.time()
+    return board_registry['boards']
+
+
+def get_board_registry():
+    now = time.time()
+    if not board_registry['boards']:
+        return load_board_registry()
+    if now - board_registry['checked_at'] >= BOARD_REGISTRY_CHECK_INTERVAL:
+        board_registry['checked_at'] = now
+        if get_board_registry_stamp() != board_registry['stamp']:
+            return load_board_registry()
+    return board_registry['boards']
+
+
+def get_board(board_id):
+    """게시판 정보 dict (board_id, board_name, is_public). 없으면 None"""
+    try:
+        return get_board_registry().get(int(board_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_boards():
+    return list(get_board_registry().values())
+
+
+def invalidate_board_registry():
+    """게시판 변경 후 호출: 스탬프 파일을 갱신해 다른 워커에도 알리고, 현재 프로세스는 즉시 다시 읽습니다."""
+    with open(BOARD_REGISTRY_STAMP_FILE, 'a'):
+        pass
+    os.utime(BOARD_REGISTRY_STAMP_FILE, None)
+    return load_board_registry()
+
+
 @app.before_request
 def load_logged_in_user():
     # 정적 파일 요청 등은 건너뜀
@@ -552,22 +1802,20 @@ def load_logged_in_user():
     if user_id is None:
         g.user = None
     else:
-        conn = get_db()
-        conn.row_factory = sqlite3.Row
-        ensure_riro_reauth_tracking(conn)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE login_id = ?", (user_id,))
-        g.user = cursor.fetchone()
+        # 캐시 히트 시 DB 조회 없이 g.user 구성
+        g.user = fetch_user_identity(user_id)
 
         # [기존 로직] 제재 상태 만료 확인
         if g.user and g.user['status'] == 'banned' and g.user['banned_until']:
             try:
-                banned_until_date = datetime.datetime.strptime(g.user['banned_until'], '%Y-%m-%d %H:%M:%S')
+                banned_until_date = parse_db_datetime(g.user['banned_until'])
                 if datetime.datetime.now() > banned_until_date:
+                    conn = get_db()
+                    cursor = conn.cursor()
                     cursor.execute("UPDATE users SET status = 'active', banned_until = NULL WHERE login_id = ?", (g.user['login_id'],))
+                    touch_user_identity(user_id)
                     conn.commit()
-                    cursor.execute("SELECT * FROM users WHERE login_id = ?", (user_id,))
-                    g.user = cursor.fetchone()
+                    g.user = fetch_user_identity(user_id)
             except (ValueError, TypeError):
                 pass
 
@@ -593,7 +1841,7 @@ def block_banned_users():
             banned_until_str = "알 수 없음"
             if g.user['banned_until']:
                 try:
-                    dt = datetime.datetime.strptime(g.user['banned_until'], '%Y-%m-%d %H:%M:%S')
+                    dt = parse_db_datetime(g.user['banned_until'])
                     banned_until_str = dt.strftime('%Y년 %m월 %d일 %H:%M')
                 except ValueError:
                     banned_until_str = g.user['banned_until']
@@ -630,7 +1878,9 @@ def apply_security_headers(response):
         "object-src 'none'; base-uri 'self'; form-action 'self'; frame-ancestors 'none'"
     )
 
-    if request.path.startswith('/static/'):
+    # /thumb/ 썸네일도 원본 파일명(uuid)이 바뀌면 URL이 바뀌므로 정적 파일과 같이 취급
+    # 404나 일시적 실패 시의 리디렉트가 1년간 캐시되지 않도록 정상 응답(200/304)에만 붙임
+    if request.path.startswith(('/static/', '/thumb/')) and response.status_code in (200, 304):
         response.cache_control.public = True
         response.cache_control.max_age = app.config['SEND_FILE_MAX_AGE_DEFAULT']
         response.cache_control.immutable = True
@@ -640,6 +1890,46 @@ def apply_security_headers(response):
 
     return response
 
+
+# --- 조건부 GET (ETag / Last-Modified) ---
+# 페이지마다 호출되는 JSON API는 저렴한 버전 스탬프로 ETag를 만들고,
+# If-None-Match가 일치하면 본문 조회 없이 304를 반환합니다.
+def build_etag(*parts):
+    raw = '|'.join(str(part) for part in (STATIC_ASSET_VERSION,) + parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def parse_http_last_modified(value):
+    """DB의 '%Y-%m-%d %H:%M:%S' 문자열(서버 로컬 시간)을 HTTP 헤더용 UTC datetime으로 변환합니다."""
+    if not value:
+        return None
+    try:
+        return parse_db_datetime(value).astimezone(datetime.timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_not_modified(etag, last_modified=None):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified and request.if_modified_since:
+        return request.if_modified_since >= last_modified
+    return False
+
+
+def apply_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # 사용자별 응답이므로 공유 캐시 금지, 브라우저는 매번 재검증
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    return apply_validators(Response(status=304), etag, last_modified)
+
 # --- 👇 [추가] 제재된 사용자의 활동을 제한하는 데코레이터 ---
 def check_banned(f):
     @wraps(f)
@@ -649,7 +1939,7 @@ def check_banned(f):
             message = "활동이 정지된 계정입니다."
             if g.user['banned_until']:
                 try:
-                    expiry_date = datetime.strptime(g.user['banned_until'], '%Y-%m-%d %H:%M:%S').strftime('%Y년 %m월 %d일 %H:%M')
+                    expiry_date = parse_db_datetime(g.user['banned_until']).strftime('%Y년 %m월 %d일 %H:%M')
                     message += f" (만료일: {expiry_date})"
                 except ValueError:
                     pass # 날짜 형식이 잘못된 경우 그냥 기본 메시지만 표시
@@ -666,81 +1956,242 @@ def check_banned(f):
     return decorated_function
 
 
-class NotificationChannel:
-    def __init__(self):
-        self.clients = {} # { 'user_id': Queue(), ... }
+# SSE 허브 설정
+SSE_HEARTBEAT_INTERVAL = 20       # 모든 스트림에 한 번에 보내는 heartbeat 주기(초)
+SSE_MAX_STREAMS_PER_USER = 3      # 사용자당 동시 스트림 수 (초과 시 가장 오래된 탭을 닫음)
+SSE_MAX_STREAMS = 2000            # 서버 전체 동시 스트림 수 (초과 시 503)
+SSE_RESUME_BACKLOG_LIMIT = 50     # Last-Event-ID 재접속 시 다시 보내는 최대 알림 수
+SSE_HEARTBEAT_EVENT = ':heartbeat'
+SSE_CLOSE_EVENT = ':close'
+UNREAD_COUNT_CACHE_SIZE = 4096    # 메모리에 유지하는 읽지 않은 알림 수 (사용자 단위)
+UNREAD_COUNT_CACHE_TTL = 300      # 초. 메모리 카운터가 DB와 어긋나도 이 시간 안에 다시 세어 맞춤
 
-    def subscribe(self, user_id):
-        # 사용자가 접속하면, 해당 사용자를 위한 큐(채널)를 생성
-        self.clients[user_id] = Queue()
-        return self.clients[user_id]
 
-    def unsubscribe(self, user_id):
-        # 사용자가 접속을 끊으면 채널 삭제
-        self.clients.pop(user_id, None)
+class NotificationChannel:
+    def __init__(self, max_streams_per_user=SSE_MAX_STREAMS_PER_USER, max_streams=SSE_MAX_STREAMS,
+                 heartbeat_interval=SSE_HEARTBEAT_INTERVAL):
+        self.clients = {} # { 'user_id': [Queue(), ...] } - 탭마다 하나씩, 접속 순서대로
+        # { 'user_id': 읽지 않은 알림 수 } - DB에서 로드한 뒤 증감만 반영. 크기/TTL 제한으로 무한히 쌓이거나 오래 어긋나지 않음
+        self.unread_counts = TTLCache(maxsize=UNREAD_COUNT_CACHE_SIZE, ttl=UNREAD_COUNT_CACHE_TTL)
+        self.connection_count = 0
+        self.max_streams_per_user = max_streams_per_user
+        self.max_streams = max_streams
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_greenlet = None
 
-    def publish(self, user_id, message):
-        # 특정 사용자에게 메시지(알림)를 보냄
-        if user_id in self.clients:
-            self.clients[user_id].put_nowait(message)
+    def subscribe(self, user_id):
+        # 사용자가 접속하면, 해당 탭을 위한 큐(채널)를 생성. 전체 한도를 넘으면 None
+        streams = self.clients.setdefault(user_id, [])
+        if len(streams) >= self.max_streams_per_user:
+            # 사용자당 한도 초과: 가장 오래된 탭의 스트림을 닫고 자리를 넘겨줌
+            oldest = streams.pop(0)
+            self.connection_count -= 1
+            oldest.put_nowait((SSE_CLOSE_EVENT, None))
+        elif self.connection_count >= self.max_streams:
+            if not streams:
+                del self.clients[user_id]
+            return None
+
+        queue = Queue()
+        streams.append(queue)
+        self.connection_count += 1
+        self.start_heartbeat()
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        # 사용자가 접속을 끊으면 해당 탭의 채널 삭제 (여러 번 호출되어도 안전)
+        streams = self.clients.get(user_id)
+        if not streams or queue not in streams:
+            return
+        streams.remove(queue)
+        self.connection_count -= 1
+        if not streams:
+            del self.clients[user_id]
+
+    def publish(self, user_id, message, event=None):
+        # 특정 사용자의 모든 탭에 메시지(알림)를 보냄. event가 있으면 SSE 이벤트 이름으로 전송
+        for queue in self.clients.get(user_id, ()):
+            queue.put_nowait((event, message))
+
+    def broadcast_heartbeat(self):
+        for streams in list(self.clients.values()):
+            for queue in streams:
+                queue.put_nowait((SSE_HEARTBEAT_EVENT, None))
+
+    def heartbeat_loop(self):
+        # 스트림마다 타이머를 두지 않고, 하나의 greenlet이 모든 스트림에 heartbeat를 보냄
+        while True:
+            gevent.sleep(self.heartbeat_interval)
+            self.broadcast_heartbeat()
+
+    def start_heartbeat(self):
+        if self.heartbeat_greenlet is None:
+            self.heartbeat_greenlet = gevent.spawn(self.heartbeat_loop)
+
+    def get_unread_count(self, user_id, loader):
+        if user_id not in self.unread_counts:
+            self.unread_counts[user_id] = loader(user_id)
+        return self.unread_counts[user_id]
+
+    def refresh_unread_count(self, user_id, loader):
+        # 스트림 스냅샷처럼 기준값이 필요한 곳에서는 메모리 값을 믿지 않고 DB에서 다시 셈
+        self.unread_counts[user_id] = loader(user_id)
+        return self.unread_counts[user_id]
+
+    def forget_unread_counts(self, *user_ids):
+        # 알림 행을 일괄 삭제한 경로(게시글 삭제, 탈퇴)에서 호출. 다음 조회 때 DB에서 다시 로드
+        for user_id in user_ids:
+            self.unread_counts.pop(user_id, None)
+
+    def adjust_unread_count(self, user_id, delta):
+        # 아직 로드되지 않은 사용자는 다음 로드 시 DB 값이 반영되므로 건드리지 않음
+        if user_id not in self.unread_counts:
+            return None
+        self.unread_counts[user_id] = max(0, self.unread_counts[user_id] + delta)
+        return self.unread_counts[user_id]
 
 # 전역 변수로 알림 채널 객체 생성
 notification_channel = NotificationChannel()
 
-def create_notification(recipient_id, actor_id, action, target_type, target_id, post_id):
-    """알림을 생성하고 DB에 저장하는 함수 (익명 게시판 처리 추가)"""
-    # 자기 자신에게는 알림을 보내지 않음
-    if recipient_id == actor_id:
-        return
 
+def format_sse_message(message, event=None, event_id=None):
+    lines = [f"id: {event_id}"] if event_id else []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(message, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def count_unread_notifications(user_id):
     conn = get_db()
     cursor = conn.cursor()
-    created_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    # 1. 알림 DB 저장
-    cursor.execute("""
-        INSERT INTO notifications 
-        (recipient_id, actor_id, action, target_type, target_id, post_id, created_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (recipient_id, actor_id, action, target_type, target_id, post_id, created_at))
-    conn.commit()
-    notification_id = cursor.lastrowid 
+    cursor.execute("SELECT COUNT(*) FROM notifications WHERE recipient_id = ? AND is_read = 0", (user_id,))
+    return cursor.fetchone()[0]
 
-    # --- ▼ [수정] 익명 게시판 여부 확인 및 닉네임 마스킹 처리 ▼ ---
-    
-    # 해당 게시글이 어떤 게시판에 속해 있는지 조회
-    cursor.execute("SELECT board_id FROM posts WHERE id = ?", (post_id,))
-    post_row = cursor.fetchone()
-    
-    actor_nickname = '알 수 없는 사용자'
 
+def get_unread_notification_count(user_id):
+    return notification_channel.get_unread_count(user_id, count_unread_notifications)
+
+
+def refresh_unread_notification_count(user_id):
+    return notification_channel.refresh_unread_count(user_id, count_unread_notifications)
+
+
+def fetch_recent_notifications(user_id, limit=10, after_id=None):
+    """알림 드롭다운에 표시할 최신 알림 목록 (익명게시판은 닉네임 마스킹). after_id가 있으면 그 이후 알림만"""
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    # 게시글의 board_id를 함께 조회하여 익명게시판 여부 확인
+    query = """
+        SELECT n.*, COALESCE(u.nickname, '탈퇴한 사용자') as actor_nickname, p.board_id
+        FROM notifications n
+        LEFT JOIN users u ON n.actor_id = u.login_id
+        LEFT JOIN posts p ON n.post_id = p.id
+        WHERE n.recipient_id = ? AND n.id > ?
+        ORDER BY n.created_at DESC, n.id DESC
+        LIMIT ?
+    """
+    cursor.execute(query, (user_id, after_id or 0, limit))
+    notifications = []
+    for row in cursor.fetchall():
+        notification = dict(row)
+        # 익명게시판(board_id=3)인 경우 닉네임을 '익명'으로 마스킹
+        if notification.get('board_id') == 3:
+            notification['actor_nickname'] = '익명'
+        notifications.append(notification)
+    return notifications
+
+def resolve_notification_actor_nickname(cursor, actor_id, board_id, actor_nickname=None):
+    """알림 메시지에 표시할 행위자 닉네임 (익명게시판/비회원 마스킹 포함)"""
     # 게시판 ID가 3(익명게시판)인 경우, 닉네임을 '익명'으로 고정
-    if post_row and post_row[0] == 3:
-        actor_nickname = '익명'
-    else:
-        # 일반 게시판인 경우, 실제 유저 닉네임 조회
-        if actor_id == GUEST_USER_ID:
-            actor_nickname = '익명(비회원)'
-        else:
-            cursor.execute("SELECT nickname FROM users WHERE login_id = ?", (actor_id,))
-            actor = cursor.fetchone()
-            if actor:
-                # row_factory 설정에 따라 인덱스 또는 키로 접근 (안전하게 인덱스 0 사용)
-                actor_nickname = actor[0]
+    if board_id == 3:
+        return '익명'
+    if actor_id == GUEST_USER_ID:
+        return '익명(비회원)'
+    if actor_nickname:
+        return actor_nickname
+
+    cursor.execute("SELECT nickname FROM users WHERE login_id = ?", (actor_id,))
+    actor = cursor.fetchone()
+    # row_factory 설정에 따라 인덱스 또는 키로 접근 (안전하게 인덱스 0 사용)
+    return actor[0] if actor else '알 수 없는 사용자'
 
-    # --- ▲ [수정] ---
 
-    # 3. 클라이언트(브라우저)로 보낼 메시지 객체를 생성합니다.
-    message_to_send = {
+def build_notification(recipient_id, actor_id, action, target_type, target_id, post_id, board_id=None, actor_nickname=None):
+    """
+    알림 한 건의 내용을 만듭니다. 자기 자신에게 가는 알림이면 None을 반환합니다.
+    board_id / actor_nickname 은 호출자가 이미 알고 있으면 넘겨서 추가 조회를 생략합니다.
+    """
+    if recipient_id == actor_id:
+        return None
+    return {
+        'recipient_id': recipient_id,
+        'actor_id': actor_id,
         'action': action,
-        'actor_nickname': actor_nickname, # 수정된 닉네임 사용
+        'target_type': target_type,
+        'target_id': target_id,
         'post_id': post_id,
-        'is_read': 0, 
-        'id': notification_id
+        'board_id': board_id,
+        'actor_nickname': actor_nickname,
     }
 
-    # 4. 알림 채널을 통해 해당 사용자에게 메시지 발행(publish)
-    notification_channel.publish(recipient_id, message_to_send)
+
+def create_notifications(cursor, notifications):
+    """
+    build_notification()으로 만든 알림들을 호출자의 트랜잭션 안에서 INSERT 합니다. (커밋하지 않음)
+    반환값(발행 대기 메시지 목록)은 호출자가 conn.commit() 이후 publish_notifications()에 넘겨야 합니다.
+    """
+    notifications = [n for n in notifications if n]
+    if not notifications:
+        return []
+
+    created_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    # 호출자가 board_id를 넘기지 않은 게시글만 한 번에 조회
+    board_ids = {}
+    missing_post_ids = {n['post_id'] for n in notifications if n['board_id'] is None and n['post_id']}
+    if missing_post_ids:
+        placeholders = ','.join('?' for _ in missing_post_ids)
+        cursor.execute(f"SELECT id, board_id FROM posts WHERE id IN ({placeholders})", tuple(missing_post_ids))
+        board_ids = {row[0]: row[1] for row in cursor.fetchall()}
+
+    nickname_cache = {}
+    pending = []
+    for n in notifications:
+        cursor.execute("""
+            INSERT INTO notifications 
+            (recipient_id, actor_id, action, target_type, target_id, post_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (n['recipient_id'], n['actor_id'], n['action'], n['target_type'], n['target_id'], n['post_id'], created_at))
+        notification_id = cursor.lastrowid
+
+        board_id = n['board_id'] if n['board_id'] is not None else board_ids.get(n['post_id'])
+        cache_key = (n['actor_id'], board_id)
+        if cache_key not in nickname_cache:
+            nickname_cache[cache_key] = resolve_notification_actor_nickname(
+                cursor, n['actor_id'], board_id, n['actor_nickname']
+            )
+
+        # 클라이언트(브라우저)로 보낼 메시지 객체
+        pending.append((n['recipient_id'], {
+            'action': n['action'],
+            'actor_nickname': nickname_cache[cache_key],
+            'post_id': n['post_id'],
+            'is_read': 0,
+            'id': notification_id
+        }))
+    return pending
+
+
+def publish_notifications(pending):
+    """커밋이 끝난 알림들을 메모리의 읽지 않은 알림 수에 반영하고 SSE 채널로 발행합니다."""
+    for recipient_id, message in pending:
+        unread_count = notification_channel.adjust_unread_count(recipient_id, 1)
+        if unread_count is not None:
+            message['unread_count'] = unread_count
+        notification_channel.publish(recipient_id, message)
+
 
 # Add Log to log.db
 def add_log(action, user_id, details):
@@ -783,21 +2234,175 @@ def init_log_db():
         ''')
         conn.commit()
 
+# Initialize data.db indexes
+def init_db_indexes():
+    """
+    매 요청마다 실행되는 버전 스탬프/조회 쿼리가 인덱스를 타도록 보조 인덱스를 생성합니다.
+    테이블이 아직 없는 환경에서도 서버 기동이 실패하지 않도록 개별적으로 처리합니다.
+    """
+    index_statements = [
+        "CREATE INDEX IF NOT EXISTS idx_notifications_recipient ON notifications (recipient_id, id)",
+        "CREATE INDEX IF NOT EXISTS idx_notifications_post ON notifications (post_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_etacons_user ON user_etacons (user_id, purchased_at)",
+        # 게시글/댓글 삭제 cascade의 서브쿼리용
+        "CREATE INDEX IF NOT EXISTS idx_comments_post_author ON comments (post_id, author)",
+        "CREATE INDEX IF NOT EXISTS idx_comments_parent ON comments (parent_comment_id)",
+        "CREATE INDEX IF NOT EXISTS idx_reactions_target ON reactions (target_type, target_id)",
+        "CREATE INDEX IF NOT EXISTS idx_polls_post ON polls (post_id)",
+        # 검색의 작성자/게스트 닉네임 갈래
+        "CREATE INDEX IF NOT EXISTS idx_posts_author_updated ON posts (author, updated_at)",
+        # 마이페이지/프로필 활동 내역 keyset 페이지네이션 (posts는 위 인덱스 공용)
+        "CREATE INDEX IF NOT EXISTS idx_comments_author_updated ON comments (author, updated_at)",
+    ]
+    with app.app_context():
+        conn = get_db()
+        cursor = conn.cursor()
+        for statement in index_statements:
+            try:
+                cursor.execute(statement)
+            except sqlite3.OperationalError as e:
+                print(f"Index creation skipped: {e}")
+        conn.commit()
+
+# Password Hashing
+def hash_password(password, rounds=None):
+    """bcrypt 해시를 스레드 풀에서 생성합니다. (호출한 greenlet만 대기하고 다른 요청은 계속 처리됨)"""
+    rounds = rounds or app.config['BCRYPT_LOG_ROUNDS']
+    return password_hash_pool.apply(bcrypt.generate_password_hash, (password, rounds)).decode('utf-8')
+
+def hash_guest_password(password):
+    return hash_password(password, GUEST_PASSWORD_LOG_ROUNDS)
+
+def verify_password(pw_hash, password):
+    if not pw_hash or password is None:
+        return False
+    return password_hash_pool.apply(bcrypt.check_password_hash, (pw_hash, password))
+
+def password_needs_rehash(pw_hash, rounds=None):
+    """저장된 해시의 cost가 현재 설정과 다르면 True ($2b$<cost>$... 형식)"""
+    rounds = rounds or app.config['BCRYPT_LOG_ROUNDS']
+    try:
+        return int(pw_hash.split('$')[2]) != rounds
+    except (AttributeError, IndexError, ValueError):
+        return True
+
+# Auto Login Tokens (기기별 자동 로그인 토큰)
+AUTH_TOKEN_LIFETIME_DAYS = 90
+AUTH_TOKEN_ROTATION_GRACE_SECONDS = 60  # 토큰 교체 직후 동시 요청이 실패하지 않도록 이전 토큰을 잠시 유지
+AUTH_TOKEN_PURGE_INTERVAL = 3600
+
+def init_auth_tokens():
+    """
+    auth_tokens 테이블을 생성하고, users.autologin_token 에 남아 있던 기존 토큰을 한 번 옮겨옵니다.
+    토큰 원문은 저장하지 않고 SHA-256 해시만 unique index로 저장합니다.
+    """
+    with app.app_context():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS auth_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                token_hash TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                user_agent TEXT,
+                created_at TEXT NOT NULL,
+                last_used_at TEXT,
+                expires_at TEXT NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_auth_tokens_hash ON auth_tokens (token_hash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_auth_tokens_user ON auth_tokens (user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_auth_tokens_expires ON auth_tokens (expires_at)")
+
+        now = datetime.datetime.now()
+        cursor.execute("""
+            INSERT OR IGNORE INTO auth_tokens (token_hash, user_id, created_at, expires_at)
+            SELECT autologin_token, login_id, ?, ?
+            FROM users
+            WHERE autologin_token IS NOT NULL AND autologin_token != ''
+        """, (now.strftime('%Y-%m-%d %H:%M:%S'),
+              (now + datetime.timedelta(days=AUTH_TOKEN_LIFETIME_DAYS)).strftime('%Y-%m-%d %H:%M:%S')))
+        cursor.execute("UPDATE users SET autologin_token = NULL WHERE autologin_token IS NOT NULL AND autologin_token != ''")
+        conn.commit()
+
+def hash_auth_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def find_auth_token(cursor, token, now=None):
+    """유효한 자동 로그인 토큰이면 (id, user_id, expires_at), 아니면 None. token_hash unique index를 타는 단일 조회"""
+    now = now or datetime.datetime.now()
+    cursor.execute(
+        "SELECT id, user_id, expires_at FROM auth_tokens WHERE token_hash = ? AND expires_at > ?",
+        (hash_auth_token(token or ''), now.strftime('%Y-%m-%d %H:%M:%S'))
+    )
+    return cursor.fetchone()
+
+def issue_auth_token(cursor, user_id):
+    """새 기기용 자동 로그인 토큰을 발급하고 원문을 반환합니다. (커밋은 호출자가)"""
+    token = secrets.token_hex(32)
+    now = datetime.datetime.now()
+    user_agent = (request.headers.get('User-Agent') or '')[:200]
+    cursor.execute("""
+        INSERT INTO auth_tokens (token_hash, user_id, user_agent, created_at, last_used_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (hash_auth_token(token), user_id, user_agent,
+          now.strftime('%Y-%m-%d %H:%M:%S'), now.strftime('%Y-%m-%d %H:%M:%S'),
+          (now + datetime.timedelta(days=AUTH_TOKEN_LIFETIME_DAYS)).strftime('%Y-%m-%d %H:%M:%S')))
+    return token
+
+def set_auth_token_cookie(resp, token):
+    resp.set_cookie(
+        'remember_token',
+        token,
+        max_age=datetime.timedelta(days=AUTH_TOKEN_LIFETIME_DAYS),
+        httponly=True,
+        secure=True,
+        samesite='Lax'
+    )
+    return resp
+
+def revoke_auth_token(cursor, token):
+    """현재 기기의 자동 로그인 토큰만 삭제"""
+    if token:
+        cursor.execute("DELETE FROM auth_tokens WHERE token_hash = ?", (hash_auth_token(token),))
+
+def revoke_user_auth_tokens(cursor, user_id):
+    """사용자의 모든 기기 자동 로그인 토큰 삭제 (비밀번호 변경, 탈퇴 등)"""
+    cursor.execute("DELETE FROM auth_tokens WHERE user_id = ?", (user_id,))
+
+def purge_expired_auth_tokens():
+    """만료된 토큰 정리. 요청 컨텍스트 밖(백그라운드 greenlet)에서 호출되므로 직접 연결합니다."""
+    conn = sqlite3.connect(DATABASE)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM auth_tokens WHERE expires_at <= ?", (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def auth_token_purge_loop():
+    while True:
+        try:
+            purge_expired_auth_tokens()
+        except sqlite3.Error as e:
+            print(f"Auth token purge failed: {e}")
+        gevent.sleep(AUTH_TOKEN_PURGE_INTERVAL)
+
 # Check Auto Login
 @app.before_request
 def check_auto_login():
     if 'user_id' not in session and 'remember_token' in request.cookies:
         token = request.cookies.get('remember_token')
-        hashed_token = hashlib.sha256(token.encode()).hexdigest()
+        now = datetime.datetime.now()
 
         conn = get_db()
-        conn.row_factory = sqlite3.Row
-        ensure_riro_reauth_tracking(conn)
         cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM users WHERE autologin_token = ?', (hashed_token,))
-        user = cursor.fetchone()
+        token_row = find_auth_token(cursor, token, now)
+        if not token_row:
+            return
 
+        user = fetch_user_identity(token_row[1])
         if user:
             session.pop('hakbun', None)
             session.pop('name', None)
@@ -808,6 +2413,19 @@ def check_auto_login():
             session.permanent = True
             g.user = user
 
+            # 토큰 교체(rotation): 새 토큰을 발급하고, 이전 토큰은 짧은 유예 후 만료
+            # 이미 교체되어 유예 중인 토큰(동시 요청)은 다시 교체하지 않음
+            grace_until = (now + datetime.timedelta(seconds=AUTH_TOKEN_ROTATION_GRACE_SECONDS)).strftime('%Y-%m-%d %H:%M:%S')
+            if token_row[2] <= grace_until:
+                return
+            cursor.execute("UPDATE auth_tokens SET expires_at = ? WHERE id = ?", (grace_until, token_row[0]))
+            new_token = issue_auth_token(cursor, user['login_id'])
+            conn.commit()
+
+            @after_this_request
+            def rotate_remember_cookie(response):
+                return set_auth_token_cookie(response, new_token)
+
 
 @app.before_request
 def require_riro_reauth_before_site_use():
@@ -888,77 +2506,123 @@ def get_level_progress_percent(level, exp):
     return min(100, max(0, round((int(exp or 0) / required_exp) * 100, 2)))
 
 
+def build_level_tables(max_level=LEVEL_TABLE_MAX_LEVEL):
+    """
+    레벨 도달에 필요한 누적 EXP / 누적 레벨업 포인트 보상 표를 array로 미리 계산합니다.
+    인덱스 i 가 레벨 i + 1 의 시작점 (cumulative_exp[0] == 0 은 레벨 1)
+    """
+    cumulative_exp = array('q', [0])
+    cumulative_reward = array('q', [0])
+    for level in range(1, max_level):
+        cumulative_exp.append(cumulative_exp[-1] + get_required_exp_for_level(level))
+        cumulative_reward.append(cumulative_reward[-1] + get_level_point_reward(level + 1))
+    return cumulative_exp, cumulative_reward
+
+
+LEVEL_CUMULATIVE_EXP, LEVEL_CUMULATIVE_REWARD = build_level_tables()
+
+
+def get_total_exp(level, exp):
+    """(레벨, 현재 레벨 내 EXP)를 레벨 1부터의 누적 EXP로 변환합니다."""
+    level = min(max(int(level or 1), 1), len(LEVEL_CUMULATIVE_EXP))
+    return LEVEL_CUMULATIVE_EXP[level - 1] + int(exp or 0)
+
+
+def resolve_level(total_exp):
+    """누적 EXP에서 (레벨, 현재 레벨 내 EXP)를 이분 탐색으로 구합니다. 음수는 레벨 1, EXP 0"""
+    total_exp = max(int(total_exp or 0), 0)
+    level = bisect.bisect_right(LEVEL_CUMULATIVE_EXP, total_exp)
+    return level, total_exp - LEVEL_CUMULATIVE_EXP[level - 1]
+
+
+def get_level_up_reward(from_level, to_level):
+    """from_level → to_level 레벨업 동안 받는 포인트 합계. 레벨 다운은 회수하지 않으므로 0"""
+    from_level = min(max(int(from_level or 1), 1), len(LEVEL_CUMULATIVE_REWARD))
+    if to_level <= from_level:
+        return 0
+    return LEVEL_CUMULATIVE_REWARD[to_level - 1] - LEVEL_CUMULATIVE_REWARD[from_level - 1]
+
+
 app.jinja_env.globals['get_required_exp_for_level'] = get_required_exp_for_level
 app.jinja_env.globals['get_level_progress_percent'] = get_level_progress_percent
 
 
-def update_exp_level(user_id, exp_change, commit=True):
+def update_exp_levels(exp_changes, commit=True):
+    """
+    {user_id: exp 변화량}을 한 번에 적용합니다. 사용자별 레벨 계산은 파이썬에서 1회씩,
+    DB 쓰기는 SELECT 한 번(500명 단위) + executemany 한 번, 커밋은 commit=True일 때 마지막에 한 번만 합니다.
+    반환값은 {user_id: update_exp_level()과 같은 결과 dict} (존재하지 않는 사용자는 빠짐)
+    """
+    exp_changes = {user_id: int(delta or 0) for user_id, delta in exp_changes.items() if user_id}
+    if not exp_changes:
+        return {}
+
     conn = get_db()
     cursor = conn.cursor()
 
-    # 현재 사용자 정보 조회
-    cursor.execute("SELECT level, exp FROM users WHERE login_id = ?", (user_id,))
-    user = cursor.fetchone()
-    if not user:
-        return {'level_gained': 0, 'point_reward': 0}
-
-    current_level, current_exp = user
-    final_level = max(int(current_level or 1), 1)
-    final_exp = int(current_exp or 0) + int(exp_change or 0)
-    point_reward = 0
-
-    required_exp = get_required_exp_for_level(final_level)
-    while final_exp >= required_exp:
-        final_exp -= required_exp
-        final_level += 1
-        point_reward += get_level_point_reward(final_level)
-        required_exp = get_required_exp_for_level(final_level)
-
-    while final_exp < 0 and final_level > 1:
-        final_level -= 1
-        final_exp += get_required_exp_for_level(final_level)
-
-    # 레벨은 최소 1로 유지
-    if final_level < 1:
-        final_level = 1
-        final_exp = 0
-    if final_level == 1 and final_exp < 0:
-        final_exp = 0
-
-    level_gained = max(final_level - int(current_level or 1), 0)
-
-    if point_reward > 0:
-        cursor.execute(
-            "UPDATE users SET level = ?, exp = ?, point = point + ? WHERE login_id = ?",
-            (final_level, final_exp, point_reward, user_id)
-        )
-    else:
-        cursor.execute(
-            "UPDATE users SET level = ?, exp = ? WHERE login_id = ?",
-            (final_level, final_exp, user_id)
-        )
+    user_ids = list(exp_changes)
+    current = {}
+    for i in range(0, len(user_ids), 500):
+        chunk = user_ids[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        cursor.execute(f"SELECT login_id, level, exp FROM users WHERE login_id IN ({placeholders})", chunk)
+        for login_id, level, exp in cursor.fetchall():
+            current[login_id] = (max(int(level or 1), 1), exp)
+
+    results = {}
+    updates = []
+    for user_id, (current_level, current_exp) in current.items():
+        # 누적 EXP 기준으로 한 번에 계산 (레벨을 하나씩 오르내리는 반복 없음)
+        final_level, final_exp = resolve_level(get_total_exp(current_level, current_exp) + exp_changes[user_id])
+        point_reward = get_level_up_reward(current_level, final_level)
+        updates.append((final_level, final_exp, point_reward, user_id))
+        results[user_id] = {
+            'level_gained': max(final_level - current_level, 0),
+            'point_reward': point_reward,
+            'level': final_level,
+            'exp': final_exp,
+            'required_exp': get_required_exp_for_level(final_level)
+        }
+
+    # 레벨업 보상 지급까지 한 문장으로
+    cursor.executemany("UPDATE users SET level = ?, exp = ?, point = point + ? WHERE login_id = ?", updates)
+    touch_user_identity(*results)
 
     if commit:
         conn.commit()
 
-    return {
-        'level_gained': level_gained,
-        'point_reward': point_reward,
-        'level': final_level,
-        'exp': final_exp,
-        'required_exp': get_required_exp_for_level(final_level)
-    }
+    return results
+
+
+def update_exp_level(user_id, exp_change, commit=True):
+    return update_exp_levels({user_id: exp_change}, commit).get(user_id, {'level_gained': 0, 'point_reward': 0})
+
+# DB 시각 문자열 파싱
+DB_EPOCH_ORIGIN = datetime.datetime(1970, 1, 1)
+
+def parse_db_datetime(value):
+    """
+    DB의 'YYYY-MM-DD HH:MM:SS' 문자열(서버 로컬 시간)을 datetime으로 변환합니다.
+    고정 형식이라 매번 포맷 문자열을 해석하는 strptime 대신 C로 구현된 fromisoformat을 씁니다.
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return DB_EPOCH_ORIGIN + datetime.timedelta(seconds=value)
+    return datetime.datetime.fromisoformat(value)
+
+def to_db_epoch(value):
+    """datetime(또는 DB 문자열)을 posts.created_ts와 같은 기준의 정수 epoch로 변환합니다."""
+    return int((parse_db_datetime(value) - DB_EPOCH_ORIGIN).total_seconds())
 
 # Jinja2 Filter for Datetime Formatting
 def format_datetime(value):
-    # DB에서 가져온 날짜/시간 문자열을 datetime 객체로 변환
-    post_time = datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+    # DB에서 가져온 날짜/시간 문자열(또는 epoch 정수)을 datetime 객체로 변환
+    post_time = parse_db_datetime(value)
     now = datetime.datetime.now()
     
     # 시간 차이 계산
-    delta = now - post_time
-    
-    seconds = delta.total_seconds()
+    seconds = (now - post_time).total_seconds()
     
     if seconds < 60:
         return '방금 전'
@@ -967,9 +2631,11 @@ def format_datetime(value):
     elif seconds < 86400:
         return f'{int(seconds // 3600)}시간 전'
     elif seconds < 2592000:
-        return f'{delta.days}일 전'
+        return f'{int(seconds // 86400)}일 전'
     else:
-        # 한 달이 넘으면 'YYYY-MM-DD' 형식으로 반환
+        # 한 달이 넘으면 'YYYY-MM-DD' 형식으로 반환 (strftime 없이 문자열 앞부분 사용)
+        if isinstance(value, str):
+            return value[:10]
         return post_time.strftime('%Y-%m-%d')
 
 # 위에서 만든 함수를 템플릿에서 'datetime'이라는 이름의 필터로 사용할 수 있도록 등록
@@ -987,9 +2653,9 @@ def get_recent_posts(board_id):
 
     try:
         query = """
-            SELECT p.id, p.title, u.nickname, p.updated_at
+            SELECT p.id, p.title, COALESCE(u.nickname, '탈퇴한 사용자') AS nickname, p.updated_at
             FROM posts p
-            JOIN users u ON p.author = u.login_id
+            LEFT JOIN users u ON p.author = u.login_id
             WHERE p.board_id = ?
             ORDER BY p.updated_at DESC
             LIMIT 5
@@ -1009,7 +2675,7 @@ def get_hot_posts():
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    seven_days_ago = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+    seven_days_ago = to_db_epoch(datetime.datetime.now() - datetime.timedelta(days=7))
     
     query = """
         SELECT p.id, p.title, COUNT(r.id) as like_count
@@ -1017,7 +2683,7 @@ def get_hot_posts():
         JOIN reactions r ON p.id = r.target_id
         WHERE r.target_type = 'post'
           AND r.reaction_type = 'like'
-          AND p.created_at >= ?
+          AND p.created_ts >= ?
         GROUP BY p.id
         HAVING like_count >= 10
         ORDER BY like_count DESC
@@ -1034,13 +2700,13 @@ def get_trending_posts():
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
     
-    one_day_ago = (datetime.datetime.now() - datetime.timedelta(hours=24)).strftime('%Y-%m-%d %H:%M:%S')
+    one_day_ago = to_db_epoch(datetime.datetime.now() - datetime.timedelta(hours=24))
     
     # 수정: WHERE 절에 view_count >= 10 조건 추가
     query = """
         SELECT id, title, view_count
         FROM posts
-        WHERE created_at >= ? AND view_count >= 10
+        WHERE created_ts >= ? AND view_count >= 10
         ORDER BY view_count DESC
         LIMIT 5
     """
@@ -1051,9 +2717,14 @@ def get_trending_posts():
 # 급식 API 엔드포인트 (비동기 로딩용)
 @app.route('/api/bob')
 def api_bob():
+    # 급식은 날짜 단위로만 바뀌므로 날짜 자체가 버전 스탬프
+    etag = build_etag('bob', datetime.datetime.now().strftime('%Y%m%d'))
+    if is_not_modified(etag):
+        return not_modified_response(etag)
+
     bob_data = get_bob()
     if bob_data:
-        return jsonify({
+        response = jsonify({
             'status': 'success',
             'data': {
                 'breakfast': bob_data[0],
@@ -1061,6 +2732,10 @@ def api_bob():
                 'dinner': bob_data[2]
             }
         })
+        # API 호출 실패 응답은 저장되지 않으므로 ETag를 붙이지 않음 (다음 요청에서 재시도)
+        if bob_data[0] != "API 호출 실패":
+            apply_validators(response, etag)
+        return response
     return jsonify({'status': 'error', 'message': '급식 정보를 불러올 수 없습니다.'})
 
 # 시간표 API 엔드포인트 (비동기 로딩용)
@@ -1072,23 +2747,38 @@ def api_timetable():
     
     user_data = g.user
     timetable_today = []
-    
+    etag = None
+
     if user_data and user_data['hakbun']:
         grade, class_num = get_grade_class(user_data['hakbun'])
-        
+
         if grade and class_num:
+            # 오늘 갱신된 시간표라면 updated_at이 버전 스탬프 (크롤링/JSON 파싱 생략)
+            today = datetime.datetime.now().strftime('%Y-%m-%d')
+            updated_at = get_timetable_updated_at(grade, class_num)
+            if updated_at == today:
+                etag = build_etag('timetable', grade, class_num, updated_at)
+                if is_not_modified(etag):
+                    return not_modified_response(etag)
+
             full_timetable = get_timetable_data(grade, class_num)
-            
+
             if full_timetable:
                 weekday_map = {0: '월', 1: '화', 2: '수', 3: '목', 4: '금'}
                 today_idx = datetime.datetime.now().weekday()
                 target_day = weekday_map.get(today_idx, '월')
                 timetable_today = full_timetable.get(target_day, [])
-    
-    return jsonify({
+
+            if etag is None and get_timetable_updated_at(grade, class_num) == today:
+                etag = build_etag('timetable', grade, class_num, today)
+
+    response = jsonify({
         'status': 'success',
         'data': timetable_today
     })
+    if etag:
+        apply_validators(response, etag)
+    return response
 
 # Main Page
 @app.route('/')
@@ -1133,13 +2823,179 @@ def main_page():
     else:
         return render_template('main_notlogined.html')
 
-googlebot_ip_cache = {}
-googlebot_ip_cache = TTLCache(maxsize=1000, ttl=3600)
+# Googlebot 검증 설정
+# IP 대역 파일: https://developers.google.com/static/search/apis/ipranges/googlebot.json 형식
+GOOGLEBOT_IP_RANGES_URL = 'https://developers.google.com/static/search/apis/ipranges/googlebot.json'
+GOOGLEBOT_IP_RANGES_FILE = os.getenv('GOOGLEBOT_IP_RANGES_FILE', 'googlebot_ip_ranges.json')
+GOOGLEBOT_RANGES_REFRESH_INTERVAL = 600  # 파일 변경 여부 확인 주기(초)
+GOOGLEBOT_DNS_WAIT_SECONDS = 2           # 요청이 DNS 검증 결과를 기다리는 최대 시간
+GOOGLEBOT_DNS_LOOKUP_TIMEOUT = 10        # 백그라운드 DNS 검증 자체의 최대 시간
+GOOGLEBOT_VERDICT_TTL = {True: 7 * 86400, False: 86400}
+
+googlebot_ip_cache = TTLCache(maxsize=1000, ttl=3600)  # SQLite 판정 캐시 앞단의 메모리 캐시
+googlebot_pending_lookups = {}  # { ip: AsyncResult } - 같은 IP의 동시 요청은 DNS 조회 1회를 공유
+
+
+class IPPrefixTrie:
+    """IP 대역(CIDR) 목록을 비트 단위 트라이로 저장해, 주소가 어느 대역에 속하는지 prefix 길이만큼만 비교합니다."""
+
+    def __init__(self):
+        self.roots = {4: {}, 6: {}}
+        self.size = 0
+
+    def add(self, network):
+        node = self.roots[network.version]
+        bits = int(network.network_address)
+        total = network.max_prefixlen
+        for i in range(network.prefixlen):
+            node = node.setdefault((bits >> (total - 1 - i)) & 1, {})
+        node['end'] = True
+        self.size += 1
+
+    def __contains__(self, ip):
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        node = self.roots[address.version]
+        bits = int(address)
+        total = address.max_prefixlen
+        for i in range(total):
+            if 'end' in node:
+                return True
+            node = node.get((bits >> (total - 1 - i)) & 1)
+            if node is None:
+                return False
+        return 'end' in node
+
+
+googlebot_ranges = {'trie': IPPrefixTrie(), 'mtime': None}
+
+
+def load_googlebot_ip_ranges(path=None):
+    """로컬 IP 대역 파일이 바뀌었으면 트라이를 새로 만들어 교체합니다. 교체했으면 True."""
+    path = path or GOOGLEBOT_IP_RANGES_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return False
+    if mtime == googlebot_ranges['mtime']:
+        return False
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    trie = IPPrefixTrie()
+    for prefix in data.get('prefixes', []):
+        value = prefix.get('ipv4Prefix') or prefix.get('ipv6Prefix')
+        if not value:
+            continue
+        try:
+            trie.add(ipaddress.ip_network(value, strict=False))
+        except ValueError:
+            continue
+
+    googlebot_ranges['trie'] = trie
+    googlebot_ranges['mtime'] = mtime
+    return True
+
+
+def googlebot_ranges_refresh_loop():
+    while True:
+        gevent.sleep(GOOGLEBOT_RANGES_REFRESH_INTERVAL)
+        try:
+            if load_googlebot_ip_ranges():
+                print(f"Googlebot IP ranges reloaded: {googlebot_ranges['trie'].size} prefixes")
+        except (OSError, ValueError) as e:
+            print(f"Googlebot IP ranges reload failed: {e}")
+
+
+def init_googlebot_verdicts():
+    with app.app_context():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS googlebot_verdicts (
+                ip TEXT PRIMARY KEY,
+                is_googlebot INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                checked_at TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+
+
+def load_googlebot_verdict(ip):
+    try:
+        cursor = get_db().cursor()
+        cursor.execute("SELECT is_googlebot FROM googlebot_verdicts WHERE ip = ? AND expires_at > ?", (ip, time.time()))
+        row = cursor.fetchone()
+    except sqlite3.Error:
+        return None
+    return bool(row[0]) if row else None
+
+
+def save_googlebot_verdict(ip, verdict, source):
+    """백그라운드 greenlet에서도 호출되므로 요청 컨텍스트 없이 직접 연결합니다."""
+    conn = sqlite3.connect(DATABASE, timeout=5)
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO googlebot_verdicts (ip, is_googlebot, source, checked_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+            (ip, int(verdict), source, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+             time.time() + GOOGLEBOT_VERDICT_TTL[bool(verdict)])
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def resolve_googlebot_by_dns(ip):
+    """역방향 + 순방향 DNS 조회로 Googlebot 여부를 확인합니다."""
+    try:
+        # 역방향 DNS 조회 (IP -> Hostname)
+        hostname, _, _ = socket.gethostbyaddr(ip)
+        # Hostname 검증
+        if not (hostname.endswith('.googlebot.com') or hostname.endswith('.google.com')):
+            return False
+        # 순방향 DNS 조회 (Hostname -> IP) 후 일치 확인
+        return socket.gethostbyname(hostname) == ip
+    except (socket.herror, socket.gaierror):
+        # DNS 조회 실패 (일시적 오류일 수 있으나, 일단 봇이 아닌 것으로 간주)
+        return False
+
+
+def verify_googlebot_in_background(ip, result):
+    verdict = None
+    try:
+        with gevent.Timeout(GOOGLEBOT_DNS_LOOKUP_TIMEOUT):
+            verdict = resolve_googlebot_by_dns(ip)
+    except gevent.Timeout:
+        # 시간 초과는 판정 보류 (저장하지 않고 다음 요청에서 다시 시도)
+        print(f"Googlebot DNS verification timed out for IP {ip}")
+    except Exception as e:
+        # add_log 함수가 g.user를 필요로 할 수 있으므로, 여기서는 print를 사용합니다.
+        print(f"Error during Googlebot verification for IP {ip}: {e}")
+        verdict = False
+
+    if verdict is not None:
+        googlebot_ip_cache[ip] = verdict
+        try:
+            save_googlebot_verdict(ip, verdict, 'dns')
+        except sqlite3.Error as e:
+            print(f"Googlebot verdict save failed for IP {ip}: {e}")
+
+    googlebot_pending_lookups.pop(ip, None)
+    result.set(verdict)
+
 
 # Googlebot Verification Logic
 def is_googlebot():
     """
-    User-Agent와 DNS 양방향 조회를 통해 Googlebot을 검증합니다. (캐시 사용)
+    User-Agent와 Google 공개 IP 대역(없으면 DNS 양방향 조회)으로 Googlebot을 검증합니다.
     User-Agent 스푸핑을 방지하기 위함입니다.
     """
     user_agent = request.user_agent.string
@@ -1150,43 +3006,30 @@ def is_googlebot():
     ip = request.remote_addr
     
     # 2. 로컬 IP는 봇으로 간주하지 않음
-    if ip == '127.0.0.1':
+    if not ip or ip == '127.0.0.1':
         return False
 
-    # 3. 캐시 확인 (가장 빈번한 케이스)
+    # 3. 메모리 캐시 확인 (가장 빈번한 케이스)
     if ip in googlebot_ip_cache:
         return googlebot_ip_cache[ip]
 
-    try:
-        # 4. 역방향 DNS 조회 (IP -> Hostname)
-        hostname, _, _ = socket.gethostbyaddr(ip)
-
-        # 5. Hostname 검증
-        if not (hostname.endswith('.googlebot.com') or hostname.endswith('.google.com')):
-            googlebot_ip_cache[ip] = False # 캐시에 '실패' 기록
-            return False
-
-        # 6. 순방향 DNS 조회 (Hostname -> IP)
-        resolved_ip = socket.gethostbyname(hostname)
+    # 4. 공개 IP 대역 트라이 확인 (네트워크 조회 없음)
+    if ip in googlebot_ranges['trie']:
+        googlebot_ip_cache[ip] = True
+        return True
 
-        # 7. IP 일치 확인 (최종 검증)
-        if ip == resolved_ip:
-            googlebot_ip_cache[ip] = True # 캐시에 '성공' 기록
-            return True
-        else:
-            googlebot_ip_cache[ip] = False # 캐시에 '실패' 기록
-            return False
+    # 5. 재시작 후에도 남아 있는 SQLite 판정 캐시 확인
+    verdict = load_googlebot_verdict(ip)
+    if verdict is not None:
+        googlebot_ip_cache[ip] = verdict
+        return verdict
 
-    except (socket.herror, socket.gaierror):
-        # DNS 조회 실패 (일시적 오류일 수 있으나, 일단 봇이 아닌 것으로 간주)
-        googlebot_ip_cache[ip] = False
-        return False
-    except Exception as e:
-        # 기타 예외 로깅
-        # add_log 함수가 g.user를 필요로 할 수 있으므로, 여기서는 print를 사용합니다.
-        print(f"Error during Googlebot verification for IP {ip}: {e}")
-        googlebot_ip_cache[ip] = False
-        return False
+    # 6. DNS 검증은 백그라운드 greenlet에서 IP당 1회만 수행하고, 요청은 짧게만 기다림
+    pending = googlebot_pending_lookups.get(ip)
+    if pending is None:
+        pending = googlebot_pending_lookups[ip] = AsyncResult()
+        gevent.spawn(verify_googlebot_in_background, ip, pending)
+    return bool(pending.wait(GOOGLEBOT_DNS_WAIT_SECONDS))
 
 # For Login Required Page
 # @login_required under @app.route
@@ -1212,6 +3055,29 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def build_stream_initial_messages(current_user_id):
+    """/stream 접속 직후 보낼 메시지들. Last-Event-ID가 있으면 놓친 알림만, 없으면 스냅샷"""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id:
+        # 재접속: 마지막으로 받은 알림 이후의 것만 다시 보내고, 뱃지 숫자를 맞춥니다.
+        backlog = fetch_recent_notifications(current_user_id, limit=SSE_RESUME_BACKLOG_LIMIT, after_id=last_event_id)
+        initial_messages = [format_sse_message(n, event_id=n['id']) for n in reversed(backlog)]
+        initial_messages.append(format_sse_message(
+            {'unread_count': refresh_unread_notification_count(current_user_id)}, event='unread'
+        ))
+    else:
+        # 접속 직후 보낼 스냅샷(읽지 않은 알림 수 + 최신 알림 10개)을 컨텍스트가 살아있을 때 준비합니다.
+        # 페이지마다 /notifications/unread-count, /notifications 를 따로 호출할 필요가 없어집니다.
+        notifications = fetch_recent_notifications(current_user_id)
+        snapshot = {
+            'unread_count': refresh_unread_notification_count(current_user_id),
+            'notifications': notifications
+        }
+        snapshot_id = max((n['id'] for n in notifications), default=None)
+        initial_messages = [format_sse_message(snapshot, event='snapshot', event_id=snapshot_id)]
+    return initial_messages
+
+
 @app.route('/stream')
 @login_required
 def stream():
@@ -1219,17 +3085,36 @@ def stream():
     # 제너레이터가 실행되기 전, 즉 컨텍스트가 살아있을 때 user_id를 미리 변수에 저장합니다.
     current_user_id = g.user['login_id']
 
+    # 스냅샷을 만들기 전에 먼저 구독해야 그 사이에 생긴 알림을 놓치지 않습니다.
+    messages = notification_channel.subscribe(current_user_id)
+    if messages is None:
+        response = Response('실시간 알림 연결이 너무 많습니다.', status=503)
+        response.headers['Retry-After'] = str(SSE_HEARTBEAT_INTERVAL)
+        return response
+
+    try:
+        initial_messages = build_stream_initial_messages(current_user_id)
+    except Exception:
+        # 스냅샷 조회가 실패하면 응답(call_on_close)이 만들어지지 않으므로 여기서 자리를 반납
+        notification_channel.unsubscribe(current_user_id, messages)
+        raise
+
     def event_stream():
         # 이제 제너레이터는 컨텍스트가 사라져도 안전한 'current_user_id' 변수를 사용합니다.
-        messages = notification_channel.subscribe(current_user_id)
-        
         try:
+            for initial_message in initial_messages:
+                yield initial_message
             while True:
-                try:
-                    message = messages.get(timeout=20)
-                    yield f"data: {json.dumps(message)}\n\n"
-                except Empty:
+                # heartbeat는 NotificationChannel의 단일 타이머 greenlet이 큐에 넣어줍니다.
+                event, message = messages.get()
+                if event == SSE_HEARTBEAT_EVENT:
                     yield ":heartbeat\n\n"
+                elif event == SSE_CLOSE_EVENT:
+                    # 같은 사용자의 새 탭에 자리를 넘겨줌. 클라이언트는 재접속하지 않습니다.
+                    yield format_sse_message({}, event='close')
+                    return
+                else:
+                    yield format_sse_message(message, event=event, event_id=message.get('id') if event is None else None)
         except GeneratorExit:
             # 클라이언트 연결이 끊어지면 정상적으로 구독 해제
             pass
@@ -1238,10 +3123,66 @@ def stream():
             print(f"An error occurred in the event stream for user {current_user_id}: {e}")
         finally:
             # 연결이 어떤 이유로든 종료될 때 항상 구독을 해제합니다.
-            notification_channel.unsubscribe(current_user_id)
+            notification_channel.unsubscribe(current_user_id, messages)
     # --- ▲ [핵심 수정] ---
 
-    return Response(event_stream(), mimetype='text/event-stream')
+    response = Response(event_stream(), mimetype='text/event-stream')
+    # 제너레이터가 한 번도 실행되지 않고 끝나는 경우에도 구독을 해제
+    response.call_on_close(lambda: notification_channel.unsubscribe(current_user_id, messages))
+    return response
+
+@app.route('/admin/boards/reload', methods=['POST'])
+@login_required
+@admin_required
+def admin_reload_boards():
+    """board 테이블을 직접 수정한 뒤 모든 워커의 게시판 레지스트리를 갱신합니다."""
+    boards = invalidate_board_registry()
+    add_log('RELOAD_BOARDS', g.user['login_id'], f"게시판 레지스트리를 갱신했습니다. ({len(boards)}개)")
+    return jsonify({'status': 'success', 'count': len(boards)})
+
+@app.route('/admin/api/rate-limit-stats')
+@login_required
+@admin_required
+def admin_rate_limit_stats():
+    """라우트(정책)별 요청 제한 거부 횟수 (모든 워커 합산)"""
+    conn = get_rate_limit_db()
+    rows = conn.execute("SELECT policy, count, last_rejected_at FROM rate_limit_rejections ORDER BY count DESC").fetchall()
+    rejections = {
+        policy: {
+            'count': count,
+            'last_rejected_at': datetime.datetime.fromtimestamp(last_rejected_at).strftime('%Y-%m-%d %H:%M:%S') if last_rejected_at else None
+        }
+        for policy, count, last_rejected_at in rows
+    }
+    return jsonify({'policies': RATE_LIMIT_POLICIES, 'rejections': rejections})
+
+@app.route('/admin/api/stream-stats')
+@login_required
+@admin_required
+def admin_stream_stats():
+    """현재 열려 있는 실시간 알림(SSE) 연결 수"""
+    return jsonify({
+        'connections': notification_channel.connection_count,
+        'users': len(notification_channel.clients),
+        'max_connections': notification_channel.max_streams,
+        'max_connections_per_user': notification_channel.max_streams_per_user
+    })
+
+@app.route('/admin/api/content-worker-stats')
+@login_required
+@admin_required
+def admin_content_worker_stats():
+    """글 본문 검증/정제 워커 풀의 대기열 길이와 처리 시간"""
+    stats = dict(content_worker_stats)
+    completed = stats['completed'] or 1
+    stats.update({
+        'workers': CONTENT_WORKERS,
+        'max_pending_allowed': CONTENT_WORKER_MAX_PENDING,
+        'queued': max(0, stats['pending'] - CONTENT_WORKERS),
+        'avg_wait_ms': round(stats['total_wait_ms'] / completed, 2),
+        'avg_run_ms': round(stats['total_run_ms'] / completed, 2),
+    })
+    return jsonify(stats)
 
 # Riro Auth
 @app.route('/riro-auth', methods=['GET', 'POST'])
@@ -1320,7 +3261,7 @@ def riro_auth():
 
 
 @app.route('/riro-reauth', methods=['GET', 'POST'])
-@rate_limit(limit=5, window_seconds=600)
+@rate_limit('riro_reauth')
 @login_required
 def riro_reauth():
     if request.method == 'POST':
@@ -1369,7 +3310,7 @@ def riro_reauth():
 
 # Check duplicate
 @app.route('/check-register/', methods=['POST'])
-@rate_limit(limit=20, window_seconds=60)
+@rate_limit('check_register')
 def check_register():
     conn = get_db()
     data = request.get_json()
@@ -1382,8 +3323,7 @@ def check_register():
 
     cursor = conn.cursor()
 
-    cursor.execute('SELECT COUNT(*) FROM users WHERE login_id = ?', (id,))
-    count_id = cursor.fetchone()[0]
+    count_id = 1 if is_login_id_taken(cursor, id) else 0
 
     cursor.execute('SELECT COUNT(*) FROM users WHERE nickname = ?', (nick,))
     count_nickname = cursor.fetchone()[0]
@@ -1428,7 +3368,7 @@ def yakgwan():
 
 # Register
 @app.route('/register', methods=['GET', 'POST'])
-@rate_limit(limit=5, window_seconds=600)
+@rate_limit('register')
 def register():
     if 'user_id' in session:
         return redirect("/")
@@ -1477,8 +3417,7 @@ def register():
 
         cursor = conn.cursor()
 
-        cursor.execute('SELECT COUNT(*) FROM users WHERE login_id = ?', (id,))
-        count_id = cursor.fetchone()[0]
+        count_id = 1 if is_login_id_taken(cursor, id) else 0
 
         cursor.execute('SELECT COUNT(*) FROM users WHERE nickname = ?', (nick,))
         count_nickname = cursor.fetchone()[0]
@@ -1500,7 +3439,7 @@ def register():
         if len(id) <= 2 or len(id) >= 20:
             return Response('<script> alert("아이디는 2자 이상 20자 이하로 입력해야 합니다."); history.back(); </script>')
         
-        hashed_pw = bcrypt.generate_password_hash(pw).decode('utf-8')
+        hashed_pw = hash_password(pw)
         join_date = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         default_profile = 'images/profiles/default_image.jpeg'
         
@@ -1518,6 +3457,7 @@ def register():
             (hakbun, gen, name, hashed_pw, id, nick, birth, default_profile, join_date, join_date)
         )
         conn.commit()
+        add_nickname_suggestion(nick)
 
         session.pop('hakbun', None)
         session.pop('name', None)
@@ -1532,7 +3472,7 @@ def register():
 
 # login
 @app.route('/login', methods=['GET', 'POST'])
-@rate_limit(limit=10, window_seconds=600)
+@rate_limit('login')
 def login():
     if 'user_id' in session:
         return redirect("/")
@@ -1548,7 +3488,12 @@ def login():
         cursor.execute('SELECT login_id, pw FROM users WHERE login_id = ?', (login_id,))
         user = cursor.fetchone() # (id, pw_hash) or None
 
-        if user and bcrypt.check_password_hash(user[1], password):
+        if user and verify_password(user[1], password):
+            # cost 설정이 바뀌었으면 평문을 알고 있는 지금 재해시
+            if password_needs_rehash(user[1]):
+                cursor.execute('UPDATE users SET pw = ? WHERE login_id = ?', (hash_password(password), user[0]))
+                conn.commit()
+
             session.pop('hakbun', None)
             session.pop('name', None)
             session.pop('gen', None)
@@ -1558,22 +3503,11 @@ def login():
             session['user_id'] = user[0]
 
             if remember:
-                token = secrets.token_hex(32)
-                hashed_token = hashlib.sha256(token.encode()).hexdigest()
-
-                cursor.execute('UPDATE users SET autologin_token = ? WHERE login_id = ?', (hashed_token, user[0]))
+                # 기기마다 별도 토큰을 발급하므로 다른 기기의 자동 로그인은 유지됨
+                token = issue_auth_token(cursor, user[0])
                 conn.commit()
 
-                resp = make_response(redirect("/"))
-                resp.set_cookie(
-                    'remember_token',
-                    token,
-                    max_age=datetime.timedelta(days=90),
-                    httponly=True,
-                    secure=True,
-                    samesite='Lax'
-                )
-                return resp
+                return set_auth_token_cookie(make_response(redirect("/")), token)
 
             return redirect("/")
         else:
@@ -1789,7 +3723,7 @@ def find_password_reset():
         # 비밀번호 업데이트
         conn = get_db()
         cursor = conn.cursor()
-        hashed_password = bcrypt.generate_password_hash(new_password).decode('utf-8')
+        hashed_password = hash_password(new_password)
         
         cursor.execute('UPDATE users SET pw = ? WHERE login_id = ?', 
                       (hashed_password, session['find_pw_login_id']))
@@ -1818,8 +3752,8 @@ def logout():
     if 'user_id' in session: # 로그인 상태인지 확인
         conn = get_db()
         cursor = conn.cursor()
-        # DB에서 자동 로그인 토큰 무효화
-        cursor.execute('UPDATE users SET autologin_token = NULL WHERE login_id = ?', (session['user_id'],))
+        # DB에서 현재 기기의 자동 로그인 토큰 무효화
+        revoke_auth_token(cursor, request.cookies.get('remember_token'))
         conn.commit()
 
     session.clear()
@@ -1829,12 +3763,86 @@ def logout():
     
     return resp
 
+# User Activity Feeds
+ACTIVITY_PAGE_SIZE = 20
+
+
+def format_activity_cursor(row):
+    """keyset 페이지네이션 커서: 마지막 행의 (updated_at, id)"""
+    return f"{row['updated_at']}|{row['id']}"
+
+
+def parse_activity_cursor(value):
+    """'YYYY-MM-DD HH:MM:SS|id' 커서를 (updated_at, id)로. 형식이 틀리면 None"""
+    if not value:
+        return None
+    updated_at, _, row_id = value.rpartition('|')
+    try:
+        parse_db_datetime(updated_at)
+        return updated_at, int(row_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_user_posts_page(cursor, author_id, before=None, limit=ACTIVITY_PAGE_SIZE, include_anonymous=False):
+    """
+    사용자의 글을 (updated_at, id) 내림차순으로 limit개 가져옵니다. before 보다 오래된 것만(keyset),
+    OFFSET 없이 posts(author, updated_at) 인덱스 범위 검색. 반환값은 (행 목록, 다음 커서 또는 None)
+    """
+    conditions = ["p.author = ?"]
+    params = [author_id]
+    if not include_anonymous:
+        conditions.append("p.board_id != ?")
+        params.append(ANONYMOUS_BOARD_ID)
+    if before:
+        conditions.append("(p.updated_at, p.id) < (?, ?)")
+        params.extend(before)
+    cursor.execute(f"""
+        SELECT p.id, p.title, p.comment_count, p.updated_at, p.board_id
+        FROM posts p
+        WHERE {' AND '.join(conditions)}
+        ORDER BY p.updated_at DESC, p.id DESC
+        LIMIT ?
+    """, (*params, limit + 1))
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = format_activity_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    for row in rows:
+        board = get_board(row['board_id'])
+        row['board_name'] = board['board_name'] if board else ''
+    return rows, next_cursor
+
+
+def fetch_user_comments_page(cursor, author_id, before=None, limit=ACTIVITY_PAGE_SIZE, include_anonymous=False):
+    """사용자의 댓글을 fetch_user_posts_page와 같은 방식으로 가져옵니다. comments(author, updated_at) 인덱스 사용"""
+    conditions = ["c.author = ?"]
+    params = [author_id]
+    if not include_anonymous:
+        conditions.append("p.board_id != ?")
+        params.append(ANONYMOUS_BOARD_ID)
+    if before:
+        conditions.append("(c.updated_at, c.id) < (?, ?)")
+        params.extend(before)
+    cursor.execute(f"""
+        SELECT c.id, c.content, c.post_id, c.updated_at, p.title AS post_title
+        FROM comments c
+        JOIN posts p ON c.post_id = p.id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY c.updated_at DESC, c.id DESC
+        LIMIT ?
+    """, (*params, limit + 1))
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    next_cursor = format_activity_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
 # My Page
 @app.route('/mypage')
 @login_required
 def mypage():
-    # g.user 객체를 통해 사용자 정보를 가져오므로, 추가적인 DB 조회가 불필요합니다.
-    user_data = g.user 
+    # 생일/가입일/동아리/소개글 등은 g.user(좁은 캐시 컬럼)에 없으므로 전체 행을 한 번 조회합니다.
+    user_data = fetch_user_profile(session['user_id']) if g.user else None
 
     if not user_data:
         # 세션은 있지만 DB에 유저가 없는 예외적인 경우
@@ -1845,31 +3853,9 @@ def mypage():
     conn.row_factory = sqlite3.Row 
     cursor = conn.cursor()
 
-    # --- 1. 사용자 게시글 목록 조회 (N+1 문제 해결) ---
-    # JOIN을 사용하여 한 번의 쿼리로 게시글 정보와 게시판 이름을 함께 가져옵니다.
-    posts_query = """
-        SELECT 
-            p.id, p.title, p.comment_count, p.updated_at, b.board_name
-        FROM posts p
-        JOIN board b ON p.board_id = b.board_id
-        WHERE p.author = ?
-        ORDER BY p.updated_at DESC
-    """
-    cursor.execute(posts_query, (session['user_id'],))
-    user_posts = cursor.fetchall()
-
-    # --- 2. 사용자 댓글 목록 조회 (N+1 문제 해결) ---
-    # JOIN을 사용하여 한 번의 쿼리로 댓글 정보와 원본 게시글 제목을 함께 가져옵니다.
-    comments_query = """
-        SELECT 
-            c.content, c.post_id, c.updated_at, p.title AS post_title
-        FROM comments c
-        JOIN posts p ON c.post_id = p.id
-        WHERE c.author = ?
-        ORDER BY c.updated_at DESC
-    """
-    cursor.execute(comments_query, (session['user_id'],))
-    user_comments = cursor.fetchall()
+    # 활동 내역은 첫 페이지만 서버에서 렌더링하고 나머지는 /api/activity/* 로 무한 스크롤
+    user_posts, posts_cursor = fetch_user_posts_page(cursor, session['user_id'], include_anonymous=True)
+    user_comments, comments_cursor = fetch_user_comments_page(cursor, session['user_id'], include_anonymous=True)
     
     # 날짜 형식 변환
     birth = user_data['birth']
@@ -1879,7 +3865,7 @@ def mypage():
     formatted_birth = f'{birth_year}.{birth_month}.{birth_day}'
 
     join_date = user_data['join_date']
-    datetime_obj = datetime.datetime.strptime(join_date, '%Y-%m-%d %H:%M:%S')
+    datetime_obj = parse_db_datetime(join_date)
     formatted_join_date = datetime_obj.strftime('%Y.%m.%d')
 
     return render_template('my_page.html', 
@@ -1898,6 +3884,8 @@ def mypage():
                            point=user_data['point'], 
                            user_posts=user_posts, 
                            user_comments=user_comments,
+                           posts_cursor=posts_cursor,
+                           comments_cursor=comments_cursor,
                            academic_clubs=ACADEMIC_CLUBS,
                            hobby_clubs=HOBBY_CLUBS,
                            career_clubs=CAREER_CLUBS
@@ -1905,7 +3893,7 @@ def mypage():
 
 # Post Write
 @app.route('/post-write', methods=['GET', 'POST'])
-@rate_limit(limit=10, window_seconds=600)
+@rate_limit('post_write')
 @check_banned
 def post_write():
     conn = get_db()
@@ -1934,13 +3922,12 @@ def post_write():
         if not board_id:
              return Response('<script>alert("게시판을 선택해주세요."); history.back();</script>')
         
-        cursor.execute("SELECT is_public FROM board WHERE board_id = ?", (board_id,))
-        board = cursor.fetchone()
+        board = get_board(board_id)
 
         if not board:
             return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
 
-        is_public_board = board[0] == 1
+        is_public_board = board['is_public'] == 1
 
         # 비회원이 비공개 게시판에 쓰려고 할 때 차단
         if not g.user and not is_public_board:
@@ -1973,35 +3960,29 @@ def post_write():
         if not title or not content or not board_id:
             return Response('<script>alert("게시판, 제목, 내용을 모두 입력해주세요."); history.back();</script>')
         
-        is_valid_size, img_idx = check_content_image_size(content)
-        if not is_valid_size:
+        media_error = get_post_media_error()
+        if media_error:
+            return Response(f'<script>alert("{media_error}"); history.back();</script>')
+
+        analyzed = run_content_task(analyze_post_content, content, True, g.get('post_media_sizes', ()))
+        img_idx = analyzed['image_error']
+        if img_idx is not None:
             if img_idx == -1:
                 return Response('<script>alert("총 이미지 용량이 25MB를 초과합니다."); history.back();</script>')
             else:
                 return Response(f'<script>alert("{img_idx}번째 이미지의 용량이 5MB를 초과합니다."); history.back();</script>')
 
-        cursor.execute("SELECT COUNT(*) FROM board WHERE board_id = ?", (board_id,))
-        if cursor.fetchone()[0] == 0:
-            return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
-
-        cursor.execute("SELECT COUNT(*) FROM board WHERE board_id = ?", (board_id,))
-        if cursor.fetchone()[0] == 0:
-            return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
-
-        plain_text_content = bleach.clean(content, tags=[], strip=True)
-        if len(plain_text_content) > MAX_POST_CONTENT_CHARS:
+        if analyzed['plain_length'] > MAX_POST_CONTENT_CHARS:
             return Response('<script>alert("글자 수는 5,000자를 초과할 수 없습니다."); history.back();</script>')
         if len(title) > 50:
             return Response('<script>alert("제목은 50자를 초과할 수 없습니다."); history.back();</script>')
-        if len(plain_text_content) == 0:
+        if analyzed['plain_length'] == 0:
             return Response('<script>alert("내용을 입력해주세요."); history.back();</script>')
 
-        sanitized_content = sanitize_rich_content(content)
-
-        if sanitized_content.count('<img') > MAX_POST_IMAGES:
+        if analyzed['image_count'] > MAX_POST_IMAGES:
             return Response('<script>alert("이미지는 최대 5개까지 첨부할 수 있습니다."); history.back();</script>')
 
-        final_content = sanitized_content
+        final_content = analyzed['sanitized']
 
         # 4. 데이터베이스에 저장
         try:
@@ -2027,9 +4008,11 @@ def post_write():
 
             cursor.execute("UPDATE users SET post_count = post_count + 1 WHERE login_id = ?", (author_id,))
 
-            update_exp_level(author_id, 50)
+            update_exp_level(author_id, POST_EXP_REWARD)
 
             conn.commit()
+            publish_post_media(final_content)
+            add_post_suggestion(post_id, title)
 
             add_log('CREATE_POST', author_id, f"'{title}' 글 작성(id : {post_id}). 내용 : {final_content}")
 
@@ -2048,8 +4031,7 @@ def post_write():
                 # 비회원이 board_id 없이 /post-write에 접근하면 로그인 페이지로
                 return redirect(url_for('login'))
                 
-            cursor.execute("SELECT board_name, is_public FROM board WHERE board_id = ?", (requested_board_id,))
-            board = cursor.fetchone()
+            board = get_board(requested_board_id)
             
             if not board:
                 return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
@@ -2063,20 +4045,17 @@ def post_write():
 
         else: # 로그인한 회원인 경우
             # 기존 로직대로 게시판 목록을 전달
-            cursor.execute("SELECT board_id, board_name FROM board ORDER BY board_id")
-            boards = cursor.fetchall()
-            return render_template('post_write.html', boards=boards)
+            return render_template('post_write.html', boards=get_boards())
 
 @app.route('/post-write-guest/<int:board_id>', methods=['GET', 'POST'])
-@rate_limit(limit=5, window_seconds=600)
+@rate_limit('post_write_guest')
 def post_write_guest(board_id):
     conn = get_db()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
     # 1. 해당 게시판 정보 확인
-    cursor.execute("SELECT board_name, is_public FROM board WHERE board_id = ?", (board_id,))
-    board = cursor.fetchone()
+    board = get_board(board_id)
 
     if not board:
         return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
@@ -2105,16 +4084,20 @@ def post_write_guest(board_id):
         if len(guest_password) < 4:
             return Response('<script>alert("비밀번호는 4자 이상이어야 합니다."); history.back();</script>')
 
-        plain_text_content = bleach.clean(content, tags=[], strip=True)
-        if len(plain_text_content) > MAX_POST_CONTENT_CHARS or len(title) > 50 or len(plain_text_content) == 0:
+        media_error = get_post_media_error()
+        if media_error:
+            return Response(f'<script>alert("{media_error}"); history.back();</script>')
+
+        analyzed = run_content_task(analyze_post_content, content, False)
+        if analyzed['sanitized'] is None or len(title) > 50:
             return Response('<script>alert("제목(50자) 또는 내용(5000자) 길이를 확인해주세요."); history.back();</script>')
 
         # 6. 비밀번호 해시
-        hashed_pw = bcrypt.generate_password_hash(guest_password).decode('utf-8')
+        hashed_pw = hash_guest_password(guest_password)
 
-        sanitized_content = sanitize_rich_content(content)
+        sanitized_content = analyzed['sanitized']
 
-        if sanitized_content.count('<img') > MAX_POST_IMAGES:
+        if analyzed['image_count'] > MAX_POST_IMAGES:
             return Response('<script>alert("이미지는 최대 5개까지 첨부할 수 있습니다."); history.back();</script>')
 
         # 8. DB에 저장
@@ -2132,8 +4115,10 @@ def post_write_guest(board_id):
                 guest_nickname, hashed_pw
             ))
             conn.commit()
+            publish_post_media(sanitized_content)
 
             post_id = cursor.lastrowid
+            add_post_suggestion(post_id, title)
             add_log('CREATE_GUEST_POST', session.get('guest_session_id', 'Guest'), f"'{title}' 글 작성(id : {post_id}) by {guest_nickname}")
 
             return redirect(url_for('post_list', board_id=board_id))
@@ -2160,9 +4145,8 @@ def post_list(board_id, page):
     is_bot = getattr(g, 'is_googlebot', False)
 
     try:
-        # ▼▼▼ [수정] board_name 대신 is_public을 포함한 모든 정보를 가져옵니다. ▼▼▼
-        cursor.execute("SELECT board_name, is_public FROM board WHERE board_id = ?", (board_id,))
-        board = cursor.fetchone()
+        # ▼▼▼ [수정] board_name 대신 is_public을 포함한 모든 정보를 가져옵니다. (메모리 레지스트리) ▼▼▼
+        board = get_board(board_id)
 
         if not board:
             return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
@@ -2175,10 +4159,10 @@ def post_list(board_id, page):
         # 2. 공지사항 목록 조회 (is_notice = 1) - 쿼리 수정
         notice_query = """
             SELECT
-                p.id, p.title, u.nickname, p.updated_at, p.view_count, p.target_grade,
+                p.id, p.title, COALESCE(u.nickname, '탈퇴한 사용자') AS nickname, p.updated_at, p.view_count, p.target_grade,
                 SUM(CASE WHEN r.reaction_type = 'like' THEN 1 WHEN r.reaction_type = 'dislike' THEN -1 ELSE 0 END) as net_reactions
             FROM posts p
-            JOIN users u ON p.author = u.login_id
+            LEFT JOIN users u ON p.author = u.login_id
             LEFT JOIN reactions r ON r.target_id = p.id AND r.target_type = 'post'
             WHERE p.board_id = ? AND p.is_notice = 1
             GROUP BY p.id
@@ -2196,10 +4180,11 @@ def post_list(board_id, page):
         offset = (page - 1) * posts_per_page
         posts_query = """
             SELECT
-                p.id, p.title, p.comment_count, p.updated_at, p.view_count, u.nickname, p.target_grade,
+                p.id, p.title, p.comment_count, p.updated_at, p.view_count,
+                COALESCE(u.nickname, '탈퇴한 사용자') AS nickname, p.target_grade,
                 SUM(CASE WHEN r.reaction_type = 'like' THEN 1 WHEN r.reaction_type = 'dislike' THEN -1 ELSE 0 END) as net_reactions
             FROM posts p
-            JOIN users u ON p.author = u.login_id
+            LEFT JOIN users u ON p.author = u.login_id
             LEFT JOIN reactions r ON r.target_id = p.id AND r.target_type = 'post'
             WHERE p.board_id = ? AND p.is_notice = 0
             GROUP BY p.id
@@ -2238,46 +4223,41 @@ def post_detail(post_id):
 
     try:
         # --- ▼▼▼ [수정] 게시글 정보 조회 시 board의 is_public 컬럼도 함께 조회합니다. ▼▼▼ ---
+        # 게시판 이름/공개 여부는 메모리 레지스트리에서 가져오므로 board 테이블은 JOIN 하지 않습니다.
         query = """
-            SELECT p.*, u.nickname, u.profile_image, b.board_name, b.is_public
+            SELECT p.*, COALESCE(u.nickname, '탈퇴한 사용자') AS nickname,
+                   COALESCE(u.profile_image, 'images/profiles/default_image.jpeg') AS profile_image
             FROM posts p
-            JOIN users u ON p.author = u.login_id
-            JOIN board b ON p.board_id = b.board_id
+            LEFT JOIN users u ON p.author = u.login_id
             WHERE p.id = ?
         """
         # --- ▲▲▲ [수정] ---
         cursor.execute(query, (post_id,))
         post_data = cursor.fetchone()
+        board = get_board(post_data['board_id']) if post_data else None
 
-        if not post_data:
+        if not post_data or not board:
             return Response('<script>alert("존재하지 않거나 삭제된 게시글입니다."); history.back();</script>')
     
-        is_public_board = post_data['is_public'] == 1
+        is_public_board = board['is_public'] == 1
 
         # ▼▼▼ [추가] 공개 게시판이 아닐 경우에만 로그인을 확인합니다. ▼▼▼
-        if not post_data['is_public'] and not user_data and not is_bot:
+        if not board['is_public'] and not user_data and not is_bot:
             return Response('<script> alert("로그인 사용자만 접근할 수 있습니다."); history.back(); </script>')
         # ▲▲▲ [추가] ▲▲▲
 
         post = dict(post_data)
+        post['board_name'] = board['board_name']
+        post['is_public'] = board['is_public']
+        post['content'] = render_post_media(cursor, post['content'])
 
         if post['target_grade'] > 0:
             if not g.user:
                 return Response('<script>alert("로그인이 필요한 글입니다."); location.href="/login";</script>')
             
-            # 관리자(admin) 프리패스
-            is_admin = g.user['role'] == 'admin'
-            # 작성자 본인 프리패스
-            is_author = g.user['login_id'] == post['author']
-            
-            if not is_admin and not is_author:
-                try:
-                    user_grade = int(g.user['gen'])
-                except (ValueError, IndexError, KeyError):
-                    user_grade = 0
-                
-                if user_grade != post['target_grade']:
-                    return Response(f'<script>alert("{post["target_grade"]}기 학생만 조회할 수 있는 글입니다."); history.back();</script>')
+            # 관리자/작성자 본인/같은 기수만 열람 가능 (검색 미리보기도 같은 규칙을 씀)
+            if not can_view_target_grade(g.user, post['target_grade'], post['author']):
+                return Response(f'<script>alert("{post["target_grade"]}기 학생만 조회할 수 있는 글입니다."); history.back();</script>')
         
         # --- ▼ [수정] 익명 게시판 처리를 위해 원본 작성자 ID와 게시판 ID 저장 ---
         post_author_id = post['author'] 
@@ -2332,8 +4312,8 @@ def post_detail(post_id):
             post['nickname'] = post['guest_nickname'] # 게스트 닉네임 사용
             post['profile_image'] = 'images/profiles/default_image.jpeg'
 
-        post['created_at_datetime'] = datetime.datetime.strptime(post['created_at'], '%Y-%m-%d %H:%M:%S')
-        post['updated_at_datetime'] = datetime.datetime.strptime(post['updated_at'], '%Y-%m-%d %H:%M:%S')
+        post['created_at_datetime'] = parse_db_datetime(post['created_at'])
+        post['updated_at_datetime'] = parse_db_datetime(post['updated_at'])
 
         user_id_for_reaction = None
         if g.user:
@@ -2366,9 +4346,10 @@ def post_detail(post_id):
 
         # --- ▼ [수정] 댓글 로직 수정 (정렬 순서 변경 및 익명 처리) ---
         comment_query = """
-            SELECT c.*, u.nickname, u.profile_image
+            SELECT c.*, COALESCE(u.nickname, '탈퇴한 사용자') AS nickname,
+                   COALESCE(u.profile_image, 'images/profiles/default_image.jpeg') AS profile_image
             FROM comments c
-            JOIN users u ON c.author = u.login_id
+            LEFT JOIN users u ON c.author = u.login_id
             WHERE c.post_id = ?
             ORDER BY c.created_at ASC
         """
@@ -2386,7 +4367,14 @@ def post_detail(post_id):
             cursor.execute(f"SELECT code, image_path FROM etacons WHERE code IN ({placeholders})", list(etacon_codes))
             for code, path in cursor.fetchall():
                 etacon_map[code] = path
-        
+
+        # 패키지별 스프라이트 시트가 있으면 개별 이미지 대신 스프라이트 좌표로 렌더링
+        etacon_sprite_map = {}
+        for code in etacon_codes:
+            sprite = get_etacon_sprite_ref(load_etacon_sprite_manifest(parse_etacon_pack_id(code)), code)
+            if sprite:
+                etacon_sprite_map[code] = sprite
+
         # 1. 모든 댓글을 딕셔너리로 변환하고, 'replies' 리스트와 reaction 정보를 초기화합니다.
         for comment_row in all_comments:
             comment = dict(comment_row)
@@ -2396,6 +4384,7 @@ def post_detail(post_id):
                 comment['etacon_path'] = etacon_map[comment['etacon_code']]
             else:
                 comment['etacon_path'] = None
+            comment['etacon_sprite'] = etacon_sprite_map.get(comment['etacon_code'])
 
             if board_id == 3:
                 seq = comment.get('anonymous_seq', 0)
@@ -2446,7 +4435,7 @@ def post_detail(post_id):
 
 # Post Edit
 @app.route('/post-edit/<int:post_id>', methods=['GET', 'POST'])
-@rate_limit(limit=15, window_seconds=600)
+@rate_limit('post_edit')
 @login_required
 @check_banned
 def post_edit(post_id):
@@ -2482,45 +4471,48 @@ def post_edit(post_id):
         if not title or not content or not board_id:
             return Response('<script>alert("게시판, 제목, 내용을 모두 입력해주세요."); history.back();</script>')
         
-        is_valid_size, img_idx = check_content_image_size(content)
-        if not is_valid_size:
+        # board_id가 실제로 존재하는지 확인
+        if not get_board(board_id):
+            return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
+
+        media_error = get_post_media_error()
+        if media_error:
+            return Response(f'<script>alert("{media_error}"); history.back();</script>')
+
+        analyzed = run_content_task(analyze_post_content, content, True, g.get('post_media_sizes', ()))
+        img_idx = analyzed['image_error']
+        if img_idx is not None:
             if img_idx == -1:
                 return Response('<script>alert("총 이미지 용량이 25MB를 초과합니다."); history.back();</script>')
             else:
                 return Response(f'<script>alert("{img_idx}번째 이미지의 용량이 5MB를 초과합니다."); history.back();</script>')
-        
-        # board_id가 실제 DB에 존재하는지 확인
-        cursor.execute("SELECT COUNT(*) FROM board WHERE board_id = ?", (board_id,))
-        if cursor.fetchone()[0] == 0:
-            return Response('<script>alert("존재하지 않는 게시판입니다."); history.back();</script>')
 
-        plain_text_content = bleach.clean(content, tags=[], strip=True)
-        if len(plain_text_content) > MAX_POST_CONTENT_CHARS:
+        if analyzed['plain_length'] > MAX_POST_CONTENT_CHARS:
             return Response('<script>alert("글자 수는 5,000자를 초과할 수 없습니다."); history.back();</script>')
         if len(title) > 50:
             return Response('<script>alert("제목은 50자를 초과할 수 없습니다."); history.back();</script>')
-        if len(plain_text_content) == 0:
+        if analyzed['plain_length'] == 0:
             return Response('<script>alert("내용을 입력해주세요."); history.back();</script>')
 
-        sanitized_content = sanitize_rich_content(content)
-
-        if sanitized_content.count('<img') > MAX_POST_IMAGES:
+        if analyzed['image_count'] > MAX_POST_IMAGES:
             return Response('<script>alert("이미지는 최대 5개까지 첨부할 수 있습니다."); history.back();</script>')
 
-        final_content = sanitized_content
+        final_content = analyzed['sanitized']
 
         updated_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         query = "UPDATE posts SET board_id = ?, title = ?, content = ?, updated_at = ?, is_notice = ? WHERE id = ?"
         cursor.execute(query, (board_id, title, final_content, updated_at, is_notice, post_id))
+        release_post_media(cursor, post['content'], final_content)
 
         add_log('EDIT_POST', session['user_id'], f"게시글 (id : {post_id})를 수정했습니다. 제목 : {title} 내용 : {final_content}")
 
         conn.commit()
+        publish_post_media(final_content)
+        add_post_suggestion(post_id, title)
 
         return redirect(url_for('post_detail', post_id=post_id))
     else: # GET 요청
-        cursor.execute("SELECT board_id, board_name FROM board ORDER BY board_id")
-        boards = cursor.fetchall()
+        boards = get_boards()
         
         # --- [누락된 코드 추가] ---
         # 수정 폼 진입 시, 텍스트 코드를 이미지로 변환하여 에디터에 표시
@@ -2531,6 +4523,47 @@ def post_edit(post_id):
         return render_template('post_edit.html', post=post_dict, boards=boards)
 
 # Post Delete
+def delete_post_cascade(cursor, post_id):
+    """
+    게시글과 딸린 투표·댓글·반응·알림을 커밋 없이 삭제하고(본문 이미지는 release_post_media로 정리 대상이 됨), 댓글 작성자별 comment_count를 한 번에 차감합니다.
+    댓글 id를 파이썬으로 가져와 IN (...) 목록을 만들지 않으므로 SQLite 변수 개수 제한에 걸리지 않습니다.
+    게시글 작성자의 post_count/경험치 처리는 호출한 쪽의 몫입니다.
+    읽지 않은 알림이 지워진 사용자 목록을 반환하므로, 커밋 후 notification_channel.forget_unread_counts()에 넘겨야 합니다.
+    """
+    cursor.execute("DELETE FROM poll_history WHERE poll_id IN (SELECT id FROM polls WHERE post_id = ?)", (post_id,))
+    cursor.execute("DELETE FROM poll_options WHERE poll_id IN (SELECT id FROM polls WHERE post_id = ?)", (post_id,))
+    cursor.execute("DELETE FROM polls WHERE post_id = ?", (post_id,))
+
+    cursor.execute("""
+        DELETE FROM reactions
+        WHERE target_type = 'comment' AND target_id IN (SELECT id FROM comments WHERE post_id = ?)
+    """, (post_id,))
+
+    # 작성자별 그룹 차감 (게스트 댓글은 카운트 대상이 아님)
+    cursor.execute("""
+        UPDATE users
+        SET comment_count = comment_count - (
+            SELECT COUNT(*) FROM comments c WHERE c.post_id = ? AND c.author = users.login_id
+        )
+        WHERE login_id IN (SELECT DISTINCT author FROM comments WHERE post_id = ? AND author != ?)
+    """, (post_id, post_id, GUEST_USER_ID))
+
+    cursor.execute("DELETE FROM reactions WHERE target_type = 'post' AND target_id = ?", (post_id,))
+
+    # 삭제된 글을 가리키는 알림은 열 수 없으므로 함께 지움
+    cursor.execute("SELECT DISTINCT recipient_id FROM notifications WHERE post_id = ? AND is_read = 0", (post_id,))
+    unread_recipients = [row[0] for row in cursor.fetchall()]
+    cursor.execute("DELETE FROM notifications WHERE post_id = ?", (post_id,))
+
+    cursor.execute("SELECT content FROM posts WHERE id = ?", (post_id,))
+    row = cursor.fetchone()
+    if row:
+        release_post_media(cursor, row[0])
+
+    cursor.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
+    cursor.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+    return unread_recipients
+
 @app.route('/post-delete/<int:post_id>', methods=['POST'])
 @login_required
 @check_banned
@@ -2552,56 +4585,18 @@ def post_delete(post_id):
         return Response('<script>alert("삭제 권한이 없습니다."); history.back();</script>')
 
     try:
-        # --- 👇 로직 수정 시작 ---
-        cursor.execute("SELECT id FROM polls WHERE post_id = ?", (post_id,))
-        poll = cursor.fetchone()
-        
-        if poll:
-            poll_id = poll['id']
-            cursor.execute("DELETE FROM poll_history WHERE poll_id = ?", (poll_id,))
-            cursor.execute("DELETE FROM poll_options WHERE poll_id = ?", (poll_id,))
-            cursor.execute("DELETE FROM polls WHERE id = ?", (poll_id,))
-
-        # 1. 삭제될 댓글들의 ID와 작성자 정보를 미리 조회합니다.
-        cursor.execute("SELECT id, author FROM comments WHERE post_id = ?", (post_id,))
-        comments = cursor.fetchall()
-        
-        if comments:
-            comment_ids = [c['id'] for c in comments]
-            
-            # 2. 댓글들의 reaction을 먼저 삭제합니다.
-            placeholders = ', '.join('?' for _ in comment_ids)
-            cursor.execute(f"DELETE FROM reactions WHERE target_type = 'comment' AND target_id IN ({placeholders})", comment_ids)
-
-            # 3. 각 댓글 작성자별로 댓글 수를 차감합니다.
-            comment_authors_counts = {}
-            for c in comments:
-                author = c['author']
-                comment_authors_counts[author] = comment_authors_counts.get(author, 0) + 1
-            
-            for author, count in comment_authors_counts.items():
-                cursor.execute("UPDATE users SET comment_count = comment_count - ? WHERE login_id = ?", (count, author))
-
-        # 4. 게시글 자체의 reaction을 삭제합니다.
-        cursor.execute("DELETE FROM reactions WHERE target_type = 'post' AND target_id = ?", (post_id,))
-        
-        # 5. 해당 게시글의 댓글들을 모두 삭제합니다.
-        cursor.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
+        # 투표/댓글/반응/게시글을 집합 단위 SQL로 삭제 (댓글 수와 무관하게 문장 수 고정)
+        notification_recipients = delete_post_cascade(cursor, post_id)
 
-        # 6. 게시글을 삭제합니다.
-        cursor.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-
-        # 7. 게시글 작성자의 post_count를 1 감소시킵니다.
+        # 게시글 작성자의 post_count와 경험치를 차감합니다.
         cursor.execute("UPDATE users SET post_count = post_count - 1 WHERE login_id = ?", (post['author'],))
-        
-        # 8. 경험치를 차감합니다.
-        update_exp_level(post['author'], -50, False)
-
-        # --- 👆 로직 수정 끝 ---
+        update_exp_level(post['author'], -POST_EXP_REWARD, False)
 
         add_log('DELETE_POST', session['user_id'], f"게시글 (id : {post_id})를 삭제했습니다. 제목 : {post['title']}")
         
         conn.commit()
+        notification_channel.forget_unread_counts(*notification_recipients)
+        remove_post_suggestion(post_id)
 
     except Exception as e:
         print(f"Error during post deletion: {e}")
@@ -2613,7 +4608,7 @@ def post_delete(post_id):
 
 # Comment Add
 @app.route('/comment/add/<int:post_id>', methods=['POST'])
-@rate_limit(limit=20, window_seconds=60)
+@rate_limit('add_comment')
 @check_banned
 def add_comment(post_id):
     content = request.form.get('comment_content')
@@ -2633,9 +4628,8 @@ def add_comment(post_id):
         if not post:
             return Response('<script>alert("원본 게시글이 존재하지 않습니다."); history.back();</script>')
             
-        cursor.execute("SELECT is_public FROM board WHERE board_id = ?", (post['board_id'],))
-        board = cursor.fetchone()
-        is_public_board = board['is_public'] == 1
+        board = get_board(post['board_id'])
+        is_public_board = bool(board) and board['is_public'] == 1
 
         author_id = None
         guest_nickname = None
@@ -2657,7 +4651,7 @@ def add_comment(post_id):
                 return Response('<script>alert("비밀번호는 4자 이상이어야 합니다."); history.back();</script>')
 
             author_id = GUEST_USER_ID
-            hashed_pw = bcrypt.generate_password_hash(guest_password).decode('utf-8')
+            hashed_pw = hash_guest_password(guest_password)
             log_user_id = session.get('guest_session_id', 'Guest')
         else:
             # 3. 비회원 + 비공개 게시판
@@ -2695,6 +4689,7 @@ def add_comment(post_id):
              guest_nickname, guest_password, anonymous_seq)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
+        notification = None
         
         if parent_comment_id:
             # --- 답글 로직 ---
@@ -2715,13 +4710,15 @@ def add_comment(post_id):
 
             # [수정] guest_nickname이 없는 (로그인한) 사용자에게만 알림
             if parent_comment['author'] != GUEST_USER_ID:
-                create_notification(
+                notification = build_notification(
                     recipient_id=parent_comment['author'],
                     actor_id=author_id, # 알림 행위자는 게스트일 수도, 회원일 수도 있음
                     action='reply',
                     target_type='comment',
                     target_id=parent_comment_id, 
-                    post_id=post_id
+                    post_id=post_id,
+                    board_id=post['board_id'],
+                    actor_nickname=g.user['nickname'] if g.user else None
                 )
         else:
             # --- 새 댓글 로직 ---
@@ -2732,13 +4729,15 @@ def add_comment(post_id):
             
             # [수정] guest_nickname이 없는 (로그인한) 사용자에게만 알림
             if post['author'] != GUEST_USER_ID:
-                create_notification(
+                notification = build_notification(
                     recipient_id=post['author'],
                     actor_id=author_id,
                     action='comment',
                     target_type='post',
                     target_id=post_id,
-                    post_id=post_id
+                    post_id=post_id,
+                    board_id=post['board_id'],
+                    actor_nickname=g.user['nickname'] if g.user else None
                 )
 
         # (게시글/사용자 댓글 수 업데이트)
@@ -2746,14 +4745,16 @@ def add_comment(post_id):
         
         if g.user: # 로그인한 사용자만 카운트 및 경험치
             cursor.execute("UPDATE users SET comment_count = comment_count + 1 WHERE login_id = ?", (author_id,))
-            update_exp_level(author_id, 10)
+            update_exp_level(author_id, COMMENT_EXP_REWARD)
 
         log_details = f"게시글(id:{post_id})에 댓글 작성. 내용:{final_content}"
         if parent_comment_id:
             log_details = f"댓글(id:{parent_comment_id})에 답글 작성. 내용:{final_content}"
         add_log('ADD_COMMENT', log_user_id, log_details)
 
+        pending_notifications = create_notifications(cursor, [notification])
         conn.commit()
+        publish_notifications(pending_notifications)
 
     except Exception as e:
         print(f"Database error while adding comment: {e}")
@@ -2763,7 +4764,7 @@ def add_comment(post_id):
     return redirect(url_for('post_detail', post_id=post_id))
 
 @app.route('/api/comment/etacon', methods=['POST'])
-@rate_limit(limit=20, window_seconds=60)
+@rate_limit('add_etacon_comment')
 @check_banned
 def add_etacon_comment():
     data = request.get_json()
@@ -2791,9 +4792,8 @@ def add_etacon_comment():
         if not post:
             return jsonify({'status': 'error', 'message': '게시글이 존재하지 않습니다.'}), 404
             
-        cursor.execute("SELECT is_public FROM board WHERE board_id = ?", (post['board_id'],))
-        board = cursor.fetchone()
-        is_public_board = board['is_public'] == 1
+        board = get_board(post['board_id'])
+        is_public_board = bool(board) and board['is_public'] == 1
 
         # 2. 작성자 정보 설정
         author_id = None
@@ -2821,7 +4821,7 @@ def add_etacon_comment():
                 return jsonify({'status': 'error', 'message': '비밀번호는 4자 이상이어야 합니다.'}), 400
             
             author_id = GUEST_USER_ID
-            hashed_pw = bcrypt.generate_password_hash(guest_password).decode('utf-8')
+            hashed_pw = hash_guest_password(guest_password)
             log_user_id = session.get('guest_session_id', 'Guest')
         else:
             return jsonify({'status': 'error', 'message': '로그인이 필요한 게시판입니다.'}), 403
@@ -2876,17 +4876,23 @@ def add_etacon_comment():
         elif post['author'] != GUEST_USER_ID:
             recipient_id = post['author']
         
+        pending_notifications = []
         if recipient_id:
-            create_notification(recipient_id, author_id, action, 'post', target_id, post_id)
+            pending_notifications = create_notifications(cursor, [build_notification(
+                recipient_id, author_id, action, 'post', target_id, post_id,
+                board_id=post['board_id'],
+                actor_nickname=g.user['nickname'] if g.user else None
+            )])
 
         # 6. 카운트 및 경험치
         cursor.execute("UPDATE posts SET comment_count = comment_count + 1 WHERE id = ?", (post_id,))
         if g.user:
             cursor.execute("UPDATE users SET comment_count = comment_count + 1 WHERE login_id = ?", (author_id,))
-            update_exp_level(author_id, 10)
+            update_exp_level(author_id, COMMENT_EXP_REWARD)
 
         add_log('ADD_ETACON', log_user_id, f"게시글(id:{post_id})에 인곽콘 댓글 작성.")
         conn.commit()
+        publish_notifications(pending_notifications)
         
         return jsonify({'status': 'success', 'message': '인곽콘이 등록되었습니다.'})
 
@@ -2916,37 +4922,38 @@ def delete_comment(comment_id):
         return Response('<script>alert("삭제 권한이 없습니다."); history.back();</script>')
 
     try:
-        # 3. 삭제할 대댓글(답글) 조회
-        cursor.execute("SELECT id, author FROM comments WHERE parent_comment_id = ?", (comment_id,))
-        replies = cursor.fetchall()
-
-        # 삭제 대상 ID 목록 생성 (본문 + 대댓글)
-        target_ids = [comment_id] + [r['id'] for r in replies]
-        
-        # SQL IN 절에 사용할 플레이스홀더 생성 (?, ?, ...)
-        placeholders = ','.join(['?'] * len(target_ids))
+        # 3. 삭제 대상(본 댓글 + 대댓글)의 작성자별 개수 집계
+        cursor.execute("""
+            SELECT author, COUNT(*) AS cnt FROM comments
+            WHERE id = ? OR parent_comment_id = ?
+            GROUP BY author
+        """, (comment_id, comment_id))
+        author_counts = {row['author']: row['cnt'] for row in cursor.fetchall()}
+        total_deleted_count = sum(author_counts.values())
+        reply_count = total_deleted_count - 1
 
         # 4. 연관된 Reaction(좋아요/싫어요) 일괄 삭제
-        cursor.execute(f"DELETE FROM reactions WHERE target_type = 'comment' AND target_id IN ({placeholders})", target_ids)
-
-        # 5. 사용자 스탯 업데이트 (삭제 대상 작성자들의 댓글 수 및 경험치 차감)
-        # 5-1. 본 댓글 작성자 차감
-        cursor.execute("UPDATE users SET comment_count = comment_count - 1 WHERE login_id = ?", (comment['author'],))
-        update_exp_level(comment['author'], -10) # 헬퍼 함수 사용
-
-        # 5-2. 대댓글 작성자들 차감
-        for reply in replies:
-            cursor.execute("UPDATE users SET comment_count = comment_count - 1 WHERE login_id = ?", (reply['author'],))
-            update_exp_level(reply['author'], -10)
+        cursor.execute("""
+            DELETE FROM reactions
+            WHERE target_type = 'comment'
+              AND target_id IN (SELECT id FROM comments WHERE id = ? OR parent_comment_id = ?)
+        """, (comment_id, comment_id))
+
+        # 5. 사용자 스탯 업데이트 (작성자별로 댓글 수와 경험치를 한 번에 차감, 게스트는 대상 아님)
+        author_counts.pop(GUEST_USER_ID, None)
+        cursor.executemany(
+            "UPDATE users SET comment_count = comment_count - ? WHERE login_id = ?",
+            [(count, author) for author, count in author_counts.items()]
+        )
+        update_exp_levels({author: -COMMENT_EXP_REWARD * count for author, count in author_counts.items()}, commit=False)
 
         # 6. 댓글 데이터 일괄 삭제
-        cursor.execute(f"DELETE FROM comments WHERE id IN ({placeholders})", target_ids)
+        cursor.execute("DELETE FROM comments WHERE id = ? OR parent_comment_id = ?", (comment_id, comment_id))
 
         # 7. 게시글의 전체 댓글 수 차감 (삭제된 총 개수만큼)
-        total_deleted_count = len(target_ids)
         cursor.execute("UPDATE posts SET comment_count = comment_count - ? WHERE id = ?", (total_deleted_count, comment['post_id']))
         
-        add_log('DELETE_COMMENT', session['user_id'], f"댓글 (id : {comment_id}) 및 대댓글 {len(replies)}개를 삭제했습니다. 내용 : {comment['content']}")
+        add_log('DELETE_COMMENT', session['user_id'], f"댓글 (id : {comment_id}) 및 대댓글 {reply_count}개를 삭제했습니다. 내용 : {comment['content']}")
         
         conn.commit()
     except Exception as e:
@@ -2959,7 +4966,7 @@ def delete_comment(comment_id):
 
 # Comment Edit
 @app.route('/comment/edit/<int:comment_id>', methods=['POST'])
-@rate_limit(limit=20, window_seconds=120)
+@rate_limit('edit_comment')
 @login_required
 @check_banned
 def edit_comment(comment_id):
@@ -3006,7 +5013,7 @@ def edit_comment(comment_id):
 
 # React (Like/Dislike) for Post and Comment
 @app.route('/react/<target_type>/<int:target_id>', methods=['POST'])
-@rate_limit(limit=60, window_seconds=60)
+@rate_limit('react')
 @check_banned
 def react(target_type, target_id):
     if not g.user:
@@ -3024,20 +5031,21 @@ def react(target_type, target_id):
 
     try:
         is_public_board = False
+        target_post = None
         if target_type == 'post':
-            cursor.execute("SELECT b.is_public FROM posts p JOIN board b ON p.board_id = b.board_id WHERE p.id = ?", (target_id,))
-            board = cursor.fetchone()
-            if board: is_public_board = board['is_public'] == 1
+            cursor.execute("SELECT board_id FROM posts WHERE id = ?", (target_id,))
+            target_post = cursor.fetchone()
         
         elif target_type == 'comment':
             cursor.execute("""
-                SELECT b.is_public FROM comments c 
+                SELECT p.board_id FROM comments c 
                 JOIN posts p ON c.post_id = p.id 
-                JOIN board b ON p.board_id = b.board_id 
                 WHERE c.id = ?
             """, (target_id,))
-            board = cursor.fetchone()
-            if board: is_public_board = board['is_public'] == 1
+            target_post = cursor.fetchone()
+
+        board = get_board(target_post['board_id']) if target_post else None
+        if board: is_public_board = board['is_public'] == 1
 
         user_id_for_reaction = None
         if g.user:
@@ -3103,24 +5111,28 @@ def react(target_type, target_id):
                 cursor.execute("SELECT created_at FROM posts WHERE id = ?", (target_id,))
                 post = cursor.fetchone()
                 if post:
-                    post_created_at = datetime.datetime.strptime(post['created_at'], '%Y-%m-%d %H:%M:%S')
+                    post_created_at = parse_db_datetime(post['created_at'])
                     time_diff = datetime.datetime.now() - post_created_at
                     if time_diff.total_seconds() > 86400: # 24시간 = 86400초
                         already_notified = 1 # 24시간 초과 시 알림 보내지 않음
 
                 if already_notified == 0:
                     # 5. 게시글 작성자 정보를 가져와서 알림 생성
-                    cursor.execute("SELECT author FROM posts WHERE id = ?", (target_id,))
+                    cursor.execute("SELECT author, board_id FROM posts WHERE id = ?", (target_id,))
                     post = cursor.fetchone()
                     if post:
-                        create_notification(
+                        pending_notifications = create_notifications(cursor, [build_notification(
                             recipient_id=post['author'],
                             actor_id=user_id, # 10번째 좋아요를 누른 사람
                             action='hot_post',
                             target_type='post',
                             target_id=target_id,
-                            post_id=target_id
-                        )
+                            post_id=target_id,
+                            board_id=post['board_id'],
+                            actor_nickname=g.user['nickname']
+                        )])
+                        conn.commit()
+                        publish_notifications(pending_notifications)
         # --- 👆 HOT 게시물 알림 로직 끝 ---
 
 
@@ -3161,7 +5173,7 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 @app.route('/update-profile-image', methods=['POST'])
-@rate_limit(limit=10, window_seconds=600)
+@rate_limit('update_profile_image')
 @login_required
 def update_profile_image():
     if 'profile_image' not in request.files:
@@ -3192,20 +5204,132 @@ def update_profile_image():
                     print(f"Warning: 이전 프로필 이미지 삭제 실패: {e}")
                     add_log('WARNING', session['user_id'], f"이전 프로필 이미지 삭제 실패: {e}")
 
-        unique_filename = f"{uuid.uuid4()}.webp"
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+                remove_profile_thumbnails(old_image_path)
+
+        unique_filename = f"{uuid.uuid4()}.webp"
+        save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+
+        optimize_and_save_image(file, save_path, PROFILE_IMAGE_MAX_SIZE)
+
+        db_path = 'images/profiles/' + unique_filename
+
+        cursor.execute("UPDATE users SET profile_image = ? WHERE login_id = ?", (db_path, session['user_id']))
+        touch_user_identity(session['user_id'])
+        add_log('UPDATE_PROFILE_IMAGE', session['user_id'], f"프로필 이미지를 '{unique_filename}'(으)로 변경했습니다.")
+        conn.commit()
+
+        return redirect(url_for('mypage'))
+    else:
+        return Response('<script>alert("허용되지 않는 파일 형식입니다. (png, jpg, jpeg)"); history.back();</script>')
+
+# Profile Thumbnails
+# 목록/댓글 등에 작게 보이는 프로필 사진을 크기별로 한 번만 줄여 디스크에 캐시합니다. (원본은 최대 300px)
+# 프로필 사진 파일명은 매번 새 uuid라 같은 URL의 내용이 바뀌지 않으므로 immutable 캐시 헤더를 씁니다.
+PROFILE_THUMB_SIZES = (64, 160, 200)         # 28~32px 아바타는 64, 70px 카드는 160, 100px 프로필은 200 (2x 화면 기준)
+PROFILE_THUMB_SOURCE_PREFIX = 'images/profiles/'
+PROFILE_THUMB_CACHE_FOLDER = 'cache/thumbs'  # static 밖: 항상 /thumb/ 라우트를 거침
+PROFILE_THUMB_CACHE_MAX_BYTES = int(os.getenv('PROFILE_THUMB_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+PROFILE_THUMB_CACHE_TARGET_RATIO = 0.9       # 상한을 넘으면 이 비율까지 오래 안 쓰인 것부터 삭제
+
+os.makedirs(PROFILE_THUMB_CACHE_FOLDER, exist_ok=True)
+profile_thumb_cache_state = {'bytes': None}  # 캐시 폴더 총 크기 (처음 필요할 때 한 번 계산)
+
+
+def get_profile_thumb_path(image_path, size):
+    return os.path.join(PROFILE_THUMB_CACHE_FOLDER, f"{image_path.replace('/', '__')}-{size}.webp")
+
+
+def build_profile_thumbnail(source_path, thumb_path, size):
+    """source를 size x size 안으로 줄여 WEBP로 저장하고 파일 크기를 반환합니다. (run_content_task로 워커 스레드에서 실행)"""
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size), RESAMPLING_LANCZOS)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        temp_path = f"{thumb_path}.{uuid.uuid4().hex[:8]}.part"
+        image.save(temp_path, format='WEBP', quality=82, method=4)
+    os.replace(temp_path, thumb_path)
+    return os.path.getsize(thumb_path)
+
+
+def evict_profile_thumbnails(added_bytes=0):
+    """캐시 총 크기를 갱신하고, 상한을 넘으면 마지막 사용 시각(mtime)이 오래된 파일부터 지웁니다."""
+    state = profile_thumb_cache_state
+    if state['bytes'] is None:
+        state['bytes'] = sum(entry.stat().st_size for entry in os.scandir(PROFILE_THUMB_CACHE_FOLDER) if entry.is_file())
+    else:
+        state['bytes'] += added_bytes
+    if state['bytes'] <= PROFILE_THUMB_CACHE_MAX_BYTES:
+        return 0
+
+    entries = sorted(
+        (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+        for entry in os.scandir(PROFILE_THUMB_CACHE_FOLDER) if entry.is_file()
+    )
+    target = PROFILE_THUMB_CACHE_MAX_BYTES * PROFILE_THUMB_CACHE_TARGET_RATIO
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    state['bytes'] = total
+    return removed
+
 
-        optimize_and_save_image(file, save_path, PROFILE_IMAGE_MAX_SIZE)
+def remove_profile_thumbnails(image_path):
+    """프로필 사진이 바뀌거나 지워질 때 그 사진의 캐시된 썸네일을 모두 지웁니다."""
+    if not image_path:
+        return
+    for size in PROFILE_THUMB_SIZES:
+        thumb_path = get_profile_thumb_path(image_path, size)
+        try:
+            freed = os.path.getsize(thumb_path)
+            os.remove(thumb_path)
+        except FileNotFoundError:
+            continue
+        if profile_thumb_cache_state['bytes'] is not None:
+            profile_thumb_cache_state['bytes'] -= freed
 
-        db_path = 'images/profiles/' + unique_filename
 
-        cursor.execute("UPDATE users SET profile_image = ? WHERE login_id = ?", (db_path, session['user_id']))
-        add_log('UPDATE_PROFILE_IMAGE', session['user_id'], f"프로필 이미지를 '{unique_filename}'(으)로 변경했습니다.")
-        conn.commit()
+def profile_thumb_url(image_path, size=PROFILE_THUMB_SIZES[0]):
+    """템플릿용: 프로필 사진이면 /thumb/ 주소, 그 밖의 경로는 원래 static 주소"""
+    if image_path and image_path.startswith(PROFILE_THUMB_SOURCE_PREFIX):
+        return url_for('profile_thumbnail', size=size, image_path=image_path)
+    return url_for('static', filename=image_path)
 
-        return redirect(url_for('mypage'))
+app.jinja_env.filters['profile_thumb'] = profile_thumb_url
+
+
+@app.route('/thumb/<int:size>/<path:image_path>')
+def profile_thumbnail(size, image_path):
+    normalized = os.path.normpath(image_path).replace(os.sep, '/')
+    if size not in PROFILE_THUMB_SIZES or normalized != image_path or not image_path.startswith(PROFILE_THUMB_SOURCE_PREFIX):
+        return Response('Not Found', status=404)
+
+    thumb_path = get_profile_thumb_path(image_path, size)
+    if os.path.exists(thumb_path):
+        os.utime(thumb_path)  # LRU: 마지막 사용 시각 갱신
     else:
-        return Response('<script>alert("허용되지 않는 파일 형식입니다. (png, jpg, jpeg)"); history.back();</script>')
+        source_path = os.path.join('static', image_path)
+        if not os.path.isfile(source_path):
+            return Response('Not Found', status=404)
+        try:
+            created = run_content_task(build_profile_thumbnail, source_path, thumb_path, size)
+        except (OSError, ValueError) as e:
+            print(f"Profile thumbnail failed ({image_path}, {size}): {e}")
+            # 일시적인 실패일 수 있으므로 원본으로 돌리는 응답은 캐시하지 않음
+            response = redirect(url_for('static', filename=image_path))
+            response.headers['Cache-Control'] = 'no-store'
+            return response
+        evict_profile_thumbnails(created)
+
+    # Cache-Control(immutable)은 apply_security_headers에서 정적 파일과 같이 붙임
+    return send_file(os.path.abspath(thumb_path), mimetype='image/webp')
 
 # User Profile Page (URL은 nickname 기반 유지)
 @app.route('/profile/<string:nickname>')
@@ -3230,33 +5354,71 @@ def user_profile(nickname):
     # 템플릿 단에서 출력 여부를 결정합니다.
     login_id = profile_user_data['login_id']
 
-    # 사용자의 게시글 목록 조회
-    posts_query = """
-        SELECT p.id, p.title, p.comment_count, p.updated_at, b.board_name
-        FROM posts p JOIN board b ON p.board_id = b.board_id
-        WHERE p.author = ? AND p.board_id != 3
-        ORDER BY p.updated_at DESC
-    """
-    cursor.execute(posts_query, (login_id,))
-    user_posts = cursor.fetchall()
-
-    # 사용자의 댓글 목록 조회
-    comments_query = """
-        SELECT c.content, c.post_id, c.updated_at, p.title AS post_title
-        FROM comments c JOIN posts p ON c.post_id = p.id
-        WHERE c.author = ? AND p.board_id != 3
-        ORDER BY c.updated_at DESC
-    """
-    cursor.execute(comments_query, (login_id,))
-    user_comments = cursor.fetchall()
+    # 사용자의 게시글/댓글 첫 페이지 (익명 게시판 제외, 나머지는 무한 스크롤)
+    user_posts, posts_cursor = fetch_user_posts_page(cursor, login_id)
+    user_comments, comments_cursor = fetch_user_comments_page(cursor, login_id)
 
     return render_template('profile.html', 
                            user=g.user, 
                            profile_user=profile_user_data, 
                            user_posts=user_posts, 
                            user_comments=user_comments,
+                           posts_cursor=posts_cursor,
+                           comments_cursor=comments_cursor,
                            is_own_profile=is_own_profile)
 
+
+@app.route('/api/activity/<string:kind>')
+@login_required
+def api_activity_feed(kind):
+    """
+    마이페이지/프로필 활동 내역의 다음 페이지(JSON). ?user=<닉네임> 이 없으면 본인(익명 게시판 글 포함),
+    있으면 해당 사용자의 공개 활동(익명 게시판 제외). ?cursor= 는 이전 응답의 next_cursor
+    """
+    if kind not in ('posts', 'comments'):
+        return jsonify({'status': 'error', 'message': '잘못된 요청입니다.'}), 404
+
+    before = parse_activity_cursor(request.args.get('cursor'))
+    if request.args.get('cursor') and before is None:
+        return jsonify({'status': 'error', 'message': '잘못된 커서입니다.'}), 400
+
+    conn = get_db()
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+
+    nickname = request.args.get('user')
+    if nickname:
+        cursor.execute("SELECT login_id FROM users WHERE nickname = ?", (nickname,))
+        target = cursor.fetchone()
+        if not target:
+            return jsonify({'status': 'error', 'message': '존재하지 않는 사용자입니다.'}), 404
+        author_id, include_anonymous = target['login_id'], False
+    else:
+        author_id, include_anonymous = g.user['login_id'], True
+
+    if kind == 'posts':
+        rows, next_cursor = fetch_user_posts_page(cursor, author_id, before, include_anonymous=include_anonymous)
+        items = [{
+            'id': row['id'],
+            'title': row['title'],
+            'board_name': row['board_name'],
+            'comment_count': row['comment_count'],
+            'updated_at': format_datetime(row['updated_at']),
+            'url': url_for('post_detail', post_id=row['id']),
+        } for row in rows]
+    else:
+        rows, next_cursor = fetch_user_comments_page(cursor, author_id, before, include_anonymous=include_anonymous)
+        items = [{
+            'content': html_to_search_text(row['content']),
+            'post_title': row['post_title'],
+            'updated_at': format_datetime(row['updated_at']),
+            'url': url_for('post_detail', post_id=row['post_id']),
+        } for row in rows]
+
+    response = jsonify({'status': 'success', 'items': items, 'next_cursor': next_cursor})
+    response.cache_control.private = True
+    return response
+
 @app.route('/update-profile-info', methods=['POST'])
 @login_required
 def update_profile_info():
@@ -3283,6 +5445,7 @@ def update_profile_info():
         profile_message = ?, clubhak = ?, clubchi = ?, clubjin = ?, profile_public = ?
         WHERE login_id = ?
     """, (profile_message, club1, club2, club3, is_public, session['user_id']))
+    touch_user_identity(session['user_id'])
 
     conn.commit()
     
@@ -3294,6 +5457,7 @@ def update_profile_info():
 @login_required
 def change_password():
     user = g.user 
+    pw_hash = fetch_password_hash(user['login_id']) if user else None
 
     if request.method == 'POST':
         current_password = request.form.get('current_password')
@@ -3301,12 +5465,12 @@ def change_password():
         confirm_password = request.form.get('confirm_password')
 
         # 1. 현재 비밀번호 확인
-        if not user or 'pw' not in user or not bcrypt.check_password_hash(user['pw'], current_password):
+        if not user or not verify_password(pw_hash, current_password):
             return Response('<script>alert("현재 비밀번호가 일치하지 않습니다."); history.back();</script>')
 
         # --- 👇 추가된 로직 시작 ---
         # 2. 현재 비밀번호와 새 비밀번호가 동일한지 확인
-        if bcrypt.check_password_hash(user['pw'], new_password):
+        if verify_password(pw_hash, new_password):
             return Response('<script>alert("새 비밀번호는 현재 비밀번호와 다르게 설정해야 합니다."); history.back();</script>')
         # --- 👆 추가된 로직 끝 ---
 
@@ -3318,10 +5482,11 @@ def change_password():
             return Response('<script>alert("새 비밀번호와 확인 비밀번호가 일치하지 않습니다."); history.back();</script>')
 
         # 4. 비밀번호 업데이트
-        hashed_pw = bcrypt.generate_password_hash(new_password).decode('utf-8')
+        hashed_pw = hash_password(new_password)
         conn = get_db()
         cursor = conn.cursor()
         cursor.execute("UPDATE users SET pw = ?, autologin_token = NULL WHERE login_id = ?", (hashed_pw, session['user_id']))
+        revoke_user_auth_tokens(cursor, session['user_id'])
 
         conn.commit()
 
@@ -3333,13 +5498,133 @@ def change_password():
 
     return render_template('change_password.html', user=user)
 
+# Account Deletion Jobs
+# 탈퇴 요청은 users 행만 바꾸고 즉시 끝나며, 게시글/댓글 author 재작성은 작업 큐에서 청크 단위로 나눠 처리합니다.
+# (글이 많은 사용자의 UPDATE ... WHERE author = ? 가 요청 트랜잭션 안에서 쓰기 잠금을 오래 잡지 않도록)
+# 작업이 끝나기 전까지 원래 아이디는 재가입에 쓸 수 없습니다. (옛 글이 새 계정에 붙지 않도록)
+# 그동안 옛 아이디로 남은 글/댓글은 users 행이 없으므로, 목록/상세 조회는 LEFT JOIN으로 '탈퇴한 사용자'로 보여줍니다.
+ACCOUNT_DELETION_CHUNK = 500          # 한 트랜잭션에서 옮기는 행 수
+ACCOUNT_DELETION_INTERVAL = 30        # 초. 재시작 등으로 남은 작업을 다시 집어 드는 주기
+ACCOUNT_DELETION_LEASE = 300          # 초. 이 시간 동안 진행 기록이 없는 running 작업은 다른 실행이 다시 가져감
+ACCOUNT_DELETION_TABLES = ('posts', 'comments')
+
+
+def init_account_deletion_jobs():
+    with app.app_context():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS account_deletion_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                old_login_id TEXT NOT NULL,
+                new_login_id TEXT NOT NULL,
+                posts_moved INTEGER NOT NULL DEFAULT 0,
+                comments_moved INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL,
+                finished_at TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                claimed_at INTEGER
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(account_deletion_jobs)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'state' not in columns:
+            cursor.execute("ALTER TABLE account_deletion_jobs ADD COLUMN state TEXT NOT NULL DEFAULT 'pending'")
+            cursor.execute("UPDATE account_deletion_jobs SET state = 'done' WHERE finished_at IS NOT NULL")
+        if 'claimed_at' not in columns:
+            cursor.execute("ALTER TABLE account_deletion_jobs ADD COLUMN claimed_at INTEGER")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_account_deletion_jobs_old ON account_deletion_jobs (old_login_id, finished_at)")
+        conn.commit()
+
+
+def is_login_id_taken(cursor, login_id):
+    """사용 중이거나 탈퇴 처리(글 재작성)가 끝나지 않은 아이디인지"""
+    cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM users WHERE login_id = ?)
+            OR EXISTS (SELECT 1 FROM account_deletion_jobs WHERE old_login_id = ? AND finished_at IS NULL)
+    """, (login_id, login_id))
+    return bool(cursor.fetchone()[0])
+
+
+def claim_account_deletion_job(conn, job_id, lease=ACCOUNT_DELETION_LEASE):
+    """
+    pending 작업(또는 lease가 끝난 running 작업)을 한 문장으로 running으로 바꿔 가져옵니다.
+    탈퇴 직후 실행과 account_deletion_loop가 같은 작업을 동시에 처리하지 않도록, 바뀐 행이 있을 때만 True
+    """
+    now = int(time.time())
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE account_deletion_jobs SET state = 'running', claimed_at = ?
+        WHERE id = ? AND finished_at IS NULL
+          AND (state = 'pending' OR (state = 'running' AND claimed_at < ?))
+    """, (now, job_id, now - lease))
+    conn.commit()
+    return cursor.rowcount == 1
+
+
+def run_account_deletion_job(conn, job_id, chunk=ACCOUNT_DELETION_CHUNK):
+    """
+    작업 하나를 가져와(claim) 끝까지 처리합니다. 청크마다 커밋하고 진행 상황(posts_moved/comments_moved)과
+    lease(claimed_at)를 갱신하며, 청크 사이에 다른 greenlet에 양보합니다.
+    중간에 멈춰도 lease가 끝나면 다음 실행이 남은 행부터 이어서 처리합니다.
+    """
+    if not claim_account_deletion_job(conn, job_id):
+        return False
+    cursor = conn.cursor()
+    cursor.execute("SELECT old_login_id, new_login_id FROM account_deletion_jobs WHERE id = ?", (job_id,))
+    old_login_id, new_login_id = cursor.fetchone()
+
+    for table in ACCOUNT_DELETION_TABLES:
+        while True:
+            cursor.execute(f"""
+                UPDATE {table} SET author = ?
+                WHERE rowid IN (SELECT rowid FROM {table} WHERE author = ? LIMIT ?)
+            """, (new_login_id, old_login_id, chunk))
+            moved = cursor.rowcount
+            cursor.execute(
+                f"UPDATE account_deletion_jobs SET {table}_moved = {table}_moved + ?, claimed_at = ? WHERE id = ?",
+                (moved, int(time.time()), job_id)
+            )
+            conn.commit()
+            if moved < chunk:
+                break
+            gevent.sleep(0)
+
+    cursor.execute("UPDATE account_deletion_jobs SET state = 'done', finished_at = ? WHERE id = ?",
+                   (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_id))
+    conn.commit()
+    return True
+
+
+def run_pending_account_deletions():
+    conn = sqlite3.connect(DATABASE)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, old_login_id FROM account_deletion_jobs WHERE finished_at IS NULL ORDER BY id")
+        for job_id, old_login_id in cursor.fetchall():
+            # 요청 컨텍스트 밖이라 add_log 대신 출력만 남김 (탈퇴 자체는 delete_account에서 기록)
+            if run_account_deletion_job(conn, job_id):
+                print(f"Account deletion job {job_id} ({old_login_id}) finished")
+    except sqlite3.Error as e:
+        print(f"Account deletion job failed: {e}")
+    finally:
+        conn.close()
+
+
+def account_deletion_loop():
+    while True:
+        gevent.sleep(ACCOUNT_DELETION_INTERVAL)
+        run_pending_account_deletions()
+
+
 @app.route('/delete-account', methods=['POST'])
 @login_required
 def delete_account():
     password = request.form.get('password')
     user = g.user
+    pw_hash = fetch_password_hash(user['login_id'])
 
-    if not bcrypt.check_password_hash(user['pw'], password):
+    if not verify_password(pw_hash, password):
         return Response('<script>alert("비밀번호가 일치하지 않아 계정을 삭제할 수 없습니다."); history.back();</script>')
 
     conn = get_db()
@@ -3356,6 +5641,7 @@ def delete_account():
                 print(f"Full path to delete: {full_path_to_delete}")  # 디버그 출력
                 if os.path.exists(full_path_to_delete):
                     os.remove(full_path_to_delete)
+                remove_profile_thumbnails(old_image_path)
             except Exception as e:
                 # 파일 삭제에 실패해도 전체 프로세스에 영향을 주지 않도록 로그만 남김
                 print(f"Warning: 프로필 이미지 파일 삭제 실패: {e}")
@@ -3368,13 +5654,13 @@ def delete_account():
         deleted_hakbun = f"deleted_{user['hakbun']}_{timestamp_suffix}"
         deleted_nickname = f"탈퇴한 사용자_{str(uuid.uuid4())[:8]}"
 
-        # 2. 탈퇴할 사용자가 작성한 게시글의 author를 새로운 deleted_login_id로 업데이트합니다.
-        cursor.execute("UPDATE posts SET author = ? WHERE author = ?", (deleted_login_id, original_login_id))
+        # 2. 게시글/댓글의 author를 deleted_login_id로 옮기는 작업은 큐에 넣고 백그라운드에서 나눠 처리합니다.
+        cursor.execute("""
+            INSERT INTO account_deletion_jobs (old_login_id, new_login_id, created_at)
+            VALUES (?, ?, ?)
+        """, (original_login_id, deleted_login_id, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
 
-        # 3. 탈퇴할 사용자가 작성한 댓글의 author를 새로운 deleted_login_id로 업데이트합니다.
-        cursor.execute("UPDATE comments SET author = ? WHERE author = ?", (deleted_login_id, original_login_id))
-        
-        # 4. 사용자 정보 비활성화 (Soft Delete)
+        # 3. 사용자 정보 비활성화 (Soft Delete)
         cursor.execute("""
             UPDATE users 
             SET 
@@ -3392,8 +5678,16 @@ def delete_account():
                 status = 'deleted'
             WHERE login_id = ?
         """, (deleted_login_id, deleted_hakbun, deleted_nickname, str(uuid.uuid4()), original_login_id))
+        # 다른 기기에 남아 있는 세션이 캐시된 사용자 정보를 계속 쓰지 않도록 원래 ID도 함께 무효화
+        touch_user_identity(deleted_login_id, original_login_id)
+        revoke_user_auth_tokens(cursor, original_login_id)
+        # 탈퇴한 아이디로 온 알림은 더 이상 읽을 사람이 없으므로 삭제
+        cursor.execute("DELETE FROM notifications WHERE recipient_id = ?", (original_login_id,))
 
         conn.commit()
+        notification_channel.forget_unread_counts(original_login_id)
+        remove_nickname_suggestion(user['nickname'])
+        gevent.spawn(run_pending_account_deletions)
 
         add_log('DELETE_ACCOUNT', original_login_id, f"사용자({original_login_id})가 계정을 삭제했습니다.")
 
@@ -3408,22 +5702,319 @@ def delete_account():
         print(f"Error during account deletion: {e}")
         return Response('<script>alert("계정 삭제 중 오류가 발생했습니다."); history.back();</script>')
     
-def clean_fts_query(text):
+# Post Search
+# posts_search: 한글은 음절 bigram, 그 외는 단어 단위로 미리 토큰화한 텍스트를 담는 FTS5 테이블 (rowid = posts.id)
+# "시험은", "시험을" 본문이 "시험 험은 은", "시험 험을 을" 로 색인되므로 조사가 붙어 있어도 "시험" 으로 찾을 수 있습니다.
+# 한글 구간의 끝 음절도 따로 색인해, 한 음절 검색어("학")가 bigram 앞자리("학교")뿐 아니라 끝자리("수학")에도 걸립니다.
+# posts 트리거는 순수 SQL로 변경된 글 id만 posts_search_pending에 쌓고, 토큰화는 sync_post_search_index()가 파이썬에서 합니다.
+# (어떤 연결/도구로 posts를 고쳐도 사용자 정의 SQL 함수 없이 동작하도록)
+POST_SEARCH_SYNC_INTERVAL = 5      # 초. 백그라운드 동기화 주기 (검색 요청 시에도 밀린 것부터 반영)
+POST_SEARCH_SYNC_BATCH = 500
+POST_SEARCH_TITLE_WEIGHT = 3.0     # bm25 가중치 (제목, 본문)
+POST_SEARCH_BODY_WEIGHT = 1.0
+POST_SEARCH_SNIPPET_CHARS = 80
+POST_SEARCH_TOKENIZER_VERSION = 2  # 색인 토큰 규칙이 바뀌면 올림 (init_post_search가 전체 글을 다시 색인)
+SEARCH_TOKEN_RE = re.compile(r'[가-힣]+|[^\W_가-힣]+')
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def html_to_search_text(content):
+    """본문 HTML을 검색/스니펫용 평문으로 (bleach보다 훨씬 가벼운 태그 제거)"""
+    return ' '.join(html.unescape(HTML_TAG_RE.sub(' ', content or '')).split())
+
+
+def tokenize_search_text(text, index=False):
     """
-    FTS5 검색 쿼리에서 문법 오류를 일으킬 수 있는 특수문자를 제거합니다.
+    검색 색인/쿼리 공용 토크나이저. 한글 연속 구간은 겹치는 음절 bigram(1음절 구간은 그대로),
+    영문/숫자 등은 소문자 단어 하나로 만듭니다. 반환값은 순서가 유지된 토큰 리스트입니다.
+    index=True(색인용)이면 2음절 이상 한글 구간 뒤에 끝 음절 하나를 더 붙입니다.
     """
-    # 1. 알파벳, 숫자, 한글, 공백만 남기고 모두 제거 (정규표현식 사용)
-    # import re 가 상단에 되어있어야 합니다. (이미 되어 있습니다)
-    cleaned_text = re.sub(r'[^\w\s]', '', text)
-    
-    # 2. 양쪽 공백 제거
-    return cleaned_text.strip()
+    tokens = []
+    for run in SEARCH_TOKEN_RE.findall((text or '').lower()):
+        if '가' <= run[0] <= '힣':
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+                if index:
+                    tokens.append(run[-1])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def build_search_match_query(query):
+    """
+    사용자 검색어를 posts_search MATCH 식으로 변환합니다. 공백으로 나뉜 검색어는 모두 포함(AND)해야 하고,
+    각 검색어의 bigram은 인접해야 하므로 phrase("중간 간고 고사")로 묶습니다. 한 음절 검색어는 접두 검색
+    (bigram의 앞 음절이나 색인된 끝 음절에 걸림). 검색어 중간의 한글 구간은 글에서도 거기서 끝나므로 색인과 같은
+    끝 음절 토큰을 넣고, 마지막 구간은 글에서 뒤로 더 이어질 수 있으므로 뺍니다.
+    토큰은 [가-힣]/단어 문자뿐이라 따옴표로 감싸면 FTS5 문법 오류가 나지 않습니다. 검색할 것이 없으면 None
+    """
+    clauses = []
+    for term in (query or '').split():
+        tokens = tokenize_search_text(term, index=True)
+        if not tokens:
+            continue
+        runs = SEARCH_TOKEN_RE.findall(term.lower())
+        if len(runs[-1]) > 1 and '가' <= runs[-1][0] <= '힣':
+            tokens.pop()
+        if len(tokens) == 1 and len(tokens[0]) == 1 and '가' <= tokens[0] <= '힣':
+            clauses.append(f'"{tokens[0]}"*')
+        else:
+            clauses.append('"' + ' '.join(tokens) + '"')
+    return ' AND '.join(clauses) or None
+
+
+def highlight_search_terms(text, query):
+    """text를 HTML 이스케이프하면서 검색어(공백 구분, 대소문자 무시)를 <mark>로 감싼 Markup을 돌려줍니다."""
+    terms = sorted({term for term in (query or '').split()}, key=len, reverse=True)
+    if not terms or not text:
+        return Markup(html.escape(text or ''))
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    pieces, last = [], 0
+    for match in pattern.finditer(text):
+        pieces.append(html.escape(text[last:match.start()]))
+        pieces.append(f'<mark>{html.escape(match.group(0))}</mark>')
+        last = match.end()
+    pieces.append(html.escape(text[last:]))
+    return Markup(''.join(pieces))
+
+
+def build_search_snippet(text, query, width=POST_SEARCH_SNIPPET_CHARS):
+    """
+    평문에서 첫 번째 검색어 위치 주변 width자를 잘라 검색어를 강조합니다.
+    검색어가 본문에 없으면(제목/작성자로만 걸린 경우) 앞부분을 그대로 보여줍니다.
+    """
+    text = text or ''
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in (query or '').split()]
+    positions = [pos for pos in positions if pos >= 0]
+    start = max(min(positions) - width // 4, 0) if positions else 0
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return Markup(prefix) + highlight_search_terms(text[start:start + width], query) + Markup(suffix)
+
+
+def init_post_search():
+    """posts_search FTS 테이블/대기열/트리거를 만들고, 처음 만들어졌거나 토큰 규칙이 바뀌었으면 기존 글 전체를 색인합니다."""
+    with app.app_context():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_search'")
+        created = cursor.fetchone() is None
+        cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5(title, body, tokenize = 'unicode61')")
+        cursor.execute("CREATE TABLE IF NOT EXISTS posts_search_pending (post_id INTEGER PRIMARY KEY)")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS posts_search_after_insert AFTER INSERT ON posts BEGIN
+                INSERT OR IGNORE INTO posts_search_pending (post_id) VALUES (new.id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS posts_search_after_update AFTER UPDATE OF title, content ON posts BEGIN
+                INSERT OR IGNORE INTO posts_search_pending (post_id) VALUES (new.id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS posts_search_after_delete AFTER DELETE ON posts BEGIN
+                DELETE FROM posts_search WHERE rowid = old.id;
+                DELETE FROM posts_search_pending WHERE post_id = old.id;
+            END
+        """)
+        cursor.execute("CREATE TABLE IF NOT EXISTS posts_search_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        cursor.execute("SELECT value FROM posts_search_meta WHERE key = 'tokenizer_version'")
+        row = cursor.fetchone()
+        if created or not row or row[0] != POST_SEARCH_TOKENIZER_VERSION:
+            cursor.execute("INSERT OR IGNORE INTO posts_search_pending (post_id) SELECT id FROM posts")
+            cursor.execute(
+                "INSERT OR REPLACE INTO posts_search_meta (key, value) VALUES ('tokenizer_version', ?)",
+                (POST_SEARCH_TOKENIZER_VERSION,)
+            )
+        conn.commit()
+
+        while sync_post_search_index(conn):
+            pass
+
+
+def sync_post_search_index(conn=None, limit=POST_SEARCH_SYNC_BATCH):
+    """대기열에 쌓인 글을 최대 limit개 토큰화해 posts_search에 반영하고, 반영한 개수를 반환합니다."""
+    conn = conn or get_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.id, p.title, p.content
+        FROM posts_search_pending q
+        JOIN posts p ON p.id = q.post_id
+        LIMIT ?
+    """, (limit,))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    post_ids = [(row[0],) for row in rows]
+    cursor.executemany("DELETE FROM posts_search WHERE rowid = ?", post_ids)
+    cursor.executemany(
+        "INSERT INTO posts_search (rowid, title, body) VALUES (?, ?, ?)",
+        [
+            (post_id, ' '.join(tokenize_search_text(title, index=True)),
+             ' '.join(tokenize_search_text(html_to_search_text(content), index=True)))
+            for post_id, title, content in rows
+        ]
+    )
+    cursor.executemany("DELETE FROM posts_search_pending WHERE post_id = ?", post_ids)
+    conn.commit()
+    return len(rows)
+
+
+def post_search_sync_loop():
+    while True:
+        gevent.sleep(POST_SEARCH_SYNC_INTERVAL)
+        conn = sqlite3.connect(DATABASE)
+        try:
+            while sync_post_search_index(conn):
+                pass
+        except sqlite3.Error as e:
+            print(f"Post search sync failed: {e}")
+        finally:
+            conn.close()
+
+# 정규화된 검색어 -> 병합된 검색 결과 목록. 페이지를 넘길 때 검색을 다시 돌리지 않도록 잠깐 보관
+# 보는 사람과 무관한 목록을 모든 사용자가 공유하고, 기수 제한 글은 조회 후 filter_search_results()로 거름
+SEARCH_RESULT_CACHE_TTL = 180
+SEARCH_MAX_RESULTS = 1000
+SEARCH_MAX_AUTHORS = 500  # 닉네임 갈래의 IN (...) 목록 상한 (SQLite 변수 개수 제한 안쪽)
+search_result_cache = TTLCache(maxsize=256, ttl=SEARCH_RESULT_CACHE_TTL)
+ANONYMOUS_BOARD_ID = 3
+# 검색에서 제외하는 작성자 상태 (정지된 사용자의 글)
+SEARCH_VISIBLE_AUTHOR_FILTER = "(u.status = 'active' OR u.status IS NULL OR u.status = 'deleted')"
+
+
+def get_user_grade(user):
+    try:
+        return int(user['gen'])
+    except (ValueError, TypeError, IndexError, KeyError):
+        return 0
+
+
+def can_view_target_grade(user, target_grade, author):
+    """post_detail의 기수 제한 규칙: 제한이 없거나 관리자/작성자 본인/같은 기수면 열람 가능"""
+    if not target_grade or target_grade <= 0:
+        return True
+    if not user:
+        return False
+    if user['role'] == 'admin' or user['login_id'] == author:
+        return True
+    return get_user_grade(user) == target_grade
+
+
+def normalize_search_query(query):
+    return ' '.join((query or '').lower().split())
+
+
+def find_search_results(cursor, query):
+    """
+    제목/본문(FTS), 회원 닉네임, 게스트 닉네임 세 갈래를 각자 인덱스를 타는 쿼리로 따로 찾아 파이썬에서 합칩니다.
+    순서는 FTS 결과(bm25 순) 다음에 작성자로만 걸린 글(최신순). 최대 SEARCH_MAX_RESULTS개
+    보는 사람과 무관한 (post_id, target_grade, author, body_only) 목록을 반환합니다.
+    body_only는 기수 제한 글이 제목이 아닌 본문으로만 걸렸다는 뜻이며 filter_search_results()가 사용합니다.
+    """
+    search_term_like = f'%{query}%'
+    # 한글 bigram 색인용 MATCH 식 (검색할 토큰이 없으면 제목/본문 검색은 건너뜀)
+    search_term_fts = build_search_match_query(query)
+
+    fts_hits = []
+    if search_term_fts:
+        cursor.execute(f"""
+            SELECT
+                p.id, p.target_grade, p.author,
+                p.target_grade > 0
+                    AND s.rowid NOT IN (SELECT rowid FROM posts_search WHERE posts_search MATCH ?) AS body_only
+            FROM posts_search s
+            JOIN posts p ON p.id = s.rowid
+            LEFT JOIN users u ON p.author = u.login_id
+            WHERE posts_search MATCH ? AND {SEARCH_VISIBLE_AUTHOR_FILTER}
+            ORDER BY bm25(posts_search, ?, ?)
+            LIMIT ?
+        """, (f'title : ({search_term_fts})', search_term_fts,
+              POST_SEARCH_TITLE_WEIGHT, POST_SEARCH_BODY_WEIGHT, SEARCH_MAX_RESULTS))
+        fts_hits = [(row[0], row[1], row[2], bool(row[3])) for row in cursor.fetchall()]
+
+    # 닉네임이 맞는 회원을 먼저 찾고(users는 posts보다 훨씬 작음), 그 회원들의 글은 author 인덱스로 조회
+    cursor.execute(f"""
+        SELECT login_id FROM users u
+        WHERE nickname LIKE ? AND login_id != ? AND {SEARCH_VISIBLE_AUTHOR_FILTER}
+        LIMIT ?
+    """, (search_term_like, GUEST_USER_ID, SEARCH_MAX_AUTHORS))
+    author_ids = [row[0] for row in cursor.fetchall()]
+
+    author_hits = []
+    if author_ids:
+        placeholders = ','.join('?' * len(author_ids))
+        cursor.execute(f"""
+            SELECT id, updated_at, target_grade, author FROM posts
+            WHERE author IN ({placeholders}) AND board_id != ?
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, (*author_ids, ANONYMOUS_BOARD_ID, SEARCH_MAX_RESULTS))
+        author_hits.extend(cursor.fetchall())
+
+    cursor.execute("""
+        SELECT id, updated_at, target_grade, author FROM posts
+        WHERE author = ? AND guest_nickname LIKE ?
+        ORDER BY updated_at DESC
+        LIMIT ?
+    """, (GUEST_USER_ID, search_term_like, SEARCH_MAX_RESULTS))
+    author_hits.extend(cursor.fetchall())
+    author_hits.sort(key=lambda row: row[1], reverse=True)
+
+    # 작성자로 걸린 글은 제목만 보여도 되므로 body_only가 아님
+    merged = {hit[0]: hit for hit in fts_hits}
+    for post_id, _, target_grade, author in author_hits:
+        merged.setdefault(post_id, (post_id, target_grade, author, False))
+    return list(merged.values())[:SEARCH_MAX_RESULTS]
+
+
+def filter_search_results(results, user):
+    """공유 캐시의 검색 결과에서 user가 열람할 수 없는 기수 제한 글의 본문 일치를 빼고 id만 남깁니다."""
+    return [
+        post_id for post_id, target_grade, author, body_only in results
+        if not body_only or can_view_target_grade(user, target_grade, author)
+    ]
+
+
+def load_search_result_posts(cursor, post_ids):
+    """한 페이지 분량의 id만 목록 표시용 컬럼으로 채웁니다. (삭제된 글은 빠지고 순서는 post_ids를 따름)"""
+    if not post_ids:
+        return []
+    placeholders = ','.join('?' * len(post_ids))
+    cursor.execute(f"""
+        SELECT
+            p.id, p.title, p.content, p.comment_count, p.updated_at, p.view_count,
+            p.author, p.guest_nickname, p.board_id, p.target_grade,
+            CASE WHEN p.board_id = {ANONYMOUS_BOARD_ID} THEN '익명' ELSE u.nickname END as nickname,
+            (SELECT SUM(CASE WHEN r.reaction_type = 'like' THEN 1 WHEN r.reaction_type = 'dislike' THEN -1 ELSE 0 END)
+             FROM reactions r WHERE r.target_type = 'post' AND r.target_id = p.id) as net_reactions
+        FROM posts p
+        LEFT JOIN users u ON p.author = u.login_id
+        WHERE p.id IN ({placeholders})
+    """, post_ids)
+    rows = {row['id']: dict(row) for row in cursor.fetchall()}
+
+    posts = []
+    for post_id in post_ids:
+        post = rows.get(post_id)
+        if not post:
+            continue
+        board = get_board(post['board_id'])
+        post['board_name'] = board['board_name'] if board else ''
+        posts.append(post)
+    return posts
+
 
 @app.route('/search')
 @login_required
 def search():
     query = request.args.get('q', '').strip()
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     posts_per_page = 20
 
     if not query:
@@ -3432,56 +6023,32 @@ def search():
     conn = get_db()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    
-    # FTS 검색어 형식
-    search_term_fts = ' AND '.join(query.split())
-    # LIKE 검색어 형식
-    search_term_like = f'%{query}%'
-
-    cleaned_query = clean_fts_query(query)
-    search_term_fts = ' AND '.join(cleaned_query.split())
 
     try:
-        # [수정] 닉네임 검색(u.nickname)과 게스트 닉네임 검색(p.guest_nickname)을 모두 포함
-        count_query = """
-            SELECT COUNT(DISTINCT p.id)
-            FROM posts p
-            LEFT JOIN users u ON p.author = u.login_id
-            WHERE 
-                (p.id IN (SELECT rowid FROM posts_fts WHERE posts_fts MATCH ?))
-                OR (p.board_id != 3 AND u.nickname LIKE ?) 
-                OR (p.guest_nickname LIKE ?)
-        """
-        cursor.execute(count_query, (search_term_fts, search_term_like, search_term_like))
-        total_posts = cursor.fetchone()[0]
+        cache_key = normalize_search_query(query)
+        results = search_result_cache.get(cache_key)
+        if results is None:
+            # 방금 쓰거나 고친 글도 바로 검색되도록 밀린 색인부터 반영
+            sync_post_search_index(conn)
+            results = find_search_results(cursor, cache_key)
+            search_result_cache[cache_key] = results
+        # 캐시는 모든 사용자가 공유하므로 열람 범위 필터는 조회 뒤에 적용
+        post_ids = filter_search_results(results, g.user)
+
+        total_posts = len(post_ids)
         total_pages = math.ceil(total_posts / posts_per_page) if total_posts > 0 else 1
 
-        # 2. 현재 페이지에 해당하는 검색 결과 목록 조회
         offset = (page - 1) * posts_per_page
-        search_query = """
-            SELECT
-                p.id, p.title, p.comment_count, p.updated_at, p.view_count,
-                p.author, p.guest_nickname, p.board_id,
-                CASE WHEN p.board_id = 3 THEN '익명' ELSE u.nickname END as nickname,
-                b.board_name,
-                SUM(CASE WHEN r.reaction_type = 'like' THEN 1 WHEN r.reaction_type = 'dislike' THEN -1 ELSE 0 END) as net_reactions
-            FROM posts p
-            JOIN board b ON p.board_id = b.board_id
-            LEFT JOIN users u ON p.author = u.login_id
-            LEFT JOIN reactions r ON r.target_id = p.id AND r.target_type = 'post'
-            WHERE 
-                (
-                    (p.id IN (SELECT rowid FROM posts_fts WHERE posts_fts MATCH ?))
-                    OR (p.board_id != 3 AND u.nickname LIKE ?)
-                    OR (p.guest_nickname LIKE ?)
-                )
-              AND (u.status = 'active' OR u.status IS NULL OR u.status = 'deleted')
-            GROUP BY p.id
-            ORDER BY p.updated_at DESC
-            LIMIT ? OFFSET ?
-        """
-        cursor.execute(search_query, (search_term_fts, search_term_like, search_term_like, posts_per_page, offset))
-        posts = cursor.fetchall()
+        posts = []
+        for post in load_search_result_posts(cursor, post_ids[offset:offset + posts_per_page]):
+            post['title_html'] = highlight_search_terms(post['title'], query)
+            content = post.pop('content')
+            # 열람할 수 없는 기수 제한 글은 제목만 보여줌 (post_detail과 같은 규칙)
+            if can_view_target_grade(g.user, post['target_grade'], post['author']):
+                post['snippet'] = build_search_snippet(html_to_search_text(content), query)
+            else:
+                post['snippet'] = None
+            posts.append(post)
 
     except sqlite3.OperationalError as e:
         if "fts5" in str(e):
@@ -3501,16 +6068,154 @@ def search():
                            user=g.user,
                            GUEST_USER_ID=GUEST_USER_ID) # [추가] GUEST_USER_ID 전달
 
+# Search Suggestions
+# /api/search/suggest 용 인메모리 접두 인덱스. 기동 시 한 번 만들고 글 작성/수정/삭제, 가입/탈퇴 때 바로 반영,
+# 그 밖의 변경(관리자 제재, 다른 도구로 고친 DB 등)은 SEARCH_SUGGEST_REBUILD_INTERVAL 마다 전체 재구성으로 따라잡습니다.
+SEARCH_SUGGEST_LIMIT = 5
+SEARCH_SUGGEST_SCAN_LIMIT = 200      # 제목 후보를 이만큼 훑은 뒤 최신 글 순으로 자름
+SEARCH_SUGGEST_KEYS_PER_TITLE = 4    # 제목의 앞 단어 몇 개부터 시작하는 접두어까지 색인할지
+SEARCH_SUGGEST_REBUILD_INTERVAL = 600
+
+
+class PrefixIndex:
+    """정렬된 키 배열과 값 배열을 bisect로 접두 검색하는 인메모리 인덱스 (같은 키 여러 값 허용)"""
+
+    def __init__(self, pairs=()):
+        pairs = sorted(pairs)
+        self.keys = [key for key, _ in pairs]
+        self.values = [value for _, value in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, value):
+        i = bisect.bisect_left(self.keys, key)
+        self.keys.insert(i, key)
+        self.values.insert(i, value)
+
+    def remove(self, key, value):
+        i = bisect.bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.values[i] == value:
+                del self.keys[i]
+                del self.values[i]
+                return True
+            i += 1
+        return False
+
+    def search(self, prefix, limit):
+        results = []
+        i = bisect.bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(results) < limit and self.keys[i].startswith(prefix):
+            results.append(self.values[i])
+            i += 1
+        return results
+
+
+search_suggest_index = {'titles': PrefixIndex(), 'nicknames': PrefixIndex(), 'post_titles': {}}
+
+
+def get_suggestion_keys(text):
+    """제목/닉네임을 정규화해 '전체', '두 번째 단어부터', ... 형태의 접두 검색 키 목록으로 만듭니다."""
+    words = normalize_search_query(text).split()
+    return [' '.join(words[i:]) for i in range(min(len(words), SEARCH_SUGGEST_KEYS_PER_TITLE))]
+
+
+def build_search_suggest_index(conn=None):
+    conn = conn or get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, title FROM posts")
+    post_titles = {}
+    title_pairs = []
+    for post_id, title in cursor.fetchall():
+        post_titles[post_id] = title
+        title_pairs.extend((key, post_id) for key in get_suggestion_keys(title))
+
+    cursor.execute("SELECT nickname FROM users WHERE status = 'active' AND login_id != ?", (GUEST_USER_ID,))
+    nickname_pairs = [(normalize_search_query(nickname), nickname) for (nickname,) in cursor.fetchall() if nickname]
+
+    # 새 객체로 만든 뒤 한 번에 교체 (구성 중에도 기존 인덱스로 응답)
+    search_suggest_index.update({
+        'titles': PrefixIndex(title_pairs),
+        'nicknames': PrefixIndex(nickname_pairs),
+        'post_titles': post_titles,
+    })
+    return len(post_titles), len(nickname_pairs)
+
+
+def add_post_suggestion(post_id, title):
+    remove_post_suggestion(post_id)
+    search_suggest_index['post_titles'][post_id] = title
+    for key in get_suggestion_keys(title):
+        search_suggest_index['titles'].add(key, post_id)
+
+
+def remove_post_suggestion(post_id):
+    title = search_suggest_index['post_titles'].pop(post_id, None)
+    if title is None:
+        return
+    for key in get_suggestion_keys(title):
+        search_suggest_index['titles'].remove(key, post_id)
+
+
+def add_nickname_suggestion(nickname):
+    if nickname:
+        search_suggest_index['nicknames'].add(normalize_search_query(nickname), nickname)
+
+
+def remove_nickname_suggestion(nickname):
+    if nickname:
+        search_suggest_index['nicknames'].remove(normalize_search_query(nickname), nickname)
+
+
+def get_search_suggestions(prefix, limit=SEARCH_SUGGEST_LIMIT):
+    prefix = normalize_search_query(prefix)
+    if not prefix:
+        return {'titles': [], 'boards': [], 'nicknames': []}
+
+    post_titles = search_suggest_index['post_titles']
+    post_ids = set(search_suggest_index['titles'].search(prefix, SEARCH_SUGGEST_SCAN_LIMIT))
+    titles = [
+        {'id': post_id, 'title': post_titles[post_id]}
+        for post_id in sorted(post_ids, reverse=True)[:limit]
+        if post_id in post_titles
+    ]
+    boards = [
+        {'id': board['board_id'], 'name': board['board_name']}
+        for board in get_boards()
+        if normalize_search_query(board['board_name']).startswith(prefix)
+    ][:limit]
+    nicknames = search_suggest_index['nicknames'].search(prefix, limit)
+    return {'titles': titles, 'boards': boards, 'nicknames': nicknames}
+
+
+def search_suggest_rebuild_loop():
+    while True:
+        gevent.sleep(SEARCH_SUGGEST_REBUILD_INTERVAL)
+        conn = sqlite3.connect(DATABASE)
+        try:
+            build_search_suggest_index(conn)
+        except sqlite3.Error as e:
+            print(f"Search suggest index rebuild failed: {e}")
+        finally:
+            conn.close()
+
+
+@app.route('/api/search/suggest')
+@login_required
+def api_search_suggest():
+    response = jsonify(get_search_suggestions(request.args.get('q', '')))
+    response.cache_control.private = True
+    response.cache_control.max_age = 30
+    return response
+
 @app.route('/notifications/unread-count')
 def unread_notification_count():
     if not g.user:
         return jsonify({'count': 0})
 
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM notifications WHERE recipient_id = ? AND is_read = 0", (g.user['login_id'],))
-    count = cursor.fetchone()[0]
-    return jsonify({'count': count})
+    # SSE 스냅샷을 받지 못한 클라이언트용 폴백 (메모리 카운터 사용)
+    return jsonify({'count': get_unread_notification_count(g.user['login_id'])})
 
 @app.route('/notifications')
 def get_notifications():
@@ -3520,34 +6225,38 @@ def get_notifications():
     conn = get_db()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    # 게시글의 board_id를 함께 조회하여 익명게시판 여부 확인
-    query = """
-        SELECT n.*, u.nickname as actor_nickname, p.board_id
-        FROM notifications n
-        JOIN users u ON n.actor_id = u.login_id
-        LEFT JOIN posts p ON n.post_id = p.id
-        WHERE n.recipient_id = ?
-        ORDER BY n.created_at DESC
-        LIMIT 10
-    """
-    cursor.execute(query, (g.user['login_id'],))
-    notifications = []
-    for row in cursor.fetchall():
-        notification = dict(row)
-        # 익명게시판(board_id=3)인 경우 닉네임을 '익명'으로 마스킹
-        if notification.get('board_id') == 3:
-            notification['actor_nickname'] = '익명'
-        notifications.append(notification)
-    return jsonify(notifications)
+
+    # 최신 알림 id + 개수(읽음 처리 시 삭제되므로)를 버전 스탬프로 사용
+    cursor.execute(
+        "SELECT MAX(id) AS latest_id, COUNT(*) AS total, MAX(created_at) AS latest_at FROM notifications WHERE recipient_id = ?",
+        (g.user['login_id'],)
+    )
+    stamp = cursor.fetchone()
+    etag = build_etag('notifications', g.user['login_id'], stamp['latest_id'], stamp['total'])
+    last_modified = parse_http_last_modified(stamp['latest_at'])
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    notifications = fetch_recent_notifications(g.user['login_id'])
+    return apply_validators(jsonify(notifications), etag, last_modified)
 
 @app.route('/notifications/read/<int:notification_id>', methods=['POST'])
 @login_required
 def read_notification(notification_id):
     conn = get_db()
     cursor = conn.cursor()
+    user_id = g.user['login_id']
     # 본인의 알림이 맞는지 확인 후 삭제 처리 (한번 본 알림은 사라지게 함)
-    cursor.execute("DELETE FROM notifications WHERE id = ? AND recipient_id = ?", (notification_id, g.user['login_id']))
+    cursor.execute("SELECT is_read FROM notifications WHERE id = ? AND recipient_id = ?", (notification_id, user_id))
+    row = cursor.fetchone()
+    cursor.execute("DELETE FROM notifications WHERE id = ? AND recipient_id = ?", (notification_id, user_id))
     conn.commit()
+
+    if row and not row[0]:
+        # 다른 탭의 뱃지도 맞추도록 변경된 읽지 않은 알림 수를 발행
+        unread_count = notification_channel.adjust_unread_count(user_id, -1)
+        if unread_count is not None:
+            notification_channel.publish(user_id, {'unread_count': unread_count}, event='unread')
     return jsonify({'status': 'success'})
 
 @app.errorhandler(413)
@@ -3648,7 +6357,7 @@ def guest_auth(action, target_type, target_id):
             return Response('<script>alert("비밀번호를 입력하세요."); history.back();</script>')
 
         # 5. 비밀번호 확인
-        if bcrypt.check_password_hash(hashed_pw, password):
+        if verify_password(hashed_pw, password):
             # 비밀번호 일치!
             # 세션에 임시 인증 토큰 저장
             session[f'guest_auth_{target_type}_{target_id}'] = True 
@@ -3701,30 +6410,13 @@ def post_delete_guest(post_id):
     title_for_log = post['title']
 
     try:
-        # post_delete 로직에서 사용자 스탯(경험치, 카운트) 관련 부분만 제거
-        cursor.execute("SELECT id, author FROM comments WHERE post_id = ?", (post_id,))
-        comments = cursor.fetchall()
-        
-        if comments:
-            comment_ids = [c['id'] for c in comments]
-            placeholders = ', '.join('?' for _ in comment_ids)
-            cursor.execute(f"DELETE FROM reactions WHERE target_type = 'comment' AND target_id IN ({placeholders})", comment_ids)
-            
-            comment_authors_counts = {}
-            for c in comments:
-                author = c['author']
-                if author != GUEST_USER_ID: # 로그인한 유저의 댓글 카운트만 차감
-                    comment_authors_counts[author] = comment_authors_counts.get(author, 0) + 1
-            
-            for author, count in comment_authors_counts.items():
-                cursor.execute("UPDATE users SET comment_count = comment_count - ? WHERE login_id = ?", (count, author))
-
-        cursor.execute("DELETE FROM reactions WHERE target_type = 'post' AND target_id = ?", (post_id,))
-        cursor.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
-        cursor.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+        # post_delete 로직에서 게시글 작성자 스탯(경험치, 카운트) 관련 부분만 제거
+        notification_recipients = delete_post_cascade(cursor, post_id)
 
         add_log('DELETE_GUEST_POST', session.get('guest_session_id', 'Guest'), f"게스트 게시글 (id : {post_id})를 삭제했습니다. 제목 : {title_for_log}")
         conn.commit()
+        notification_channel.forget_unread_counts(*notification_recipients)
+        remove_post_suggestion(post_id)
 
     except Exception as e:
         print(f"Error during guest post deletion: {e}")
@@ -3772,7 +6464,7 @@ def comment_delete_guest(comment_id):
 
 
 @app.route('/post-edit-guest/<int:post_id>', methods=['GET', 'POST'])
-@rate_limit(limit=5, window_seconds=600)
+@rate_limit('post_edit_guest')
 def post_edit_guest(post_id):
     """
     (GET/POST) 인증된 게스트의 게시글 수정
@@ -3801,23 +6493,30 @@ def post_edit_guest(post_id):
             return Response('<script>alert("제목, 내용을 모두 입력해주세요."); history.back();</script>')
         if len(title) > 50:
             return Response('<script>alert("제목은 50자를 초과할 수 없습니다."); history.back();</script>')
-        plain_text_content = bleach.clean(content, tags=[], strip=True)
-        if len(plain_text_content) > MAX_POST_CONTENT_CHARS:
+        media_error = get_post_media_error()
+        if media_error:
+            return Response(f'<script>alert("{media_error}"); history.back();</script>')
+
+        analyzed = run_content_task(analyze_post_content, content, False)
+        if analyzed['plain_length'] > MAX_POST_CONTENT_CHARS:
             return Response('<script>alert("글자 수는 5,000자를 초과할 수 없습니다."); history.back();</script>')
-        if len(plain_text_content) == 0:
+        if analyzed['plain_length'] == 0:
             return Response('<script>alert("내용을 입력해주세요."); history.back();</script>')
 
-        sanitized_content = sanitize_rich_content(content)
-        if sanitized_content.count('<img') > MAX_POST_IMAGES:
+        sanitized_content = analyzed['sanitized']
+        if analyzed['image_count'] > MAX_POST_IMAGES:
             return Response('<script>alert("이미지는 최대 5개까지 첨부할 수 있습니다."); history.back();</script>')
 
         updated_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         # 게스트는 게시판 이동, 공지 설정 불가
         query = "UPDATE posts SET title = ?, content = ?, updated_at = ? WHERE id = ?"
         cursor.execute(query, (title, sanitized_content, updated_at, post_id))
+        release_post_media(cursor, post['content'], sanitized_content)
         
         add_log('EDIT_GUEST_POST', session.get('guest_session_id', 'Guest'), f"게스트 게시글 (id : {post_id})를 수정했습니다.")
         conn.commit()
+        publish_post_media(sanitized_content)
+        add_post_suggestion(post_id, title)
 
         # 수정 완료 후 인증 토큰 제거
         session.pop(f'guest_auth_post_{post_id}', None)
@@ -3829,7 +6528,7 @@ def post_edit_guest(post_id):
 
 
 @app.route('/comment-edit-guest/<int:comment_id>', methods=['GET', 'POST'])
-@rate_limit(limit=10, window_seconds=300)
+@rate_limit('comment_edit_guest')
 def comment_edit_guest(comment_id):
     """
     (GET/POST) 인증된 게스트의 댓글 수정
@@ -3882,7 +6581,7 @@ def comment_edit_guest(comment_id):
         return render_template('comment_edit_guest.html', comment=comment, user=g.user)
 
 @app.route('/etacon/request', methods=['GET', 'POST'])
-@rate_limit(limit=5, window_seconds=1800)
+@rate_limit('etacon_request')
 @login_required
 def etacon_request():
     if request.method == 'POST':
@@ -3952,12 +6651,13 @@ def etacon_request():
 
             # 3. 개별 인곽콘 이미지 저장
             for idx, file in enumerate(etacon_files):
+                original_bytes = get_upload_size(file)
                 img_path = save_etacon_image(file, pack_folder)
                 if img_path:
                     # 코드 형식: ~packID_index (예: ~15_0, ~15_1) -> 유니크하고 파싱하기 쉬움
                     code = f"~{pack_id}_{idx}"
-                    cursor.execute("INSERT INTO etacons (pack_id, image_path, code) VALUES (?, ?, ?)", 
-                                   (pack_id, img_path, code))
+                    cursor.execute("INSERT INTO etacons (pack_id, image_path, code, original_bytes) VALUES (?, ?, ?, ?)", 
+                                   (pack_id, img_path, code, original_bytes))
 
             conn.commit()
             add_log('REQUEST_ETACON', g.user['login_id'], f"인곽콘 패키지 '{name}' 등록을 요청했습니다.")
@@ -4014,10 +6714,24 @@ def approve_etacon(pack_id):
         uploader_id = pack[0]
         cursor.execute("INSERT OR IGNORE INTO user_etacons (user_id, pack_id, purchased_at) VALUES (?, ?, ?)",
                        (uploader_id, pack_id, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-    
+
     conn.commit()
-    add_log('APPROVE_ETACON', g.user['login_id'], f"인곽콘 패키지 {pack_id}번을 승인했습니다.")
-    return jsonify({'status': 'success'})
+
+    # 남아 있는 GIF 변환 + 업로드 원본 대비 절감 용량 집계
+    size_report = optimize_etacon_pack(pack_id)
+
+    # 보유 인곽콘 모달이 이미지 수만큼 요청하지 않도록 패키지 스프라이트 시트 생성
+    try:
+        build_etacon_sprite_sheet(pack_id)
+    except Exception as e:
+        print(f"스프라이트 시트 생성 실패: {e}")
+        add_log('ERROR', g.user['login_id'], f"인곽콘 패키지 {pack_id}번 스프라이트 시트 생성 실패: {e}")
+
+    add_log('APPROVE_ETACON', g.user['login_id'],
+            f"인곽콘 패키지 {pack_id}번을 승인했습니다. (이미지 {size_report['images']}개, "
+            f"{size_report['original_bytes'] / 1024:.0f}KB -> {size_report['stored_bytes'] / 1024:.0f}KB, "
+            f"{size_report['saved_bytes'] / 1024:.0f}KB 절감, GIF 변환 {size_report['converted']}개)")
+    return jsonify({'status': 'success', 'size_report': size_report})
 
 @app.route('/admin/etacon/reject/<int:pack_id>', methods=['POST'])
 @login_required
@@ -4031,7 +6745,7 @@ def reject_etacon(pack_id):
     conn.commit()
     
     try:
-        shutil.rmtree(os.path.join(ETACON_UPLOAD_FOLDER, f"pack_{pack_id}"))
+        shutil.rmtree(get_etacon_pack_folder(pack_id))
     except:
         pass
 
@@ -4069,7 +6783,7 @@ def etacon_shop():
     return render_template('etacon/shop.html', packs=packs, user=g.user)
 
 @app.route('/etacon/buy/<int:pack_id>', methods=['POST'])
-@rate_limit(limit=10, window_seconds=300)
+@rate_limit('buy_etacon')
 @login_required
 def buy_etacon(pack_id):
     conn = get_db()
@@ -4095,29 +6809,41 @@ def buy_etacon(pack_id):
     try:
         seller_payout = math.floor(pack['price'] * 0.8)
 
-        # 포인트 차감
-        cursor.execute("UPDATE users SET point = point - ? WHERE login_id = ?", (pack['price'], g.user['login_id']))
+        # 포인트 차감 (g.user는 캐시된 값일 수 있으므로 잔액 조건을 UPDATE에서 다시 확인)
+        cursor.execute("UPDATE users SET point = point - ? WHERE login_id = ? AND point >= ?",
+                       (pack['price'], g.user['login_id'], pack['price']))
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return jsonify({'status': 'error', 'message': '포인트가 부족합니다.'}), 400
+        touch_user_identity(g.user['login_id'])
 
         # 판매자 정산 (구매 금액의 80%)
         if seller_payout > 0 and pack['uploader_id'] and pack['uploader_id'] != g.user['login_id']:
             cursor.execute("UPDATE users SET point = point + ? WHERE login_id = ?", (seller_payout, pack['uploader_id']))
+            touch_user_identity(pack['uploader_id'])
 
         # 패키지 지급
         cursor.execute("INSERT INTO user_etacons (user_id, pack_id, purchased_at) VALUES (?, ?, ?)",
                        (g.user['login_id'], pack_id, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-        conn.commit()
-        
-        add_log('BUY_ETACON', g.user['login_id'], f"에타콘 패키지 '{pack['name']}'을 구매했습니다. (-{pack['price']}P)")
+
+        # 판매 알림도 같은 트랜잭션으로 저장하고, 커밋 이후에 발행
+        pending_notifications = []
         if seller_payout > 0 and pack['uploader_id'] and pack['uploader_id'] != g.user['login_id']:
-            add_log('ETACON_PAYOUT', pack['uploader_id'], f"에타콘 패키지 '{pack['name']}' 판매 정산으로 {seller_payout}P를 지급했습니다.")
-            create_notification(
+            pending_notifications = create_notifications(cursor, [build_notification(
                 recipient_id=pack['uploader_id'],
                 actor_id=g.user['login_id'],
                 action='etacon_sale',
                 target_type='etacon_pack',
                 target_id=pack_id,
-                post_id=0
-            )
+                post_id=0,
+                actor_nickname=g.user['nickname']
+            )])
+        conn.commit()
+        publish_notifications(pending_notifications)
+        
+        add_log('BUY_ETACON', g.user['login_id'], f"에타콘 패키지 '{pack['name']}'을 구매했습니다. (-{pack['price']}P)")
+        if seller_payout > 0 and pack['uploader_id'] and pack['uploader_id'] != g.user['login_id']:
+            add_log('ETACON_PAYOUT', pack['uploader_id'], f"에타콘 패키지 '{pack['name']}' 판매 정산으로 {seller_payout}P를 지급했습니다.")
         return jsonify({'status': 'success', 'message': '구매가 완료되었습니다!'})
         
     except Exception as e:
@@ -4130,7 +6856,24 @@ def my_etacons():
     conn = get_db()
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
-    
+
+    # 마지막 구매 시각 + 보유 패키지 수 + 패키지별 스프라이트 매니페스트 mtime을 버전 스탬프로 사용
+    # (스프라이트가 재생성되면 이전 sprite_*.webp는 삭제되므로 304로 옛 URL을 유지시키면 안 됨)
+    cursor.execute(
+        "SELECT MAX(purchased_at) AS latest_at, COUNT(*) AS total FROM user_etacons WHERE user_id = ?",
+        (g.user['login_id'],)
+    )
+    stamp = cursor.fetchone()
+    cursor.execute("SELECT pack_id FROM user_etacons WHERE user_id = ? ORDER BY pack_id", (g.user['login_id'],))
+    sprite_stamps = [get_etacon_sprite_stamp(row['pack_id']) for row in cursor.fetchall()]
+    etag = build_etag('my-etacons', g.user['login_id'], stamp['latest_at'], stamp['total'], *sprite_stamps)
+    last_modified = parse_http_last_modified(stamp['latest_at'])
+    if last_modified and any(sprite_stamps):
+        sprite_modified = datetime.datetime.fromtimestamp(max(sprite_stamps) / 1e9, datetime.timezone.utc).replace(microsecond=0)
+        last_modified = max(last_modified, sprite_modified)
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
     # 사용자가 보유한 패키지의 모든 인곽콘 조회
     query = """
         SELECT e.code, e.image_path, p.name as pack_name, p.id as pack_id
@@ -4144,17 +6887,22 @@ def my_etacons():
     rows = cursor.fetchall()
     
     # 패키지별로 그룹화하여 JSON 반환
+    # 스프라이트 시트가 있는 인곽콘은 sprite 좌표를 함께 내려 패키지당 이미지 1회 요청으로 표시
     result = {}
+    manifests = {}
     for row in rows:
         pack_name = row['pack_name']
         if pack_name not in result:
             result[pack_name] = []
+        if row['pack_id'] not in manifests:
+            manifests[row['pack_id']] = load_etacon_sprite_manifest(row['pack_id'])
         result[pack_name].append({
             'code': row['code'],
-            'image_path': row['image_path']
+            'image_path': row['image_path'],
+            'sprite': get_etacon_sprite_ref(manifests[row['pack_id']], row['code'])
         })
         
-    return jsonify(result)
+    return apply_validators(jsonify(result), etag, last_modified)
 
 @app.route('/api/vote', methods=['POST'])
 @login_required
@@ -4305,6 +7053,7 @@ def admin_ban_user():
     
     # 3. DB 업데이트
     cursor.execute("UPDATE users SET status = 'banned', banned_until = ? WHERE login_id = ?", (banned_until, user_id))
+    touch_user_identity(user_id)
     conn.commit()
     
     add_log('BAN_USER', g.user['login_id'], f"사용자 차단: {nickname}({name}, {hakbun}) - {duration}일. 사유: {reason}")
@@ -4336,13 +7085,14 @@ def admin_unban_user():
     
     # 차단 해제 업데이트
     cursor.execute("UPDATE users SET status = 'active', banned_until = NULL WHERE login_id = ?", (user_id,))
+    touch_user_identity(user_id)
     conn.commit()
     
     add_log('UNBAN_USER', g.user['login_id'], f"사용자 차단 해제: {nickname}({name}, {hakbun})")
     
     return Response(f'<script>alert("{nickname}님의 차단을 해제했습니다."); location.href="/admin/users";</script>')
 
-def check_content_image_size(content, max_total_mb=25, max_single_mb=5):
+def check_content_image_size(content, max_total_mb=25, max_single_mb=5, image_sizes=()):
     """
     HTML 본문(content) 내의 Base64 이미지들의 실제 용량을 계산하여
     개별 이미지 크기 및 총 용량이 제한을 초과하는지 검사합니다.
@@ -4351,26 +7101,28 @@ def check_content_image_size(content, max_total_mb=25, max_single_mb=5):
         content: HTML 본문
         max_total_mb: 총 이미지 용량 제한 (기본 25MB)
         max_single_mb: 개별 이미지 용량 제한 (기본 5MB)
+        image_sizes: 폼 파싱 중 파일로 옮겨진 이미지들의 원본 크기 (본문 앞쪽 순서)
     
     Returns:
         (True, 0) - 정상
         (False, idx) - idx번째 이미지가 개별 제한 초과
         (False, -1) - 총 용량 초과
     """
-    if not content:
+    if not content and not image_sizes:
         return True, 0
 
     # 이미지 태그에서 Base64 데이터 추출 (data:image/...;base64, 부분 이후)
-    base64_images = re.findall(r'src=["\']data:image/[a-zA-Z]+;base64,([^"\']+)["\']', content)
+    base64_images = re.findall(r'src=["\']data:image/[a-zA-Z]+;base64,([^"\']+)["\']', content or '')
     
     single_limit_bytes = max_single_mb * 1000 * 1000  # 10진법 기준 (Windows 탐색기와 동일)
     total_limit_bytes = max_total_mb * 1000 * 1000
     
+    # Base64 문자열 길이로 실제 파일 크기 추산
+    # 공식: (Base64 길이 * 3) / 4
+    sizes = list(image_sizes) + [(len(b64_data) * 3) / 4 for b64_data in base64_images]
+
     total_size = 0
-    for idx, b64_data in enumerate(base64_images):
-        # Base64 문자열 길이로 실제 파일 크기 추산
-        # 공식: (Base64 길이 * 3) / 4
-        real_size = (len(b64_data) * 3) / 4
+    for idx, real_size in enumerate(sizes):
         total_size += real_size
         
         # 개별 이미지 크기 검사
@@ -4383,12 +7135,104 @@ def check_content_image_size(content, max_total_mb=25, max_single_mb=5):
             
     return True, 0
 
+@app.cli.command('build-etacon-sprites')
+def build_etacon_sprites_command():
+    """승인된 모든 인곽콘 패키지의 스프라이트 시트를 (재)생성합니다. 사용법: flask build-etacon-sprites"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM etacon_packs WHERE status = 'approved' ORDER BY id")
+    for (pack_id,) in cursor.fetchall():
+        manifest = build_etacon_sprite_sheet(pack_id)
+        count = len(manifest['items']) if manifest else 0
+        print(f"pack_{pack_id}: 스프라이트 {count}개")
+
+@app.cli.command('reload-boards')
+def reload_boards_command():
+    """board 테이블 변경 후 실행 중인 서버들의 게시판 레지스트리를 갱신합니다. 사용법: flask reload-boards"""
+    boards = invalidate_board_registry()
+    print(f"게시판 레지스트리 갱신: {len(boards)}개")
+
+@app.cli.command('update-googlebot-ranges')
+def update_googlebot_ranges_command():
+    """Google 공개 크롤러 IP 대역을 로컬 파일로 내려받습니다. 사용법: flask update-googlebot-ranges (cron 등록 권장)"""
+    response = requests.get(GOOGLEBOT_IP_RANGES_URL, timeout=10)
+    response.raise_for_status()
+    prefixes = response.json().get('prefixes', [])
+    tmp_path = GOOGLEBOT_IP_RANGES_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(response.text)
+    # 실행 중인 서버가 반쯤 쓰인 파일을 읽지 않도록 교체는 원자적으로
+    os.replace(tmp_path, GOOGLEBOT_IP_RANGES_FILE)
+    print(f"{GOOGLEBOT_IP_RANGES_FILE}: {len(prefixes)}개 대역 저장")
+
+def recompute_levels(conn=None):
+    """
+    모든 사용자의 레벨/EXP를 실제 게시글·댓글 수(글 POST_EXP_REWARD, 댓글 COMMENT_EXP_REWARD)로 한 번에 재계산합니다.
+    레벨이 오른 사용자에게는 그 사이 레벨업 보상을 지급하고, 내려간 경우 포인트는 회수하지 않습니다.
+    바뀐 사용자 수를 반환합니다.
+    """
+    conn = conn or get_db()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT u.login_id, u.level, u.exp,
+               COALESCE(pc.cnt, 0) AS post_cnt,
+               COALESCE(cc.cnt, 0) AS comment_cnt
+        FROM users u
+        LEFT JOIN (SELECT author, COUNT(*) AS cnt FROM posts GROUP BY author) pc ON pc.author = u.login_id
+        LEFT JOIN (SELECT author, COUNT(*) AS cnt FROM comments GROUP BY author) cc ON cc.author = u.login_id
+        WHERE u.login_id != ?
+    """, (GUEST_USER_ID,))
+
+    updates = []
+    for login_id, level, exp, post_cnt, comment_cnt in cursor.fetchall():
+        current_level = max(int(level or 1), 1)
+        new_level, new_exp = resolve_level(post_cnt * POST_EXP_REWARD + comment_cnt * COMMENT_EXP_REWARD)
+        if (new_level, new_exp) == (current_level, int(exp or 0)):
+            continue
+        updates.append((new_level, new_exp, get_level_up_reward(current_level, new_level), login_id))
+
+    cursor.executemany("UPDATE users SET level = ?, exp = ?, point = point + ? WHERE login_id = ?", updates)
+    conn.commit()
+    touch_user_identity(*(update[3] for update in updates))
+    return len(updates)
+
+@app.cli.command('recompute-levels')
+def recompute_levels_command():
+    """게시글/댓글 수 기준으로 전체 사용자의 레벨·EXP·레벨업 보상을 재계산합니다. 사용법: flask recompute-levels"""
+    changed = recompute_levels()
+    print(f"레벨 재계산 완료: {changed}명 변경")
+
 # Server Drive Unit
 if __name__ == '__main__':
     from gevent.pywsgi import WSGIServer
     
-    init_log_db()    
-    
+    init_log_db()
+    init_db_indexes()
+    init_auth_tokens()
+    init_rate_limit_db()
+    init_googlebot_verdicts()
+    init_post_search()
+    init_account_deletion_jobs()
+    init_post_media()
+    try:
+        load_googlebot_ip_ranges()
+    except (OSError, ValueError) as e:
+        print(f"Googlebot IP ranges not loaded: {e}")
+    with app.app_context():
+        init_timetable_storage()
+        ensure_etacon_size_columns()
+        ensure_post_timestamp_columns()
+        load_board_registry()
+        build_search_suggest_index()
+    gevent.spawn(auth_token_purge_loop)
+    gevent.spawn(rate_limit_purge_loop)
+    gevent.spawn(googlebot_ranges_refresh_loop)
+    gevent.spawn(post_search_sync_loop)
+    gevent.spawn(search_suggest_rebuild_loop)
+    gevent.spawn(account_deletion_loop)
+    gevent.spawn(post_media_cleanup_loop)
+    gevent.spawn(post_media_variant_loop)
+
     http_server = WSGIServer(('0.0.0.0', 5000), app)
     print("Starting server on http://0.0.0.0:5000")
     http_server.serve_forever()
@@ -0,0 +1,82 @@
+// 마이페이지/프로필 활동 내역 무한 스크롤: 목록 끝(sentinel)이 보이면 data-next-cursor 로 다음 페이지를 불러옵니다.
+(function () {
+    function buildPostItem(item) {
+        const li = document.createElement('li');
+        const info = document.createElement('div');
+        info.className = 'post-info';
+
+        const title = document.createElement('a');
+        title.className = 'post-title';
+        title.href = item.url;
+        title.textContent = item.title;
+
+        const meta = document.createElement('p');
+        meta.className = 'post-meta';
+        meta.textContent = `${item.board_name} ・ ${item.updated_at}`;
+        info.append(title, meta);
+
+        const stats = document.createElement('div');
+        stats.className = 'post-stats';
+        const count = document.createElement('span');
+        count.textContent = `댓글 ${item.comment_count}`;
+        stats.appendChild(count);
+
+        li.append(info, stats);
+        return li;
+    }
+
+    function buildCommentItem(item) {
+        const li = document.createElement('li');
+        const info = document.createElement('div');
+        info.className = 'post-info';
+
+        const content = document.createElement('p');
+        content.className = 'comment-content';
+        content.textContent = item.content;
+
+        const link = document.createElement('a');
+        link.className = 'post-meta';
+        link.href = item.url;
+        link.textContent = `원본 글: ${item.post_title} ・ ${item.updated_at}`;
+        info.append(content, link);
+
+        li.appendChild(info);
+        return li;
+    }
+
+    function attach(container, buildItem) {
+        const list = container.querySelector('ul');
+        const sentinel = container.querySelector('.activity-feed-sentinel');
+        if (!list || !sentinel || !container.dataset.nextCursor) return;
+
+        let loading = false;
+        const observer = new IntersectionObserver(async function (entries) {
+            if (loading || !entries.some(entry => entry.isIntersecting)) return;
+            loading = true;
+            try {
+                const url = new URL(container.dataset.feedUrl, window.location.origin);
+                url.searchParams.set('cursor', container.dataset.nextCursor);
+                const response = await fetch(url);
+                if (!response.ok) throw new Error(response.statusText);
+                const data = await response.json();
+
+                data.items.forEach(item => list.appendChild(buildItem(item)));
+                container.dataset.nextCursor = data.next_cursor || '';
+                if (!data.next_cursor) observer.disconnect();
+            } catch (error) {
+                // 실패하면 더 이상 시도하지 않음 (새로고침으로 다시 시작)
+                observer.disconnect();
+            } finally {
+                loading = false;
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(sentinel);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        const posts = document.getElementById('posts-list');
+        const comments = document.getElementById('comments-list');
+        if (posts) attach(posts, buildPostItem);
+        if (comments) attach(comments, buildCommentItem);
+    });
+})();
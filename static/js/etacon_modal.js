@@ -100,13 +100,25 @@ document.addEventListener('DOMContentLoaded', function() {
                 const item = document.createElement('div');
                 item.className = 'etacon-item';
                 
-                const img = document.createElement('img');
-                img.src = `/static/${etacon.image_path}`; // 경로 주의
-                img.alt = 'etacon';
-                img.loading = 'lazy';
-                img.decoding = 'async';
-                
-                item.appendChild(img);
+                if (etacon.sprite) {
+                    // 스프라이트 시트: 패키지당 이미지 한 장만 내려받고 좌표로 잘라서 표시
+                    const sprite = document.createElement('span');
+                    sprite.className = 'etacon-sprite';
+                    sprite.setAttribute('role', 'img');
+                    sprite.setAttribute('aria-label', 'etacon');
+                    sprite.style.backgroundImage = `url('/static/${etacon.sprite.image}')`;
+                    sprite.style.backgroundSize = etacon.sprite.background_size;
+                    sprite.style.backgroundPosition = etacon.sprite.background_position;
+                    item.appendChild(sprite);
+                } else {
+                    const img = document.createElement('img');
+                    img.src = `/static/${etacon.image_path}`; // 경로 주의
+                    img.alt = 'etacon';
+                    img.loading = 'lazy';
+                    img.decoding = 'async';
+
+                    item.appendChild(img);
+                }
                 // 클릭 시 전송 함수 호출
                 item.addEventListener('click', () => sendEtacon(etacon.code));
                 grid.appendChild(item);
@@ -0,0 +1,70 @@
+// 검색창 자동완성: /api/search/suggest 결과(글 제목, 게시판, 닉네임)를 입력창 아래 목록으로 보여줍니다.
+(function () {
+    const DEBOUNCE_MS = 120;
+
+    function buildItem(label, kind, href) {
+        const link = document.createElement('a');
+        link.className = 'search-suggest-item';
+        link.href = href;
+
+        const badge = document.createElement('span');
+        badge.className = 'search-suggest-kind';
+        badge.textContent = kind;
+        link.appendChild(badge);
+        link.appendChild(document.createTextNode(label));
+        return link;
+    }
+
+    function attach(input) {
+        const box = document.createElement('div');
+        box.className = 'search-suggest';
+        box.hidden = true;
+        input.setAttribute('autocomplete', 'off');
+        input.parentNode.style.position = 'relative';
+        input.parentNode.appendChild(box);
+
+        let timer = null;
+        let controller = null;
+
+        function hide() {
+            box.hidden = true;
+            box.replaceChildren();
+        }
+
+        function render(data) {
+            box.replaceChildren();
+            (data.titles || []).forEach(item => box.appendChild(buildItem(item.title, '글', `/post/${item.id}`)));
+            (data.boards || []).forEach(item => box.appendChild(buildItem(item.name, '게시판', `/board/${item.id}`)));
+            (data.nicknames || []).forEach(name => box.appendChild(buildItem(name, '작성자', `/profile/${encodeURIComponent(name)}`)));
+            box.hidden = box.childElementCount === 0;
+        }
+
+        async function load(prefix) {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            try {
+                const response = await fetch(`/api/search/suggest?q=${encodeURIComponent(prefix)}`, { signal: controller.signal });
+                if (!response.ok) return hide();
+                render(await response.json());
+            } catch (error) {
+                if (error.name !== 'AbortError') hide();
+            }
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            const prefix = input.value.trim();
+            if (!prefix) return hide();
+            timer = setTimeout(() => load(prefix), DEBOUNCE_MS);
+        });
+        input.addEventListener('keydown', function (e) {
+            if (e.key === 'Escape') hide();
+        });
+        // 항목 클릭(mousedown)이 먼저 처리되도록 blur 후 약간 늦게 닫음
+        input.addEventListener('blur', () => setTimeout(hide, 150));
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('form[action$="/search"] input[name="q"]').forEach(attach);
+    });
+})();
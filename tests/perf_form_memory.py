@@ -0,0 +1,121 @@
+import argparse
+import ast
+import base64
+import binascii
+import codecs
+import hashlib
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote_plus, unquote_to_bytes, urlencode
+
+
+# 글쓰기 폼 메모리 벤치마크
+# - buffered: 기존 방식. 본문 전체를 읽어 parse_qsl 로 풀고, check_content_image_size 처럼 Base64를 정규식으로 훑음
+# - streaming: app.py의 StreamingUrlencodedReader + DataUriImageExtractor (이미지를 읽는 즉시 파일로 내보냄)
+# 동시에 N개의 업로드가 진행되는 상황을 조각 단위 라운드 로빈으로 흉내 내고, tracemalloc 최대 사용량을 비교합니다.
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_TREE = ast.parse(APP_PATH.read_text(encoding="utf-8"), filename=str(APP_PATH))
+CONSTANTS = ("DATA_URI_IMAGE_MARKER", "DATA_URI_HEADER_MAX_CHARS", "BASE64_RUN_RE", "FORM_SEPARATOR_RE",
+             "POST_MEDIA_URL_PREFIX", "POST_MEDIA_MAX_IMAGE_BYTES", "POST_MEDIA_EXTENSIONS", "POST_MEDIA_READ_CHUNK")
+
+
+class TooLarge(Exception):
+    pass
+
+
+def load_app_functions(names):
+    env = {"__builtins__": __builtins__, "re": re, "os": os, "base64": base64, "binascii": binascii,
+           "codecs": codecs, "hashlib": hashlib, "tempfile": tempfile,
+           "unquote_plus": unquote_plus, "unquote_to_bytes": unquote_to_bytes, "RequestEntityTooLarge": TooLarge}
+    for node in APP_TREE.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) in CONSTANTS for t in node.targets):
+            exec(compile(ast.Module(body=[node], type_ignores=[]), str(APP_PATH), "exec"), env)
+    for node in APP_TREE.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in names:
+            exec(compile(ast.Module(body=[node], type_ignores=[]), str(APP_PATH), "exec"), env)
+    return env
+
+
+def build_body(images, image_bytes, seed):
+    parts = ["<p>벤치마크 본문</p>"]
+    for index in range(images):
+        raw = hashlib.sha256(f"{seed}-{index}".encode()).digest() * (image_bytes // 32)
+        parts.append(f'<img src="data:image/png;base64,{base64.b64encode(raw).decode()}">')
+    return urlencode({"title": "벤치마크", "board_id": "1", "content": "".join(parts)}).encode()
+
+
+def run_buffered(bodies, chunk_size):
+    streams = [io.BytesIO(body) for body in bodies]
+    buffers = [bytearray() for _ in bodies]
+    active = list(range(len(bodies)))
+    while active:
+        for index in list(active):
+            chunk = streams[index].read(chunk_size)
+            if chunk:
+                buffers[index].extend(chunk)
+            else:
+                active.remove(index)
+    forms = [dict(parse_qsl(bytes(buffer).decode())) for buffer in buffers]
+    for form in forms:
+        re.findall(r'src=["\']data:image/[a-zA-Z]+;base64,([^"\']+)["\']', form["content"])
+    return forms
+
+
+def run_streaming(env, bodies, chunk_size, folder):
+    streams = [io.BytesIO(body) for body in bodies]
+    readers = [
+        env["StreamingUrlencodedReader"]({"content": env["DataUriImageExtractor"](folder)}, 2 * 1024 * 1024)
+        for _ in bodies
+    ]
+    active = list(range(len(bodies)))
+    while active:
+        for index in list(active):
+            chunk = streams[index].read(chunk_size)
+            if chunk:
+                readers[index].feed(chunk)
+            else:
+                active.remove(index)
+    return [dict(reader.close()) for reader in readers]
+
+
+def measure(label, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    forms = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:10s} peak {peak / 1024 / 1024:8.1f}MB  time {elapsed:6.2f}s  content {len(forms[0]['content']):>10,d} chars")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="글쓰기 폼 파싱 메모리 벤치마크 (buffered vs streaming)")
+    parser.add_argument("--uploads", type=int, default=8, help="동시 업로드 수")
+    parser.add_argument("--images", type=int, default=5)
+    parser.add_argument("--image-kb", type=int, default=4000)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    env = load_app_functions({"partial_suffix_length", "DataUriImageExtractor", "StreamingUrlencodedReader"})
+    bodies = [build_body(args.images, args.image_kb * 1024, seed) for seed in range(args.uploads)]
+    chunk_size = args.chunk_kb * 1024
+    print(f"uploads={args.uploads}, body={len(bodies[0]) / 1024 / 1024:.1f}MB each, chunk={args.chunk_kb}KB")
+    print("(요청 본문 자체는 소켓에서 읽는 것으로 보고 측정에서 제외)")
+
+    buffered = measure("buffered", lambda: run_buffered(bodies, chunk_size))
+    with tempfile.TemporaryDirectory() as folder:
+        streaming = measure("streaming", lambda: run_streaming(env, bodies, chunk_size, folder))
+    print(f"peak ratio: {buffered / max(streaming, 1):.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import sys
+import time
+
+import bcrypt
+import gevent
+from gevent.threadpool import ThreadPool
+
+
+# 로그인 처리량 벤치마크
+# - inline: 기존처럼 gevent 허브에서 bcrypt를 직접 실행
+# - pool:   app.py의 verify_password()와 같이 ThreadPool로 넘겨서 실행
+# 동시에 도는 "heartbeat" greenlet의 최대 지연(허브가 막힌 시간)도 함께 측정합니다.
+
+
+def measure(mode, pw_hash, password, concurrency, logins, workers):
+    pool = ThreadPool(workers) if mode == "pool" else None
+
+    def verify():
+        if pool is None:
+            return bcrypt.checkpw(password, pw_hash)
+        return pool.apply(bcrypt.checkpw, (password, pw_hash))
+
+    remaining = [logins]
+    max_stall = [0.0]
+    done = [False]
+
+    def heartbeat():
+        # SSE heartbeat / 다른 요청을 흉내내는 greenlet. 10ms마다 깨어나야 정상
+        interval = 0.01
+        while not done[0]:
+            started = time.perf_counter()
+            gevent.sleep(interval)
+            max_stall[0] = max(max_stall[0], time.perf_counter() - started - interval)
+
+    def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            assert verify()
+
+    ticker = gevent.spawn(heartbeat)
+    started = time.perf_counter()
+    gevent.joinall([gevent.spawn(worker) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    done[0] = True
+    ticker.join()
+    if pool is not None:
+        pool.kill()
+
+    return logins / elapsed, max_stall[0] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt 로그인 처리량 벤치마크 (허브 직접 실행 vs 스레드 풀)")
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    password = b"benchmark-password"
+    pw_hash = bcrypt.hashpw(password, bcrypt.gensalt(args.rounds))
+
+    print(f"bcrypt cost={args.rounds}, concurrency={args.concurrency}, logins={args.logins}, workers={args.workers}")
+    for mode in ("inline", "pool"):
+        throughput, stall_ms = measure(mode, pw_hash, password, args.concurrency, args.logins, args.workers)
+        print(f"- {mode:6s}: {throughput:7.1f} logins/s, max hub stall {stall_ms:7.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import argparse
+import ast
+import bisect
+import html
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+# /search 검색 지연 벤치마크 (기본 10만 건)
+# - legacy: 기존 posts_fts (unicode61 기본 토크나이저, 원문 그대로 색인)
+# - bigram: app.py의 posts_search (한글 음절 bigram + bm25 정렬)
+# 검색어별 p50/p95 지연과 적중 건수를 함께 출력합니다. 조사가 붙은 단어("시험은")를 legacy가 놓치는 것도 확인할 수 있습니다.
+# 마지막으로 /api/search/suggest 의 인메모리 접두 인덱스 조회 지연(목표 p95 < 20ms)도 측정합니다.
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_TREE = ast.parse(APP_PATH.read_text(encoding="utf-8"), filename=str(APP_PATH))
+
+NOUNS = ["시험", "급식", "기숙사", "중간고사", "수행평가", "동아리", "선생님", "체육대회", "도서관", "축제",
+         "과제", "모의고사", "야자", "수학", "영어", "물리", "화학", "생명", "축구", "방과후"]
+PARTICLES = ["", "은", "는", "이", "가", "을", "를", "에", "에서", "도", "만", "이랑"]
+VERBS = ["어땠어", "너무 어렵다", "망했다", "잘 봤다", "언제야", "정리했어요", "질문 있어요", "공유합니다", "후기"]
+QUERIES = ["시험", "중간고사", "급식 후기", "기숙사 야자", "python", "체육", "축"]
+
+
+def load_app_functions(names):
+    env = {"__builtins__": __builtins__, "re": re, "html": html, "bisect": bisect}
+    constants = ("SEARCH_TOKEN_RE", "HTML_TAG_RE", "SEARCH_SUGGEST_LIMIT", "SEARCH_SUGGEST_SCAN_LIMIT", "SEARCH_SUGGEST_KEYS_PER_TITLE")
+    for node in APP_TREE.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) in constants for t in node.targets):
+            exec(compile(ast.Module(body=[node], type_ignores=[]), str(APP_PATH), "exec"), env)
+    for node in APP_TREE.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in names:
+            exec(compile(ast.Module(body=[node], type_ignores=[]), str(APP_PATH), "exec"), env)
+    return env
+
+
+def make_filler_words(rng, count=3000):
+    # 주제어 외의 일반 어휘 (임의의 2~3음절 한글 단어)
+    return ["".join(chr(0xAC00 + rng.randrange(11172)) for _ in range(rng.randint(2, 3))) for _ in range(count)]
+
+
+def make_sentence(rng, filler):
+    words = []
+    for _ in range(rng.randint(3, 12)):
+        noun = rng.choice(NOUNS) if rng.random() < 0.15 else rng.choice(filler)
+        words.append(noun + rng.choice(PARTICLES))
+        if rng.random() < 0.4:
+            words.append(rng.choice(VERBS))
+    if rng.random() < 0.05:
+        words.append("python")
+    return " ".join(words)
+
+
+def build_corpus(conn, count, seed):
+    rng = random.Random(seed)
+    filler = make_filler_words(rng)
+    conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT, content TEXT)")
+    conn.executemany(
+        "INSERT INTO posts (id, title, content) VALUES (?, ?, ?)",
+        (
+            (i, make_sentence(rng, filler)[:40], f"<p>{make_sentence(rng, filler)}</p><p>{make_sentence(rng, filler)}</p>")
+            for i in range(1, count + 1)
+        ),
+    )
+    conn.commit()
+
+
+def build_legacy_index(conn):
+    started = time.perf_counter()
+    conn.execute("CREATE VIRTUAL TABLE posts_fts USING fts5(title, content)")
+    conn.execute("INSERT INTO posts_fts (rowid, title, content) SELECT id, title, content FROM posts")
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def build_bigram_index(conn, fns):
+    started = time.perf_counter()
+    conn.execute("CREATE VIRTUAL TABLE posts_search USING fts5(title, body, tokenize = 'unicode61')")
+    tokenize, to_text = fns["tokenize_search_text"], fns["html_to_search_text"]
+    rows = conn.execute("SELECT id, title, content FROM posts").fetchall()
+    conn.executemany(
+        "INSERT INTO posts_search (rowid, title, body) VALUES (?, ?, ?)",
+        ((pid, " ".join(tokenize(title, index=True)), " ".join(tokenize(to_text(content), index=True))) for pid, title, content in rows),
+    )
+    conn.commit()
+    return time.perf_counter() - started
+
+
+def measure(conn, sql, params, repeat):
+    timings = []
+    hits = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hits = len(conn.execute(sql, params).fetchall())
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return statistics.median(timings), p95, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 지연 벤치마크 (legacy posts_fts vs 한글 bigram posts_search)")
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    fns = load_app_functions({
+        "tokenize_search_text", "build_search_match_query", "html_to_search_text",
+        "PrefixIndex", "normalize_search_query", "get_suggestion_keys", "get_search_suggestions",
+    })
+    conn = sqlite3.connect(":memory:")
+    build_corpus(conn, args.posts, args.seed)
+    legacy_build = build_legacy_index(conn)
+    bigram_build = build_bigram_index(conn, fns)
+    print(f"posts={args.posts}, repeat={args.repeat}")
+    print(f"index build: legacy {legacy_build:.2f}s, bigram {bigram_build:.2f}s")
+
+    legacy_sql = "SELECT rowid FROM posts_fts WHERE posts_fts MATCH ? ORDER BY rank LIMIT 20"
+    bigram_sql = "SELECT rowid FROM posts_search WHERE posts_search MATCH ? ORDER BY bm25(posts_search, 3.0, 1.0) LIMIT 20"
+    count_legacy = "SELECT COUNT(*) FROM posts_fts WHERE posts_fts MATCH ?"
+    count_bigram = "SELECT COUNT(*) FROM posts_search WHERE posts_search MATCH ?"
+
+    for query in QUERIES:
+        legacy_match = " AND ".join(f'"{term}"' for term in query.split())
+        bigram_match = fns["build_search_match_query"](query)
+        l50, l95, _ = measure(conn, legacy_sql, (legacy_match,), args.repeat)
+        b50, b95, _ = measure(conn, bigram_sql, (bigram_match,), args.repeat)
+        legacy_hits = conn.execute(count_legacy, (legacy_match,)).fetchone()[0]
+        bigram_hits = conn.execute(count_bigram, (bigram_match,)).fetchone()[0]
+        print(
+            f"- {query:8s}  legacy p50 {l50:6.2f}ms p95 {l95:6.2f}ms hits {legacy_hits:6d}"
+            f" | bigram p50 {b50:6.2f}ms p95 {b95:6.2f}ms hits {bigram_hits:6d}"
+        )
+
+    measure_suggest(conn, fns, args.seed)
+    return 0
+
+
+def measure_suggest(conn, fns, seed):
+    titles = conn.execute("SELECT id, title FROM posts").fetchall()
+    started = time.perf_counter()
+    fns["search_suggest_index"] = {
+        "titles": fns["PrefixIndex"]((key, pid) for pid, title in titles for key in fns["get_suggestion_keys"](title)),
+        "nicknames": fns["PrefixIndex"](),
+        "post_titles": dict(titles),
+    }
+    fns["get_boards"] = lambda: []
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    prefixes = []
+    for _ in range(2000):
+        word = rng.choice(rng.choice(titles)[1].split())
+        prefixes.append(word[:rng.randint(1, len(word))])
+
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        fns["get_search_suggestions"](prefix)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95)]
+    print(
+        f"suggest: {len(fns['search_suggest_index']['titles'])} keys built in {build_seconds:.2f}s,"
+        f" p50 {statistics.median(timings):.3f}ms p95 {p95:.3f}ms ({'OK' if p95 < 20 else 'OVER'} 20ms budget)"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import ast
+import datetime
+import sqlite3
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+BOARDS = {1: {"board_id": 1, "board_name": "자유"}, 3: {"board_id": 3, "board_name": "익명"}}
+
+
+class ActivityFeedPagingTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, board_id INTEGER, title TEXT, author TEXT,
+                                comment_count INTEGER DEFAULT 0, updated_at TEXT);
+            CREATE TABLE comments (id INTEGER PRIMARY KEY, post_id INTEGER, author TEXT, content TEXT, updated_at TEXT);
+            CREATE INDEX idx_posts_author_updated ON posts (author, updated_at);
+            CREATE INDEX idx_comments_author_updated ON comments (author, updated_at);
+        """)
+        self.env = load_functions(
+            ["format_activity_cursor", "parse_activity_cursor", "parse_db_datetime",
+             "fetch_user_posts_page", "fetch_user_comments_page"],
+            {
+                "datetime": datetime,
+                "ACTIVITY_PAGE_SIZE": 20,
+                "ANONYMOUS_BOARD_ID": 3,
+                "get_board": BOARDS.get,
+            },
+        )
+
+    def collect(self, fetch, page_size, **kwargs):
+        seen, before = [], None
+        while True:
+            rows, before = fetch(self.conn.cursor(), "me", before and self.env["parse_activity_cursor"](before),
+                                 limit=page_size, **kwargs)
+            seen.extend(row["id"] for row in rows)
+            if before is None:
+                return seen
+
+    def test_pages_cover_every_post_once_even_with_equal_timestamps(self):
+        # 같은 시각에 쓰인 글이 페이지 경계에 걸쳐도 누락/중복이 없어야 함
+        rows = [(i, 3 if i % 5 == 0 else 1, f"t{i}", "me", f"2026-01-0{1 + i // 20} 00:00:00") for i in range(1, 61)]
+        self.conn.executemany("INSERT INTO posts (id, board_id, title, author, updated_at) VALUES (?, ?, ?, ?, ?)", rows)
+        self.conn.execute("INSERT INTO posts (id, board_id, title, author, updated_at) VALUES (999, 1, 'x', 'other', '2026-02-01 00:00:00')")
+
+        own = self.collect(self.env["fetch_user_posts_page"], 7, include_anonymous=True)
+        public = self.collect(self.env["fetch_user_posts_page"], 7)
+
+        expected = [r[0] for r in sorted(rows, key=lambda r: (r[4], r[0]), reverse=True)]
+        self.assertEqual(own, expected)
+        self.assertEqual(public, [pid for pid in expected if pid % 5])
+        first, _ = self.env["fetch_user_posts_page"](self.conn.cursor(), "me", limit=1)
+        self.assertEqual(first[0]["board_name"], "자유")
+
+    def test_comment_pages_join_post_title_and_hide_anonymous_board(self):
+        self.conn.executemany("INSERT INTO posts (id, board_id, title, author, updated_at) VALUES (?, ?, ?, 'x', '2026-01-01 00:00:00')",
+                              [(1, 1, "공개"), (2, 3, "익명")])
+        self.conn.executemany("INSERT INTO comments (id, post_id, author, content, updated_at) VALUES (?, ?, 'me', 'c', ?)",
+                              [(i, 1 + i % 2, f"2026-01-01 00:00:{i:02d}") for i in range(1, 26)])
+
+        public = self.collect(self.env["fetch_user_comments_page"], 4)
+        rows, next_cursor = self.env["fetch_user_comments_page"](self.conn.cursor(), "me", include_anonymous=True)
+
+        self.assertEqual(public, list(range(24, 0, -2)))
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows[0]["post_title"], "익명")
+        self.assertEqual(next_cursor, "2026-01-01 00:00:06|6")
+
+    def test_keyset_query_uses_author_index(self):
+        plan = " ".join(row[3] for row in self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM posts p WHERE p.author = ? AND (p.updated_at, p.id) < (?, ?) "
+            "ORDER BY p.updated_at DESC, p.id DESC LIMIT 21", ("me", "2026-01-01 00:00:00", 5)))
+        self.assertIn("idx_posts_author_updated", plan)
+
+    def test_malformed_cursor_is_rejected(self):
+        parse = self.env["parse_activity_cursor"]
+        self.assertEqual(parse("2026-01-01 00:00:00|12"), ("2026-01-01 00:00:00", 12))
+        for value in ("", None, "garbage", "2026-01-01 00:00:00|x", "not-a-date|3"):
+            self.assertIsNone(parse(value))
+
+
+if __name__ == "__main__":
+    unittest.main()
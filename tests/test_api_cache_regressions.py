@@ -0,0 +1,128 @@
+import ast
+import datetime
+import hashlib
+import types
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+class FakeETags:
+    def __init__(self, *etags):
+        self.etags = set(etags)
+
+    def __bool__(self):
+        return bool(self.etags)
+
+    def contains(self, etag):
+        return etag in self.etags
+
+
+class FakeCacheControl:
+    def __init__(self):
+        self.private = False
+        self.no_cache = False
+
+
+class FakeResponse:
+    def __init__(self, body="", status=200):
+        self.body = body
+        self.status_code = status
+        self.etag = None
+        self.last_modified = None
+        self.cache_control = FakeCacheControl()
+
+    def set_etag(self, etag):
+        self.etag = etag
+
+
+FAKE_APP = types.SimpleNamespace(route=lambda *args, **kwargs: (lambda fn: fn))
+
+
+class ConditionalGetRegressionTests(unittest.TestCase):
+    def load(self, names, request_state, extra=None):
+        env_globals = {
+            "app": FAKE_APP,
+            "hashlib": hashlib,
+            "datetime": datetime,
+            "request": request_state,
+            "Response": FakeResponse,
+            "jsonify": lambda payload: FakeResponse(body=payload),
+            "STATIC_ASSET_VERSION": "test",
+        }
+        env_globals.update(extra or {})
+        return load_functions(
+            ["build_etag", "parse_http_last_modified", "is_not_modified", "apply_validators", "not_modified_response"] + names,
+            env_globals,
+        )
+
+    def test_matching_if_none_match_returns_304_without_loading_meals(self):
+        today = datetime.datetime.now().strftime("%Y%m%d")
+        probe = self.load([], types.SimpleNamespace(if_none_match=FakeETags(), if_modified_since=None))
+        etag = probe["build_etag"]("bob", today)
+
+        calls = []
+        env = self.load(
+            ["api_bob"],
+            types.SimpleNamespace(if_none_match=FakeETags(etag), if_modified_since=None),
+            {"get_bob": lambda: calls.append("get_bob") or ["a", "b", "c"]},
+        )
+
+        response = env["api_bob"]()
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.etag, etag)
+        self.assertTrue(response.cache_control.private)
+        self.assertEqual(calls, [])
+
+    def test_meal_api_failure_is_not_given_an_etag(self):
+        env = self.load(
+            ["api_bob"],
+            types.SimpleNamespace(if_none_match=FakeETags(), if_modified_since=None),
+            {"get_bob": lambda: ["API 호출 실패", "API 호출 실패", "API 호출 실패"]},
+        )
+
+        response = env["api_bob"]()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.etag)
+
+    def test_if_modified_since_is_used_only_without_if_none_match(self):
+        last_modified = datetime.datetime(2026, 1, 1, 9, 0, tzinfo=datetime.timezone.utc)
+        newer = types.SimpleNamespace(if_none_match=FakeETags(), if_modified_since=last_modified)
+        env = self.load([], newer)
+        self.assertTrue(env["is_not_modified"]("etag", last_modified))
+
+        stale_etag = types.SimpleNamespace(if_none_match=FakeETags("other"), if_modified_since=last_modified)
+        env = self.load([], stale_etag)
+        self.assertFalse(env["is_not_modified"]("etag", last_modified))
+
+    def test_etag_changes_with_version_stamp_and_user(self):
+        env = self.load([], types.SimpleNamespace(if_none_match=FakeETags(), if_modified_since=None))
+        build_etag = env["build_etag"]
+
+        self.assertEqual(build_etag("notifications", "u1", 10, 3), build_etag("notifications", "u1", 10, 3))
+        self.assertNotEqual(build_etag("notifications", "u1", 10, 3), build_etag("notifications", "u1", 11, 3))
+        self.assertNotEqual(build_etag("notifications", "u1", 10, 3), build_etag("notifications", "u2", 10, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import ast
+import datetime
+import hashlib
+import secrets
+import sqlite3
+import types
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+class FakeResponse:
+    def __init__(self):
+        self.cookies = {}
+
+    def set_cookie(self, name, value, **kwargs):
+        self.cookies[name] = value
+
+
+class FakeSession(dict):
+    permanent = False
+
+
+class AuthTokenRegressionTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE auth_tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, token_hash TEXT NOT NULL, user_id TEXT NOT NULL,
+                user_agent TEXT, created_at TEXT NOT NULL, last_used_at TEXT, expires_at TEXT NOT NULL
+            );
+            CREATE UNIQUE INDEX idx_auth_tokens_hash ON auth_tokens (token_hash);
+        """)
+        self.after_request = []
+        self.session = FakeSession()
+        self.request = types.SimpleNamespace(cookies={}, headers={"User-Agent": "test-agent"})
+        self.env = load_functions(
+            [
+                "hash_auth_token", "find_auth_token", "issue_auth_token", "set_auth_token_cookie",
+                "revoke_auth_token", "revoke_user_auth_tokens", "check_auto_login",
+            ],
+            {
+                "app": types.SimpleNamespace(before_request=lambda fn: fn),
+                "datetime": datetime,
+                "hashlib": hashlib,
+                "secrets": secrets,
+                "request": self.request,
+                "session": self.session,
+                "g": types.SimpleNamespace(),
+                "get_db": lambda: self.conn,
+                "fetch_user_identity": lambda user_id: {"login_id": user_id},
+                "after_this_request": lambda fn: self.after_request.append(fn) or fn,
+                "AUTH_TOKEN_LIFETIME_DAYS": 90,
+                "AUTH_TOKEN_ROTATION_GRACE_SECONDS": 60,
+            },
+        )
+
+    def test_each_device_gets_its_own_token(self):
+        cursor = self.conn.cursor()
+        first = self.env["issue_auth_token"](cursor, "student")
+        second = self.env["issue_auth_token"](cursor, "student")
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM auth_tokens").fetchone()[0], 2)
+
+        self.env["revoke_auth_token"](cursor, first)
+        remaining = self.conn.execute("SELECT token_hash FROM auth_tokens").fetchall()
+        self.assertEqual(remaining, [(self.env["hash_auth_token"](second),)])
+
+    def test_auto_login_uses_token_hash_index_and_rotates_cookie(self):
+        token = self.env["issue_auth_token"](self.conn.cursor(), "student")
+        self.request.cookies["remember_token"] = token
+
+        plan = self.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id, user_id, expires_at FROM auth_tokens WHERE token_hash = ? AND expires_at > ?",
+            ("x", "y"),
+        ).fetchall()
+        self.assertIn("idx_auth_tokens_hash", " ".join(str(row[-1]) for row in plan))
+
+        self.env["check_auto_login"]()
+
+        self.assertEqual(self.session["user_id"], "student")
+        self.assertEqual(len(self.after_request), 1)
+        response = self.after_request[0](FakeResponse())
+        new_token = response.cookies["remember_token"]
+        self.assertNotEqual(new_token, token)
+
+        rows = dict(self.conn.execute("SELECT token_hash, expires_at FROM auth_tokens").fetchall())
+        old_expiry = datetime.datetime.strptime(rows[self.env["hash_auth_token"](token)], "%Y-%m-%d %H:%M:%S")
+        self.assertLess(old_expiry, datetime.datetime.now() + datetime.timedelta(minutes=5))
+
+        # 유예 중인 이전 토큰으로 들어온 동시 요청은 로그인만 되고 다시 교체하지 않음
+        self.session.clear()
+        self.env["check_auto_login"]()
+        self.assertEqual(self.session["user_id"], "student")
+        self.assertEqual(len(self.after_request), 1)
+
+    def test_expired_token_does_not_log_in(self):
+        self.conn.execute(
+            "INSERT INTO auth_tokens (token_hash, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (self.env["hash_auth_token"]("old"), "student", "2020-01-01 00:00:00", "2020-04-01 00:00:00"),
+        )
+        self.request.cookies["remember_token"] = "old"
+
+        self.env["check_auto_login"]()
+
+        self.assertNotIn("user_id", self.session)
+
+
+class FakePool:
+    def __init__(self):
+        self.calls = []
+
+    def apply(self, fn, args):
+        self.calls.append(fn.__name__)
+        return fn(*args)
+
+
+class FakeBcrypt:
+    def generate_password_hash(self, password, rounds):
+        return f"$2b${rounds:02d}$salt{password}".encode("utf-8")
+
+    def check_password_hash(self, pw_hash, password):
+        return pw_hash.endswith(f"salt{password}")
+
+
+class PasswordHashingRegressionTests(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakePool()
+        self.env = load_functions(
+            ["hash_password", "hash_guest_password", "verify_password", "password_needs_rehash"],
+            {
+                "app": types.SimpleNamespace(config={"BCRYPT_LOG_ROUNDS": 12}),
+                "bcrypt": FakeBcrypt(),
+                "password_hash_pool": self.pool,
+                "GUEST_PASSWORD_LOG_ROUNDS": 8,
+            },
+        )
+
+    def test_hashing_and_verification_run_on_the_thread_pool(self):
+        member_hash = self.env["hash_password"]("secret")
+        guest_hash = self.env["hash_guest_password"]("1234")
+
+        self.assertTrue(member_hash.startswith("$2b$12$"))
+        self.assertTrue(guest_hash.startswith("$2b$08$"))
+        self.assertTrue(self.env["verify_password"](member_hash, "secret"))
+        self.assertFalse(self.env["verify_password"](None, "secret"))
+        self.assertEqual(
+            self.pool.calls,
+            ["generate_password_hash", "generate_password_hash", "check_password_hash"],
+        )
+
+    def test_rehash_is_requested_only_when_cost_differs(self):
+        needs_rehash = self.env["password_needs_rehash"]
+
+        self.assertFalse(needs_rehash("$2b$12$abcdefghijklmnopqrstuv"))
+        self.assertTrue(needs_rehash("$2b$10$abcdefghijklmnopqrstuv"))
+        self.assertTrue(needs_rehash("not-a-bcrypt-hash"))
+        self.assertTrue(needs_rehash(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
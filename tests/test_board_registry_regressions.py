@@ -0,0 +1,90 @@
+import ast
+import os
+import sqlite3
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+class BoardRegistryRegressionTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE board (board_id INTEGER PRIMARY KEY, board_name TEXT, is_public INTEGER)")
+        self.conn.executemany("INSERT INTO board VALUES (?, ?, ?)", [(1, "자유게시판", 0), (3, "익명게시판", 1)])
+        self.queries = []
+        self.conn.set_trace_callback(lambda sql: self.queries.append(sql) if sql.startswith("SELECT") else None)
+
+        workdir = tempfile.mkdtemp()
+        self.stamp = os.path.join(workdir, "board_registry.stamp")
+        self.addCleanup(lambda: os.path.exists(self.stamp) and os.unlink(self.stamp))
+        self.now = [1000.0]
+        self.env = load_functions(
+            [
+                "get_board_registry_stamp", "load_board_registry", "get_board_registry",
+                "get_board", "get_boards", "invalidate_board_registry",
+            ],
+            {
+                "os": os,
+                "time": types.SimpleNamespace(time=lambda: self.now[0]),
+                "get_db": lambda: self.conn,
+                "board_registry": {"boards": {}, "stamp": None, "checked_at": 0},
+                "BOARD_REGISTRY_STAMP_FILE": self.stamp,
+                "BOARD_REGISTRY_CHECK_INTERVAL": 5,
+            },
+        )
+
+    def test_lookups_are_served_from_memory(self):
+        get_board = self.env["get_board"]
+
+        self.assertEqual(get_board("3")["board_name"], "익명게시판")
+        self.assertEqual(get_board(1)["is_public"], 0)
+        self.assertIsNone(get_board(99))
+        self.assertIsNone(get_board("abc"))
+        self.assertEqual([board["board_id"] for board in self.env["get_boards"]()], [1, 3])
+        self.assertEqual(len(self.queries), 1)
+
+    def test_stamp_change_from_another_worker_triggers_reload(self):
+        get_board = self.env["get_board"]
+        self.assertIsNone(get_board(5))
+
+        self.conn.execute("INSERT INTO board VALUES (5, '새 게시판', 1)")
+        # 다른 프로세스가 invalidate_board_registry()로 스탬프를 갱신한 상황
+        with open(self.stamp, "w"):
+            pass
+        self.assertIsNone(get_board(5))  # 확인 주기 전에는 기존 값을 사용
+
+        self.now[0] += 5
+        self.assertEqual(get_board(5)["board_name"], "새 게시판")
+
+    def test_invalidate_reloads_current_process_immediately(self):
+        self.env["get_board"](1)
+        self.conn.execute("UPDATE board SET is_public = 1 WHERE board_id = 1")
+
+        self.env["invalidate_board_registry"]()
+
+        self.assertTrue(os.path.exists(self.stamp))
+        self.assertEqual(self.env["get_board"](1)["is_public"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
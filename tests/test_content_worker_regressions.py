@@ -0,0 +1,112 @@
+import ast
+import re
+import threading
+import time
+import types
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+class ExecutorPool:
+    """gevent ThreadPool.apply 대신 실제 스레드에서 실행하고 결과를 기다리는 가짜 풀"""
+
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(workers)
+        self.threads = set()
+
+    def apply(self, func, args=()):
+        def run():
+            self.threads.add(threading.get_ident())
+            return func(*args)
+        return self.executor.submit(run).result()
+
+
+def new_stats():
+    return {"submitted": 0, "completed": 0, "failed": 0, "pending": 0, "max_pending": 0,
+            "total_wait_ms": 0.0, "total_run_ms": 0.0}
+
+
+class RunContentTaskTests(unittest.TestCase):
+    def setUp(self):
+        self.pool = ExecutorPool(2)
+        self.stats = new_stats()
+        self.env = load_functions(["run_content_task"], {
+            "time": time,
+            "content_worker_pool": self.pool,
+            "content_worker_slots": threading.BoundedSemaphore(4),
+            "content_worker_stats": self.stats,
+        })
+
+    def test_work_runs_off_the_calling_thread_and_is_counted(self):
+        result = self.env["run_content_task"](lambda a, b: a + b, 2, 3)
+
+        self.assertEqual(result, 5)
+        self.assertNotIn(threading.get_ident(), self.pool.threads)
+        self.assertEqual((self.stats["submitted"], self.stats["completed"], self.stats["pending"]), (1, 1, 0))
+        self.assertEqual(self.stats["max_pending"], 1)
+
+    def test_exceptions_propagate_and_release_the_slot(self):
+        def boom():
+            raise ValueError("bad")
+
+        with self.assertRaises(ValueError):
+            self.env["run_content_task"](boom)
+
+        self.assertEqual((self.stats["failed"], self.stats["pending"]), (1, 0))
+        self.assertEqual(self.env["run_content_task"](len, "abc"), 3)
+
+
+class AnalyzePostContentTests(unittest.TestCase):
+    def setUp(self):
+        self.image_result = (True, 0)
+        fake_bleach = types.SimpleNamespace(clean=lambda content, tags, strip: re.sub(r"<[^>]+>", "", content))
+        self.env = load_functions(["analyze_post_content"], {
+            "bleach": fake_bleach,
+            "check_content_image_size": lambda content, image_sizes=(): self.image_result,
+            "sanitize_rich_content": lambda content: content.replace("<script>", ""),
+            "MAX_POST_CONTENT_CHARS": 10,
+        })
+
+    def test_valid_content_is_sanitized_and_images_counted(self):
+        result = self.env["analyze_post_content"]('<p>hi</p><img src="a"><img src="b">')
+        self.assertEqual(result["plain_length"], 2)
+        self.assertEqual(result["image_count"], 2)
+        self.assertIsNone(result["image_error"])
+
+    def test_image_error_short_circuits(self):
+        self.image_result = (False, -1)
+        result = self.env["analyze_post_content"]("<p>hi</p>")
+        self.assertEqual(result["image_error"], -1)
+        self.assertIsNone(result["sanitized"])
+        # 비회원 글은 이미지 용량 검사를 하지 않음
+        self.assertEqual(self.env["analyze_post_content"]("<p>hi</p>", False)["plain_length"], 2)
+
+    def test_out_of_range_length_skips_sanitize(self):
+        for content in ("<p></p>", "<p>" + "x" * 11 + "</p>"):
+            result = self.env["analyze_post_content"](content)
+            self.assertIsNone(result["sanitized"])
+            self.assertEqual(result["image_count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import ast
+import datetime
+import sqlite3
+import types
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+FAKE_CACHE = types.SimpleNamespace(memoize=lambda *args, **kwargs: (lambda fn: fn))
+
+
+def stamp(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class DatetimeFormattingTests(unittest.TestCase):
+    def setUp(self):
+        self.env = load_functions(
+            ["parse_db_datetime", "to_db_epoch", "format_datetime"],
+            {"datetime": datetime, "DB_EPOCH_ORIGIN": datetime.datetime(1970, 1, 1)},
+        )
+
+    def test_parse_matches_strptime(self):
+        value = "2026-03-04 05:06:07"
+        self.assertEqual(
+            self.env["parse_db_datetime"](value),
+            datetime.datetime.strptime(value, "%Y-%m-%d %H:%M:%S"),
+        )
+
+    def test_epoch_matches_sqlite_strftime(self):
+        value = "2026-03-04 05:06:07"
+        expected = sqlite3.connect(":memory:").execute("SELECT CAST(strftime('%s', ?) AS INTEGER)", (value,)).fetchone()[0]
+        self.assertEqual(self.env["to_db_epoch"](value), expected)
+        self.assertEqual(self.env["parse_db_datetime"](expected), datetime.datetime(2026, 3, 4, 5, 6, 7))
+
+    def test_relative_labels(self):
+        format_datetime = self.env["format_datetime"]
+        now = datetime.datetime.now()
+
+        self.assertEqual(format_datetime(stamp(now)), "방금 전")
+        self.assertEqual(format_datetime(stamp(now - datetime.timedelta(minutes=5, seconds=10))), "5분 전")
+        self.assertEqual(format_datetime(stamp(now - datetime.timedelta(hours=3, minutes=1))), "3시간 전")
+        self.assertEqual(format_datetime(stamp(now - datetime.timedelta(days=2, minutes=1))), "2일 전")
+        self.assertEqual(format_datetime("2020-01-02 03:04:05"), "2020-01-02")
+
+
+class PostTimestampColumnTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(
+            "CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT, view_count INTEGER, created_at TEXT)"
+        )
+        self.env = load_functions(
+            ["ensure_post_timestamp_columns", "parse_db_datetime", "to_db_epoch", "get_trending_posts"],
+            {
+                "datetime": datetime,
+                "sqlite3": sqlite3,
+                "cache": FAKE_CACHE,
+                "DB_EPOCH_ORIGIN": datetime.datetime(1970, 1, 1),
+                "get_db": lambda: self.conn,
+            },
+        )
+
+    def test_migration_is_idempotent_and_indexed(self):
+        self.env["ensure_post_timestamp_columns"](self.conn)
+        self.env["ensure_post_timestamp_columns"](self.conn)
+
+        self.conn.execute("INSERT INTO posts (title, view_count, created_at) VALUES ('a', 1, '2026-03-04 05:06:07')")
+        row = self.conn.execute("SELECT created_ts FROM posts").fetchone()
+        self.assertEqual(row[0], self.env["to_db_epoch"]("2026-03-04 05:06:07"))
+
+        plan = " ".join(
+            r[3] for r in self.conn.execute("EXPLAIN QUERY PLAN SELECT id FROM posts WHERE created_ts >= 0").fetchall()
+        )
+        self.assertIn("idx_posts_created_ts", plan)
+
+    def test_trending_filters_by_integer_window(self):
+        self.env["ensure_post_timestamp_columns"](self.conn)
+        now = datetime.datetime.now()
+        self.conn.executemany(
+            "INSERT INTO posts (title, view_count, created_at) VALUES (?, ?, ?)",
+            [
+                ("fresh", 30, stamp(now - datetime.timedelta(hours=1))),
+                ("old", 90, stamp(now - datetime.timedelta(hours=30))),
+                ("quiet", 3, stamp(now - datetime.timedelta(hours=2))),
+            ],
+        )
+
+        titles = [post["title"] for post in self.env["get_trending_posts"]()]
+
+        self.assertEqual(titles, ["fresh"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+import ast
+import bisect
+import math
+import sqlite3
+import types
+import unittest
+from array import array
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.FunctionDef) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+def get_top_level_literal(name):
+    for node in APP_TREE.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id == name:
+                    return ast.literal_eval(node.value)
+    raise KeyError(name)
+
+
+class CountingConnection:
+    """commit 횟수와 실행된 문장 수를 세는 sqlite3 연결 래퍼"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.commits = 0
+        self.statements = 0
+
+    def cursor(self):
+        owner = self
+        cursor = self.conn.cursor()
+
+        class Cursor:
+            def execute(self, *args):
+                owner.statements += 1
+                return cursor.execute(*args)
+
+            def executemany(self, *args):
+                owner.statements += 1
+                return cursor.executemany(*args)
+
+            def fetchall(self):
+                return cursor.fetchall()
+
+            def fetchone(self):
+                return cursor.fetchone()
+
+        return Cursor()
+
+    def commit(self):
+        self.commits += 1
+        self.conn.commit()
+
+
+def create_schema(conn):
+    conn.executescript("""
+        CREATE TABLE users (login_id TEXT PRIMARY KEY, comment_count INTEGER, post_count INTEGER,
+                            level INTEGER, exp INTEGER, point INTEGER);
+        CREATE TABLE posts (id INTEGER PRIMARY KEY, author TEXT, content TEXT);
+        CREATE TABLE comments (id INTEGER PRIMARY KEY, post_id INTEGER, author TEXT, parent_comment_id INTEGER);
+        CREATE TABLE reactions (id INTEGER PRIMARY KEY, target_type TEXT, target_id INTEGER);
+        CREATE TABLE polls (id INTEGER PRIMARY KEY, post_id INTEGER);
+        CREATE TABLE poll_options (id INTEGER PRIMARY KEY, poll_id INTEGER);
+        CREATE TABLE poll_history (id INTEGER PRIMARY KEY, poll_id INTEGER);
+        CREATE TABLE notifications (id INTEGER PRIMARY KEY, recipient_id TEXT, post_id INTEGER, is_read INTEGER DEFAULT 0);
+    """)
+
+
+class PostDeleteCascadeTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        create_schema(self.conn)
+        self.released = []
+        self.env = load_functions(["delete_post_cascade"], {
+            "GUEST_USER_ID": "__guest__",
+            "release_post_media": lambda cursor, content: self.released.append(content),
+        })
+
+    def test_cascade_handles_threads_larger_than_the_variable_limit(self):
+        conn = self.conn
+        conn.executemany("INSERT INTO users (login_id, comment_count) VALUES (?, ?)",
+                         [("a", 2000), ("b", 10), ("__guest__", 0)])
+        conn.executemany("INSERT INTO posts (id, author) VALUES (?, ?)", [(1, "a"), (2, "b")])
+        authors = ["a"] * 1500 + ["b"] * 3 + ["__guest__"] * 2
+        conn.executemany("INSERT INTO comments (post_id, author) VALUES (1, ?)", [(a,) for a in authors])
+        conn.execute("INSERT INTO comments (id, post_id, author) VALUES (99999, 2, 'a')")
+        conn.execute("INSERT INTO reactions (target_type, target_id) SELECT 'comment', id FROM comments")
+        conn.executemany("INSERT INTO reactions (target_type, target_id) VALUES ('post', ?)", [(1,), (2,)])
+        conn.execute("INSERT INTO polls (id, post_id) VALUES (7, 1)")
+        conn.execute("INSERT INTO poll_options (poll_id) VALUES (7)")
+        conn.execute("INSERT INTO poll_history (poll_id) VALUES (7)")
+
+        self.env["delete_post_cascade"](conn.cursor(), 1)
+
+        counts = dict(conn.execute("SELECT login_id, comment_count FROM users"))
+        self.assertEqual(counts, {"a": 500, "b": 7, "__guest__": 0})
+        self.assertEqual(conn.execute("SELECT id FROM posts").fetchall(), [(2,)])
+        self.assertEqual(conn.execute("SELECT id FROM comments").fetchall(), [(99999,)])
+        self.assertEqual(
+            sorted(conn.execute("SELECT target_type, target_id FROM reactions")),
+            [("comment", 99999), ("post", 2)],
+        )
+        for table in ("polls", "poll_options", "poll_history"):
+            self.assertEqual(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0], 0)
+
+    def test_cascade_removes_post_notifications_and_reports_unread_recipients(self):
+        conn = self.conn
+        conn.executemany("INSERT INTO posts (id, author) VALUES (?, ?)", [(1, "a"), (2, "b")])
+        conn.executemany(
+            "INSERT INTO notifications (recipient_id, post_id, is_read) VALUES (?, ?, ?)",
+            [("a", 1, 0), ("a", 1, 0), ("b", 1, 1), ("c", 1, 0), ("c", 2, 0)],
+        )
+
+        recipients = self.env["delete_post_cascade"](conn.cursor(), 1)
+
+        self.assertEqual(sorted(recipients), ["a", "c"])
+        self.assertEqual(conn.execute("SELECT recipient_id, post_id FROM notifications").fetchall(), [("c", 2)])
+
+    def test_cascade_releases_the_post_media(self):
+        self.conn.execute("INSERT INTO posts (id, author, content) VALUES (1, 'a', '<img src=\"x\">')")
+
+        self.env["delete_post_cascade"](self.conn.cursor(), 1)
+        self.env["delete_post_cascade"](self.conn.cursor(), 1)
+
+        self.assertEqual(self.released, ['<img src="x">'])
+
+
+class BatchedExpAdjustmentTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        create_schema(self.conn)
+        self.counting = CountingConnection(self.conn)
+        self.cache = {}
+        env_globals = {
+            "math": math,
+            "bisect": bisect,
+            "array": array,
+            "get_db": lambda: self.counting,
+            "user_identity_cache": self.cache,
+            "log_user_identity_changes": lambda user_ids: None,
+            "has_request_context": lambda: False,
+        }
+        for name in ("BASE_EXP_PER_LEVEL", "LEVEL_EXP_GROWTH_RATE", "BASE_LEVEL_UP_POINT_REWARD",
+                     "LEVEL_REWARD_STEP", "LEVEL_REWARD_STEP_INTERVAL", "LEVEL_TABLE_MAX_LEVEL"):
+            env_globals[name] = get_top_level_literal(name)
+        self.env = load_functions(
+            ["get_required_exp_for_level", "get_level_point_reward", "build_level_tables", "get_total_exp",
+             "resolve_level", "get_level_up_reward", "update_exp_levels", "update_exp_level", "touch_user_identity"],
+            env_globals,
+        )
+        self.env["LEVEL_CUMULATIVE_EXP"], self.env["LEVEL_CUMULATIVE_REWARD"] = self.env["build_level_tables"]()
+
+    def test_many_users_are_adjusted_with_one_write_and_one_commit(self):
+        users = [(f"u{i}", 2, 5, 0) for i in range(120)]
+        self.conn.executemany("INSERT INTO users (login_id, level, exp, point) VALUES (?, ?, ?, ?)", users)
+        self.cache.update({f"u{i}": object() for i in range(120)})
+
+        results = self.env["update_exp_levels"]({f"u{i}": -10 for i in range(120)} | {"ghost": -10})
+
+        self.assertEqual(self.counting.commits, 1)
+        self.assertEqual(self.counting.statements, 2)
+        self.assertNotIn("ghost", results)
+        self.assertEqual(results["u0"]["level"], 1)
+        self.assertEqual(results["u0"]["exp"], 495)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM users WHERE level = 1 AND exp = 495").fetchone()[0], 120)
+        self.assertEqual(self.cache, {})
+
+    def test_commit_false_leaves_transaction_to_caller(self):
+        self.conn.execute("INSERT INTO users (login_id, level, exp, point) VALUES ('u', 1, 450, 0)")
+
+        result = self.env["update_exp_levels"]({"u": 60}, commit=False)["u"]
+
+        self.assertEqual(self.counting.commits, 0)
+        self.assertEqual((result["level"], result["exp"], result["point_reward"]), (2, 10, 100))
+        self.assertEqual(self.env["update_exp_level"]("missing", 10), {"level_gained": 0, "point_reward": 0})
+
+
+class AccountDeletionJobTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE users (login_id TEXT PRIMARY KEY);
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, author TEXT, content TEXT);
+            CREATE TABLE comments (id INTEGER PRIMARY KEY, author TEXT);
+            CREATE TABLE account_deletion_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, old_login_id TEXT NOT NULL, new_login_id TEXT NOT NULL,
+                posts_moved INTEGER NOT NULL DEFAULT 0, comments_moved INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL, finished_at TEXT,
+                state TEXT NOT NULL DEFAULT 'pending', claimed_at INTEGER);
+        """)
+        self.yields = 0
+
+        def sleep(_seconds):
+            self.yields += 1
+
+        self.env = load_functions(
+            ["is_login_id_taken", "claim_account_deletion_job", "run_account_deletion_job"],
+            {
+                "datetime": __import__("datetime"),
+                "time": __import__("time"),
+                "ACCOUNT_DELETION_LEASE": get_top_level_literal("ACCOUNT_DELETION_LEASE"),
+                "gevent": types.SimpleNamespace(sleep=sleep),
+                "ACCOUNT_DELETION_CHUNK": get_top_level_literal("ACCOUNT_DELETION_CHUNK"),
+                "ACCOUNT_DELETION_TABLES": get_top_level_literal("ACCOUNT_DELETION_TABLES"),
+            },
+        )
+
+    def test_job_rewrites_authors_in_chunks_and_releases_login_id(self):
+        conn = self.conn
+        conn.executemany("INSERT INTO posts (author) VALUES (?)", [("old",)] * 25 + [("keep",)])
+        conn.executemany("INSERT INTO comments (author) VALUES (?)", [("old",)] * 7)
+        conn.execute("INSERT INTO account_deletion_jobs (old_login_id, new_login_id, created_at) VALUES ('old', 'deleted_old', 'now')")
+        conn.commit()
+        cursor = conn.cursor()
+
+        self.assertTrue(self.env["is_login_id_taken"](cursor, "old"))
+        self.assertTrue(self.env["run_account_deletion_job"](conn, 1, chunk=10))
+
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM posts WHERE author = 'deleted_old'").fetchone()[0], 25)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM comments WHERE author = 'deleted_old'").fetchone()[0], 7)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM posts WHERE author = 'keep'").fetchone()[0], 1)
+        self.assertEqual(
+            conn.execute("SELECT posts_moved, comments_moved, finished_at IS NOT NULL FROM account_deletion_jobs").fetchone(),
+            (25, 7, 1),
+        )
+        self.assertEqual(self.yields, 2)
+        self.assertEqual(conn.execute("SELECT state FROM account_deletion_jobs").fetchone()[0], "done")
+        self.assertFalse(self.env["is_login_id_taken"](cursor, "old"))
+        self.assertFalse(self.env["run_account_deletion_job"](conn, 1))
+
+    def test_job_is_claimed_by_one_runner_until_its_lease_expires(self):
+        conn = self.conn
+        conn.execute("INSERT INTO account_deletion_jobs (old_login_id, new_login_id, created_at) VALUES ('old', 'deleted_old', 'now')")
+        conn.commit()
+        claim = self.env["claim_account_deletion_job"]
+
+        self.assertTrue(claim(conn, 1))
+        # 탈퇴 직후 실행과 주기 루프가 겹쳐도 두 번째는 가져가지 못함
+        self.assertFalse(claim(conn, 1))
+        self.assertFalse(self.env["run_account_deletion_job"](conn, 1))
+
+        # 진행 기록 없이 lease가 끝난 작업(프로세스 종료 등)은 다시 가져감
+        conn.execute("UPDATE account_deletion_jobs SET claimed_at = claimed_at - ? - 1", (get_top_level_literal("ACCOUNT_DELETION_LEASE"),))
+        conn.commit()
+        self.assertTrue(claim(conn, 1))
+
+    def test_author_reads_survive_pending_author_rewrites(self):
+        # 작업이 끝나기 전 옛 아이디로 남은 글/댓글/알림이 INNER JOIN 때문에 사라지지 않아야 함
+        self.assertNotRegex(APP_SOURCE, r"(?<!LEFT )JOIN users u ON (p\.author|c\.author|n\.actor_id) = u\.login_id")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import ast
+import ipaddress
+import json
+import os
+import tempfile
+import types
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_definitions(names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(names)
+    for node in APP_TREE.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+class FakeAsyncResult:
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def wait(self, timeout):
+        return self.value
+
+
+class GooglebotVerificationRegressionTests(unittest.TestCase):
+    def setUp(self):
+        self.env = load_definitions(
+            ["IPPrefixTrie", "load_googlebot_ip_ranges", "is_googlebot"],
+            {"ipaddress": ipaddress, "json": json, "os": os},
+        )
+        self.env["googlebot_ranges"] = {"trie": self.env["IPPrefixTrie"](), "mtime": None}
+
+    def write_ranges(self, prefixes):
+        handle = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8")
+        json.dump({"creationTime": "2026-10-19T00:00:00", "prefixes": prefixes}, handle)
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def test_prefix_trie_matches_ipv4_ipv6_and_mapped_addresses(self):
+        trie = self.env["IPPrefixTrie"]()
+        trie.add(ipaddress.ip_network("66.249.64.0/27"))
+        trie.add(ipaddress.ip_network("2001:4860:4801:10::/64"))
+
+        self.assertIn("66.249.64.5", trie)
+        self.assertIn("::ffff:66.249.64.31", trie)
+        self.assertIn("2001:4860:4801:10::1", trie)
+        self.assertNotIn("66.249.64.32", trie)
+        self.assertNotIn("2001:4860:4801:11::1", trie)
+        self.assertNotIn("not-an-ip", trie)
+
+    def test_ranges_file_is_reloaded_only_when_changed(self):
+        path = self.write_ranges([{"ipv4Prefix": "66.249.64.0/27"}, {"ipv6Prefix": "2001:4860:4801:10::/64"}, {}])
+
+        self.assertTrue(self.env["load_googlebot_ip_ranges"](path))
+        self.assertEqual(self.env["googlebot_ranges"]["trie"].size, 2)
+        self.assertFalse(self.env["load_googlebot_ip_ranges"](path))
+        self.assertFalse(self.env["load_googlebot_ip_ranges"](path + ".missing"))
+
+    def make_request_env(self, ip, verdict=None, dns_result=None):
+        spawned = []
+        pending = {}
+        env = load_definitions(
+            ["IPPrefixTrie", "is_googlebot"],
+            {
+                "ipaddress": ipaddress,
+                "request": types.SimpleNamespace(
+                    user_agent=types.SimpleNamespace(string="Mozilla/5.0 (compatible; Googlebot/2.1)"),
+                    remote_addr=ip,
+                ),
+                "googlebot_ip_cache": {},
+                "googlebot_pending_lookups": pending,
+                "load_googlebot_verdict": lambda _ip: verdict,
+                "AsyncResult": FakeAsyncResult,
+                "gevent": types.SimpleNamespace(
+                    spawn=lambda fn, lookup_ip, result: spawned.append(lookup_ip) or result.set(dns_result)
+                ),
+                "GOOGLEBOT_DNS_WAIT_SECONDS": 2,
+                "verify_googlebot_in_background": object(),
+            },
+        )
+        trie = env["IPPrefixTrie"]()
+        trie.add(ipaddress.ip_network("66.249.64.0/27"))
+        env["googlebot_ranges"] = {"trie": trie, "mtime": 1}
+        return env, spawned
+
+    def test_published_range_is_trusted_without_dns(self):
+        env, spawned = self.make_request_env("66.249.64.10")
+
+        self.assertTrue(env["is_googlebot"]())
+        self.assertEqual(spawned, [])
+        self.assertTrue(env["googlebot_ip_cache"]["66.249.64.10"])
+
+    def test_persisted_verdict_skips_dns_and_unknown_ip_uses_background_lookup(self):
+        env, spawned = self.make_request_env("203.0.113.7", verdict=False)
+        self.assertFalse(env["is_googlebot"]())
+        self.assertEqual(spawned, [])
+
+        env, spawned = self.make_request_env("203.0.113.8", verdict=None, dns_result=None)
+        self.assertFalse(env["is_googlebot"]())
+        self.assertEqual(spawned, ["203.0.113.8"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+import ast
+import datetime
+import json
+import sqlite3
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_definitions(names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(names)
+    for node in APP_TREE.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+class FakeQueue:
+    def __init__(self):
+        self.items = []
+
+    def put_nowait(self, item):
+        self.items.append(item)
+
+
+class FakeGevent:
+    def __init__(self):
+        self.spawned = []
+
+    def spawn(self, fn):
+        self.spawned.append(fn)
+        return fn
+
+
+def load_channel(fake_gevent=None, **limits):
+    env = load_definitions(["NotificationChannel"], {
+        "Queue": FakeQueue,
+        "gevent": fake_gevent or FakeGevent(),
+        "SSE_MAX_STREAMS_PER_USER": limits.get("per_user", 3),
+        "SSE_MAX_STREAMS": limits.get("total", 100),
+        "SSE_HEARTBEAT_INTERVAL": 20,
+        "SSE_HEARTBEAT_EVENT": ":heartbeat",
+        "SSE_CLOSE_EVENT": ":close",
+        "TTLCache": lambda maxsize, ttl: {},
+        "UNREAD_COUNT_CACHE_SIZE": 16,
+        "UNREAD_COUNT_CACHE_TTL": 300,
+    })
+    return env["NotificationChannel"]()
+
+
+class NotificationSnapshotRegressionTests(unittest.TestCase):
+    def test_unread_count_is_loaded_once_and_then_adjusted_in_memory(self):
+        channel = load_channel()
+        loads = []
+
+        def loader(user_id):
+            loads.append(user_id)
+            return 2
+
+        self.assertIsNone(channel.adjust_unread_count("u1", 1))
+        self.assertEqual(channel.get_unread_count("u1", loader), 2)
+        self.assertEqual(channel.adjust_unread_count("u1", 1), 3)
+        self.assertEqual(channel.adjust_unread_count("u1", -5), 0)
+        self.assertEqual(channel.get_unread_count("u1", loader), 0)
+        self.assertEqual(loads, ["u1"])
+
+    def test_snapshot_refresh_and_forget_reload_unread_count_from_db(self):
+        channel = load_channel()
+        db_counts = {"u1": 4, "u2": 1}
+
+        def loader(user_id):
+            return db_counts[user_id]
+
+        self.assertEqual(channel.get_unread_count("u1", loader), 4)
+        self.assertEqual(channel.get_unread_count("u2", loader), 1)
+
+        # 다른 경로에서 알림 행이 지워져 메모리 값이 어긋난 경우
+        db_counts.update({"u1": 1, "u2": 0})
+        self.assertEqual(channel.get_unread_count("u1", loader), 4)
+        self.assertEqual(channel.refresh_unread_count("u1", loader), 1)
+
+        channel.forget_unread_counts("u2", "missing")
+        self.assertIsNone(channel.adjust_unread_count("u2", 1))
+        self.assertEqual(channel.get_unread_count("u2", loader), 0)
+
+    def test_publish_keeps_event_name_for_stream(self):
+        channel = load_channel()
+        queue = channel.subscribe("u1")
+
+        channel.publish("u1", {"unread_count": 1}, event="unread")
+        channel.publish("u2", {"unread_count": 1})
+
+        self.assertEqual(queue.items, [("unread", {"unread_count": 1})])
+
+    def test_sse_message_carries_event_id_for_resume(self):
+        env = load_definitions(["format_sse_message"], {"json": json})
+        self.assertEqual(
+            env["format_sse_message"]({"id": 7}, event_id=7),
+            'id: 7\ndata: {"id": 7}\n\n',
+        )
+
+
+class NotificationHubRegressionTests(unittest.TestCase):
+    def test_single_heartbeat_greenlet_feeds_every_stream(self):
+        fake_gevent = FakeGevent()
+        channel = load_channel(fake_gevent)
+        first = channel.subscribe("u1")
+        second = channel.subscribe("u1")
+        third = channel.subscribe("u2")
+
+        channel.broadcast_heartbeat()
+
+        self.assertEqual(len(fake_gevent.spawned), 1)
+        for queue in (first, second, third):
+            self.assertEqual(queue.items, [(":heartbeat", None)])
+
+    def test_per_user_cap_closes_oldest_stream(self):
+        channel = load_channel(per_user=2)
+        oldest = channel.subscribe("u1")
+        channel.subscribe("u1")
+        newest = channel.subscribe("u1")
+
+        self.assertEqual(oldest.items, [(":close", None)])
+        self.assertEqual(channel.connection_count, 2)
+        channel.unsubscribe("u1", oldest)
+        self.assertEqual(channel.connection_count, 2)
+
+        channel.publish("u1", {"id": 1})
+        self.assertEqual(newest.items, [(None, {"id": 1})])
+
+    def test_global_cap_rejects_new_users(self):
+        channel = load_channel(total=1)
+        queue = channel.subscribe("u1")
+
+        self.assertIsNone(channel.subscribe("u2"))
+        self.assertNotIn("u2", channel.clients)
+
+        channel.unsubscribe("u1", queue)
+        self.assertEqual(channel.connection_count, 0)
+        self.assertIsNotNone(channel.subscribe("u2"))
+
+    def test_stream_releases_slot_when_snapshot_fails(self):
+        channel = load_channel(per_user=1, total=1)
+
+        class FakeApp:
+            def route(self, *args, **kwargs):
+                return lambda f: f
+
+        def failing_snapshot(user_id):
+            raise sqlite3.OperationalError("database is locked")
+
+        env = load_definitions(["stream"], {
+            "app": FakeApp(),
+            "login_required": lambda f: f,
+            "g": type("G", (), {"user": {"login_id": "u1"}})(),
+            "notification_channel": channel,
+            "build_stream_initial_messages": failing_snapshot,
+        })
+
+        with self.assertRaises(sqlite3.OperationalError):
+            env["stream"]()
+
+        self.assertEqual(channel.connection_count, 0)
+        self.assertNotIn("u1", channel.clients)
+
+    def test_sse_message_format_with_and_without_event(self):
+        env = load_definitions(["format_sse_message"], {"json": json})
+        format_sse_message = env["format_sse_message"]
+
+        self.assertEqual(format_sse_message({"a": "알림"}), 'data: {"a": "알림"}\n\n')
+        self.assertEqual(
+            format_sse_message({"unread_count": 0}, event="snapshot"),
+            'event: snapshot\ndata: {"unread_count": 0}\n\n',
+        )
+
+
+class NotificationBatchRegressionTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE notifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, recipient_id TEXT, actor_id TEXT, action TEXT,
+                target_type TEXT, target_id INTEGER, post_id INTEGER, is_read INTEGER DEFAULT 0, created_at TEXT
+            );
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, board_id INTEGER);
+            CREATE TABLE users (login_id TEXT PRIMARY KEY, nickname TEXT);
+            INSERT INTO posts VALUES (1, 1), (2, 3);
+            INSERT INTO users VALUES ('actor', '작성자');
+        """)
+        self.conn.commit()
+        env = load_definitions(
+            ["resolve_notification_actor_nickname", "build_notification", "create_notifications"],
+            {"datetime": datetime, "GUEST_USER_ID": "guest"},
+        )
+        self.build = env["build_notification"]
+        self.create = env["create_notifications"]
+
+    def test_self_notification_is_dropped(self):
+        self.assertIsNone(self.build("actor", "actor", "comment", "post", 1, 1))
+        self.assertEqual(self.create(self.conn.cursor(), [None]), [])
+
+    def test_bulk_insert_joins_caller_transaction_and_masks_anonymous_board(self):
+        cursor = self.conn.cursor()
+        pending = self.create(cursor, [
+            self.build("r1", "actor", "comment", "post", 1, 1),
+            self.build("r2", "actor", "comment", "post", 2, 2),
+            self.build("r3", "actor2", "reply", "comment", 5, 1, board_id=1, actor_nickname="미리 조회"),
+        ])
+
+        self.assertTrue(self.conn.in_transaction)
+        self.assertEqual([recipient for recipient, _ in pending], ["r1", "r2", "r3"])
+        self.assertEqual(
+            [message["actor_nickname"] for _, message in pending],
+            ["작성자", "익명", "미리 조회"],
+        )
+
+        self.conn.rollback()
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
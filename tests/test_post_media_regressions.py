@@ -0,0 +1,383 @@
+import ast
+import base64
+import binascii
+import codecs
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import shutil
+import time
+import types
+import unittest
+from pathlib import Path
+from urllib.parse import quote_plus, unquote_plus, unquote_to_bytes, urlencode
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+CONSTANTS = ("DATA_URI_IMAGE_MARKER", "DATA_URI_HEADER_MAX_CHARS", "BASE64_RUN_RE", "FORM_SEPARATOR_RE",
+             "POST_MEDIA_URL_PREFIX", "POST_MEDIA_MAX_IMAGE_BYTES", "POST_MEDIA_EXTENSIONS",
+             "POST_MEDIA_READ_CHUNK", "POST_MEDIA_ORPHAN_TTL", "POST_MEDIA_VARIANT_URL_PREFIX",
+             "POST_MEDIA_VARIANT_WIDTHS", "POST_MEDIA_VARIANT_SIZES", "POST_MEDIA_NAME_RE", "POST_MEDIA_IMG_SRC_RE",
+             "POST_MEDIA_MAX_PIXELS", "POST_MEDIA_VARIANT_BATCH")
+
+
+class TooLarge(Exception):
+    pass
+
+
+def load_functions(names, extra_globals=None):
+    env = {"__builtins__": __builtins__, "re": re, "os": os, "base64": base64, "binascii": binascii,
+           "codecs": codecs, "hashlib": hashlib, "json": json, "tempfile": tempfile, "time": time,
+           "unquote_plus": unquote_plus, "unquote_to_bytes": unquote_to_bytes, "RequestEntityTooLarge": TooLarge}
+    if extra_globals:
+        env.update(extra_globals)
+    for node in APP_TREE.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) in CONSTANTS for t in node.targets):
+            exec(compile(ast.Module(body=[node], type_ignores=[]), str(APP_PATH), "exec"), env)
+    for node in APP_TREE.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in names:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+NAMES = {"partial_suffix_length", "DataUriImageExtractor", "StreamingUrlencodedReader", "read_streaming_urlencoded",
+         "cleanup_post_media", "get_post_media_variant_widths", "set_html_tag_attr", "render_post_media",
+         "publish_post_media", "release_post_media", "get_post_media_error", "get_post_media_spool_owner",
+         "remove_post_media_variants", "verify_post_media_image", "build_pending_post_media_variants"}
+
+
+def data_uri(raw, subtype="png"):
+    return f"data:image/{subtype};base64," + base64.b64encode(raw).decode()
+
+
+class StreamingFormParserTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.env = load_functions(NAMES, {"POST_MEDIA_FOLDER": self.folder.name})
+        rng = random.Random(3)
+        self.raw_a = bytes(rng.randrange(256) for _ in range(30000))
+        self.raw_b = bytes(rng.randrange(256) for _ in range(7001))
+
+    def parse(self, body, chunk_size, max_text_bytes=None, **extractor_kwargs):
+        extractor = self.env["DataUriImageExtractor"](self.folder.name, **extractor_kwargs)
+        items = self.env["read_streaming_urlencoded"](io.BytesIO(body), {"content": extractor}, max_text_bytes, chunk_size)
+        return dict(items), extractor
+
+    def test_images_are_spooled_to_files_at_any_chunk_boundary(self):
+        content = (f'<p>시험 후기 100%</p><img src="{data_uri(self.raw_a)}"><p>data:image/ 문자열</p>'
+                   f"<img src='{data_uri(self.raw_b, 'jpeg')}' alt=\"a=b&c\">끝")
+        body = urlencode({"title": "제목 & 기호", "content": content, "board_id": "1"}).encode()
+        name_a = hashlib.sha256(self.raw_a).hexdigest()[:32] + ".png"
+        name_b = hashlib.sha256(self.raw_b).hexdigest()[:32] + ".jpg"
+        expected = (f'<p>시험 후기 100%</p><img src="/static/images/posts/{name_a}"><p>data:image/ 문자열</p>'
+                    f"<img src='/static/images/posts/{name_b}' alt=\"a=b&c\">끝")
+
+        for chunk_size in (1, 2, 3, 7, 64, 4096, len(body)):
+            form, extractor = self.parse(body, chunk_size)
+            self.assertEqual(form, {"title": "제목 & 기호", "content": expected, "board_id": "1"}, chunk_size)
+            self.assertEqual(extractor.images, [
+                {"name": name_a, "size": 30000, "width": None, "height": None, "error": None},
+                {"name": name_b, "size": 7001, "width": None, "height": None, "error": None},
+            ])
+
+        self.assertEqual(Path(self.folder.name, name_a).read_bytes(), self.raw_a)
+        self.assertEqual(sorted(os.listdir(self.folder.name)), sorted([name_a, name_b]))
+
+    def test_oversized_and_rejected_images_are_dropped(self):
+        body = urlencode({"content": f'<img src="{data_uri(self.raw_a)}"><img src="{data_uri(self.raw_b)}">'}).encode()
+
+        form, extractor = self.parse(body, 999, max_image_bytes=10000)
+        self.assertEqual(extractor.images[0], {"name": None, "size": 30000, "width": None, "height": None, "error": "too_large"})
+        kept = extractor.images[1]["name"]
+        self.assertEqual(form["content"], f'<img src=""><img src="/static/images/posts/{kept}">')
+
+        form, extractor = self.parse(body, 999, verify=lambda path: None)
+        self.assertEqual(form["content"], '<img src=""><img src="">')
+        self.assertEqual([image["error"] for image in extractor.images], ["invalid", "invalid"])
+        # 임시(.part) 파일이나 거부된 이미지 파일이 남지 않음
+        self.assertEqual(os.listdir(self.folder.name), [kept])
+
+        form, extractor = self.parse(body, 999, verify=lambda path: (640, 480))
+        self.assertEqual((extractor.images[1]["width"], extractor.images[1]["height"]), (640, 480))
+
+    def test_images_are_not_written_without_a_spool_or_over_budget(self):
+        body = urlencode({"content": f'<img src="{data_uri(self.raw_a)}"><img src="{data_uri(self.raw_b)}">'}).encode()
+        extractor = self.env["DataUriImageExtractor"](None)
+        items = self.env["read_streaming_urlencoded"](io.BytesIO(body), {"content": extractor}, None, 999)
+        self.assertEqual(dict(items)["content"], '<img src=""><img src="">')
+        self.assertEqual([image["name"] for image in extractor.images], [None, None])
+        self.assertEqual([image["error"] for image in extractor.images], ["unsaved", "unsaved"])
+
+        charged = []
+        form, extractor = self.parse(body, 999, charge=lambda size: charged.append(size) or size < 10000)
+        self.assertEqual(charged, [30000, 7001])
+        self.assertEqual([image["error"] for image in extractor.images], ["quota", None])
+        self.assertEqual(form["content"], f'<img src=""><img src="/static/images/posts/{extractor.images[1]["name"]}">')
+        self.assertEqual(os.listdir(self.folder.name), [extractor.images[1]["name"]])
+
+    def test_text_outside_images_is_capped(self):
+        body = urlencode({"content": "가" * 500 + data_uri(self.raw_a), "title": "x"}).encode()
+        form, _ = self.parse(body, 100, max_text_bytes=1000)
+        self.assertTrue(form["content"].startswith("가" * 500 + "/static/images/posts/"))
+
+        with self.assertRaises(TooLarge):
+            self.parse(urlencode({"content": "가" * 2000}).encode(), 100, max_text_bytes=1000)
+        with self.assertRaises(TooLarge):
+            self.parse(urlencode({"title": "x" * 2000}).encode(), 100, max_text_bytes=1000)
+
+    def test_repeated_and_empty_fields(self):
+        reader = self.env["StreamingUrlencodedReader"]({})
+        reader.feed(b"poll_options=a&poll_options=b%20c&empty=&flag")
+        self.assertEqual(reader.close(), [("poll_options", "a"), ("poll_options", "b c"), ("empty", ""), ("flag", "")])
+
+
+class PostMediaErrorTests(unittest.TestCase):
+    def test_dropped_images_block_the_post_with_the_first_reason(self):
+        g = types.SimpleNamespace(post_media_dropped=[])
+        g.get = lambda key, default=None: getattr(g, key, default)
+        env = load_functions(NAMES, {"g": g, "POST_MEDIA_ERROR_MESSAGES": {
+            "quota": "quota", "invalid": "{index}번째 이미지를 읽을 수 없습니다.",
+        }})
+
+        self.assertIsNone(env["get_post_media_error"]())
+        g.post_media_dropped = [(2, "invalid"), (3, "quota")]
+        self.assertEqual(env["get_post_media_error"](), "2번째 이미지를 읽을 수 없습니다.")
+
+    def test_every_post_form_route_checks_dropped_images(self):
+        routes = {node.name: ast.get_source_segment(APP_SOURCE, node) for node in APP_TREE.body
+                  if isinstance(node, ast.FunctionDef)}
+        for name in ("post_write", "post_write_guest", "post_edit", "post_edit_guest"):
+            source = routes[name]
+            self.assertLess(source.index("get_post_media_error()"), source.index("conn.commit()"), name)
+
+
+class PostMediaSpoolOwnerTests(unittest.TestCase):
+    def owner(self, endpoint, session=None, cookies=None, post_id=None):
+        request = types.SimpleNamespace(endpoint=endpoint, cookies=cookies or {},
+                                        view_args={"post_id": post_id} if post_id else {})
+        tokens = {"valid": (1, "remembered", "2099-01-01 00:00:00")}
+        env = load_functions(NAMES, {
+            "request": request,
+            "session": session or {},
+            "get_db": lambda: types.SimpleNamespace(cursor=lambda: None),
+            "find_auth_token": lambda cursor, token: tokens.get(token),
+            "get_client_identifier": lambda: "ip:10.0.0.1",
+        })
+        return env["get_post_media_spool_owner"]()
+
+    def test_members_get_their_own_bucket_and_guests_fall_back_to_ip(self):
+        self.assertEqual(self.owner("post_write", {"user_id": "kim"}), "user:kim")
+        # 세션이 만료돼 remember-me 쿠키로 복원될 사용자도 이미지를 쓸 수 있음
+        self.assertEqual(self.owner("post_edit", cookies={"remember_token": "valid"}), "user:remembered")
+        self.assertIsNone(self.owner("post_write", cookies={"remember_token": "forged"}))
+        self.assertIsNone(self.owner("post_write"))
+
+        self.assertEqual(self.owner("post_write_guest"), "ip:10.0.0.1")
+        self.assertIsNone(self.owner("post_edit_guest", post_id=3))
+        self.assertEqual(self.owner("post_edit_guest", {"guest_auth_post_3": True}, post_id=3), "ip:10.0.0.1")
+
+
+class PublishPostMediaTests(unittest.TestCase):
+    def test_only_images_used_by_the_saved_post_are_published(self):
+        store, spool = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store)
+        self.addCleanup(shutil.rmtree, spool)
+        for name in ("kept.png", "dropped.png"):
+            Path(spool, name).write_bytes(b"x")
+        registered = []
+        images = [{"name": "kept.png", "size": 1, "width": 1, "height": 1},
+                  {"name": "dropped.png", "size": 1, "width": 1, "height": 1},
+                  {"name": "kept.png", "size": 1, "width": 1, "height": 1}]
+        g = types.SimpleNamespace(post_media_spool=spool, post_media_images=images)
+        g.get = lambda key, default=None: getattr(g, key, default)
+        env = load_functions(NAMES, {"POST_MEDIA_FOLDER": store, "g": g, "register_post_media": registered.extend})
+
+        env["publish_post_media"]('<img src="/static/images/posts/kept.png">')
+
+        self.assertEqual(os.listdir(store), ["kept.png"])
+        self.assertEqual(os.listdir(spool), ["dropped.png"])
+        self.assertEqual([image["name"] for image in registered], ["kept.png"])
+
+
+class PostMediaCleanupTests(unittest.TestCase):
+    def test_unreferenced_files_are_removed_after_ttl(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        os.mkdir(Path(folder.name, "variants"))
+        env = load_functions(NAMES, {"POST_MEDIA_FOLDER": folder.name,
+                                     "POST_MEDIA_VARIANT_FOLDER": str(Path(folder.name, "variants"))})
+        conn = sqlite3.connect(":memory:")
+        conn.executescript("""
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, content TEXT);
+            CREATE TABLE post_media (name TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at INTEGER NOT NULL,
+                                     referenced INTEGER NOT NULL DEFAULT 0, width INTEGER, height INTEGER, variants TEXT);
+        """)
+        for name in ("used.png", "orphan.png", "fresh.png", "variants/orphan-320.webp", "variants/used-320.webp"):
+            Path(folder.name, name).write_bytes(b"x")
+        conn.execute("INSERT INTO posts (content) VALUES ('<img src=\"/static/images/posts/used.png\">')")
+        conn.executemany("INSERT INTO post_media (name, size, created_at, variants) VALUES (?, 1, ?, ?)",
+                         [("used.png", 0, '{"webp": [320]}'), ("orphan.png", 0, '{"webp": [320]}'), ("fresh.png", 10_000, None)])
+
+        removed = env["cleanup_post_media"](conn, now=10_000)
+
+        self.assertEqual(removed, 1)
+        self.assertEqual(sorted(os.listdir(folder.name)), ["fresh.png", "used.png", "variants"])
+        self.assertEqual(os.listdir(Path(folder.name, "variants")), ["used-320.webp"])
+        self.assertEqual(dict(conn.execute("SELECT name, referenced FROM post_media")), {"used.png": 1, "fresh.png": 0})
+
+    def test_media_dropped_by_edit_or_delete_is_rechecked(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        env = load_functions(NAMES, {"POST_MEDIA_FOLDER": folder.name, "POST_MEDIA_VARIANT_FOLDER": folder.name,
+                                     "time": types.SimpleNamespace(time=lambda: 10_000)})
+        a, b, c = ("a" * 32 + ".png", "b" * 32 + ".png", "c" * 32 + ".png")
+        conn = sqlite3.connect(":memory:")
+        conn.executescript("""
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, content TEXT);
+            CREATE TABLE post_media (name TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at INTEGER NOT NULL,
+                                     referenced INTEGER NOT NULL DEFAULT 0, width INTEGER, height INTEGER, variants TEXT);
+        """)
+        for name in (a, b, c):
+            Path(folder.name, name).write_bytes(b"x")
+            conn.execute("INSERT INTO post_media (name, size, created_at, referenced) VALUES (?, 1, 0, 1)", (name,))
+        old = f'<img src="/static/images/posts/{a}"><img src="/static/images/posts/{b}"><img src="/static/images/posts/{c}">'
+        # c는 다른 글에서도 쓰임
+        conn.execute("INSERT INTO posts (content) VALUES (?)", (f'<img src="/static/images/posts/{b}"><img src="/static/images/posts/{c}">',))
+        conn.execute("INSERT INTO posts (content) VALUES (?)", (f'<img src="/static/images/posts/{c}">',))
+
+        env["release_post_media"](conn.cursor(), old, f'<img src="/static/images/posts/{b}">')
+        self.assertEqual(dict(conn.execute("SELECT name, referenced FROM post_media")), {a: 0, b: 1, c: 0})
+        # TTL 전에는 그대로
+        self.assertEqual(env["cleanup_post_media"](conn, now=10_000), 0)
+
+        self.assertEqual(env["cleanup_post_media"](conn, now=20_000), 1)
+        self.assertEqual(sorted(os.listdir(folder.name)), [b, c])
+        self.assertEqual(dict(conn.execute("SELECT name, referenced FROM post_media")), {b: 1, c: 1})
+
+
+class PostMediaVariantBuildTests(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE post_media (name TEXT PRIMARY KEY, variants TEXT)")
+        self.conn.executemany("INSERT INTO post_media (name) VALUES (?)", [("bomb.png",), ("gone.png",), ("ok.png",)])
+
+    def build(self, name):
+        if name == "bomb.png":
+            raise RuntimeError("decompression bomb")
+        Path(self.folder, f"{name[:-4]}-320.webp").write_bytes(b"x")
+        if name == "gone.png":
+            # 변형을 만드는 사이 cleanup_post_media가 행을 지움
+            self.conn.execute("DELETE FROM post_media WHERE name = 'gone.png'")
+        return {"webp": [320]}
+
+    def test_failures_are_recorded_and_variants_of_removed_rows_are_deleted(self):
+        env = load_functions(NAMES, {"POST_MEDIA_VARIANT_FOLDER": self.folder,
+                                     "run_content_task": lambda fn, name: fn(name),
+                                     "build_post_media_variants": self.build})
+
+        self.assertEqual(env["build_pending_post_media_variants"](self.conn), 3)
+
+        self.assertEqual(dict(self.conn.execute("SELECT name, variants FROM post_media")),
+                         {"bomb.png": "{}", "ok.png": '{"webp": [320]}'})
+        self.assertEqual(os.listdir(self.folder), ["ok-320.webp"])
+
+    def test_verify_keeps_images_over_the_pixel_cap(self):
+        class FakeImage:
+            def __init__(self, size):
+                self.size = size
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def getexif(self):
+                return {0x0112: 6}
+
+            def verify(self):
+                pass
+
+        env = load_functions(NAMES, {"Image": types.SimpleNamespace(open=lambda size: FakeImage(size))})
+        verify = env["verify_post_media_image"]
+        cap = env["POST_MEDIA_MAX_PIXELS"]
+
+        self.assertEqual(verify((800, 600)), (600, 800))
+        # 파노라마처럼 큰 이미지도 저장 (변형은 build_post_media_variants가 건너뜀)
+        self.assertEqual(verify((cap // 1000 + 1, 1000)), (1000, cap // 1000 + 1))
+
+
+    def test_images_over_the_pixel_cap_keep_only_the_original(self):
+        opened = []
+
+        class HugeImage:
+            width, height, is_animated = 20000, 3000, False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        env = load_functions(NAMES | {"build_post_media_variants"}, {
+            "POST_MEDIA_FOLDER": self.folder,
+            "POST_MEDIA_VARIANT_FORMATS": ("webp",),
+            "Image": types.SimpleNamespace(open=lambda path: opened.append(path) or HugeImage()),
+        })
+
+        self.assertEqual(env["build_post_media_variants"]("a" * 32 + ".jpg"), {"webp": []})
+        self.assertEqual(opened, [os.path.join(self.folder, "a" * 32 + ".jpg")])
+
+
+class ResponsivePostMediaTests(unittest.TestCase):
+    def setUp(self):
+        self.env = load_functions(NAMES, {"POST_MEDIA_FOLDER": "unused"})
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE post_media (name TEXT PRIMARY KEY, width INTEGER, height INTEGER, variants TEXT)")
+        self.a, self.b, self.c = ("a" * 32 + ".png", "b" * 32 + ".jpg", "c" * 32 + ".gif")
+        self.conn.executemany("INSERT INTO post_media VALUES (?, ?, ?, ?)", [
+            (self.a, 2000, 1000, json.dumps({"avif": [320, 640, 1280], "webp": [320, 640, 1280]})),
+            (self.b, 500, 400, None),
+            (self.c, 100, 100, json.dumps({"webp": []})),
+        ])
+
+    def test_variant_widths_never_exceed_the_original(self):
+        widths = self.env["get_post_media_variant_widths"]
+        self.assertEqual(widths(2000), [320, 640, 1280])
+        self.assertEqual(widths(900), [320, 640, 900])
+        self.assertEqual(widths(200), [200])
+
+    def test_store_images_get_dimensions_and_srcset(self):
+        content = (f'<p>x</p><img src="/static/images/posts/{self.a}" loading="lazy">'
+                   f'<img src="/static/images/posts/{self.b}" width="100">'
+                   f'<img src="/static/images/posts/{self.c}"><img src="https://example.com/x.png">')
+
+        rendered = self.env["render_post_media"](self.conn.cursor(), content)
+
+        self.assertIn(
+            f'<picture><source type="image/avif" srcset="/static/images/posts/variants/{"a" * 32}-320.avif 320w, '
+            f'/static/images/posts/variants/{"a" * 32}-640.avif 640w, /static/images/posts/variants/{"a" * 32}-1280.avif 1280w" '
+            f'sizes="(max-width: 800px) 100vw, 800px">', rendered)
+        self.assertIn(f'<img src="/static/images/posts/{self.a}" loading="lazy" width="2000" height="1000"></picture>', rendered)
+        # 작성자가 지정한 크기는 유지, 변형이 없으면 <picture> 없이 그대로
+        self.assertIn(f'<img src="/static/images/posts/{self.b}" width="100">', rendered)
+        self.assertIn(f'<img src="/static/images/posts/{self.c}" width="100" height="100"><img src="https://example.com/x.png">', rendered)
+        self.assertEqual(self.env["render_post_media"](self.conn.cursor(), "<p>no media</p>"), "<p>no media</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
 import ast
+import os
 import sqlite3
+import tempfile
 import unittest
+import uuid
 from pathlib import Path
 
 
@@ -24,6 +27,13 @@ def load_functions(function_names, extra_globals=None):
     return env
 
 
+def get_top_level_literal(name):
+    for node in APP_TREE.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == name for target in node.targets):
+            return ast.literal_eval(node.value)
+    raise KeyError(name)
+
+
 class ReauthRegressionTests(unittest.TestCase):
     def make_conn(self):
         conn = sqlite3.connect(":memory:")
@@ -42,9 +52,17 @@ class ReauthRegressionTests(unittest.TestCase):
         conn = self.make_conn()
         logs = []
         env = load_functions(
-            ["ensure_riro_reauth_tracking", "normalize_riro_identity_value", "apply_riro_reauth_result"],
+            [
+                "ensure_riro_reauth_tracking",
+                "touch_user_identity",
+                "normalize_riro_identity_value",
+                "apply_riro_reauth_result",
+            ],
             {
                 "sqlite3": sqlite3,
+                "user_identity_cache": {"current": {"login_id": "current", "gen": 30}},
+                "log_user_identity_changes": lambda user_ids: None,
+                "has_request_context": lambda: False,
                 "get_db": lambda: conn,
                 "add_log": lambda action, user_id, details: logs.append((action, user_id, details)),
                 "datetime": __import__("datetime"),
@@ -67,9 +85,17 @@ class ReauthRegressionTests(unittest.TestCase):
         conn = self.make_conn()
         logs = []
         env = load_functions(
-            ["ensure_riro_reauth_tracking", "normalize_riro_identity_value", "apply_riro_reauth_result"],
+            [
+                "ensure_riro_reauth_tracking",
+                "touch_user_identity",
+                "normalize_riro_identity_value",
+                "apply_riro_reauth_result",
+            ],
             {
                 "sqlite3": sqlite3,
+                "user_identity_cache": {"current": {"login_id": "current", "gen": 30}},
+                "log_user_identity_changes": lambda user_ids: None,
+                "has_request_context": lambda: False,
                 "get_db": lambda: conn,
                 "add_log": lambda action, user_id, details: logs.append((action, user_id, details)),
                 "datetime": __import__("datetime"),
@@ -114,9 +140,17 @@ class ReauthRegressionTests(unittest.TestCase):
         conn = self.make_conn()
         logs = []
         env = load_functions(
-            ["ensure_riro_reauth_tracking", "normalize_riro_identity_value", "apply_riro_reauth_result"],
+            [
+                "ensure_riro_reauth_tracking",
+                "touch_user_identity",
+                "normalize_riro_identity_value",
+                "apply_riro_reauth_result",
+            ],
             {
                 "sqlite3": sqlite3,
+                "user_identity_cache": {"current": {"login_id": "current", "gen": 30}},
+                "log_user_identity_changes": lambda user_ids: None,
+                "has_request_context": lambda: False,
                 "get_db": lambda: conn,
                 "add_log": lambda action, user_id, details: logs.append((action, user_id, details)),
                 "datetime": __import__("datetime"),
@@ -135,6 +169,64 @@ class ReauthRegressionTests(unittest.TestCase):
         ).fetchone()
         self.assertEqual(row["riro_reauth_required"], 0)
         self.assertIsNotNone(row["riro_reauth_at"])
+        self.assertNotIn("current", env["user_identity_cache"])
+
+    def test_user_identity_is_cached_with_narrow_projection(self):
+        conn = self.make_conn()
+        conn.execute("ALTER TABLE users ADD COLUMN pw TEXT")
+        conn.execute("ALTER TABLE users ADD COLUMN autologin_token TEXT")
+        for column in ("nickname", "role", "banned_until", "profile_image"):
+            conn.execute(f"ALTER TABLE users ADD COLUMN {column} TEXT")
+        for column in ("point", "level", "exp", "post_count", "comment_count"):
+            conn.execute(f"ALTER TABLE users ADD COLUMN {column} INTEGER")
+        conn.execute("UPDATE users SET pw = 'hash', autologin_token = 'token', nickname = '길동'")
+
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        queries = []
+        conn.set_trace_callback(lambda sql: queries.append(sql) if sql.startswith("SELECT") else None)
+        names = ["ensure_riro_reauth_tracking", "sync_user_identity_cache", "log_user_identity_changes",
+                 "fetch_user_identity", "touch_user_identity"]
+
+        def load_process():
+            # 같은 로그 파일을 보는 별도 워커 프로세스 하나를 흉내냄
+            return load_functions(names, {
+                "os": os,
+                "uuid": uuid,
+                "sqlite3": sqlite3,
+                "get_db": lambda: conn,
+                "has_request_context": lambda: False,
+                "user_identity_cache": {},
+                "user_identity_log": {"inode": None, "offset": 0},
+                "USER_IDENTITY_LOG_FILE": os.path.join(log_dir.name, "user_identity.log"),
+                "USER_IDENTITY_LOG_MAX_BYTES": 64,
+                "USER_IDENTITY_COLUMNS": get_top_level_literal("USER_IDENTITY_COLUMNS"),
+            })
+
+        env, other = load_process(), load_process()
+
+        first = env["fetch_user_identity"]("current")
+        second = env["fetch_user_identity"]("current")
+
+        self.assertIs(first, second)
+        # 캐시 적중은 DB를 조회하지 않음
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(first["nickname"], "길동")
+        self.assertNotIn("pw", first)
+        self.assertNotIn("autologin_token", first)
+
+        # 다른 프로세스에서 바뀐 사용자는 로그 파일을 통해 다시 읽음
+        other["fetch_user_identity"]("current")
+        conn.execute("UPDATE users SET nickname = '새이름' WHERE login_id = 'current'")
+        other["touch_user_identity"]("current")
+        self.assertEqual(env["fetch_user_identity"]("current")["nickname"], "새이름")
+        self.assertIs(env["fetch_user_identity"]("other"), env["fetch_user_identity"]("other"))
+
+        # 로그가 한도를 넘어 교체되면 놓친 변경이 있을 수 있으므로 캐시를 전부 비움
+        cached = env["fetch_user_identity"]("other")
+        other["touch_user_identity"](*[f"user{i}" for i in range(20)])
+        self.assertEqual(os.path.getsize(other["USER_IDENTITY_LOG_FILE"]), 0)
+        self.assertIsNot(env["fetch_user_identity"]("other"), cached)
 
     def test_stale_logged_in_user_gets_alert_redirect_to_riro_reauth(self):
         captured = {}
@@ -1,5 +1,6 @@
 import ast
 import html
+import re
 import sqlite3
 import types
 import unittest
@@ -44,6 +45,31 @@ def load_functions(function_names, extra_globals=None):
     return env
 
 
+LEVEL_FUNCTIONS = [
+    "get_required_exp_for_level", "get_level_point_reward", "build_level_tables",
+    "get_total_exp", "resolve_level", "get_level_up_reward", "update_exp_levels",
+]
+
+
+def load_level_functions(function_names, extra_globals=None):
+    env_globals = {
+        "math": __import__("math"),
+        "bisect": __import__("bisect"),
+        "array": __import__("array").array,
+        "user_identity_cache": {},
+        "log_user_identity_changes": lambda user_ids: None,
+        "has_request_context": lambda: False,
+    }
+    for name in ("BASE_EXP_PER_LEVEL", "LEVEL_EXP_GROWTH_RATE", "BASE_LEVEL_UP_POINT_REWARD",
+                 "LEVEL_REWARD_STEP", "LEVEL_REWARD_STEP_INTERVAL", "LEVEL_TABLE_MAX_LEVEL",
+                 "POST_EXP_REWARD", "COMMENT_EXP_REWARD", "GUEST_USER_ID"):
+        env_globals[name] = get_top_level_literal(name)
+    env_globals.update(extra_globals or {})
+    env = load_functions(LEVEL_FUNCTIONS + function_names, env_globals)
+    env["LEVEL_CUMULATIVE_EXP"], env["LEVEL_CUMULATIVE_REWARD"] = env["build_level_tables"]()
+    return env
+
+
 class DummyCacheControl:
     def __init__(self):
         self.public = False
@@ -91,18 +117,7 @@ class RewardAndMediaRegressionTests(unittest.TestCase):
         conn.execute("CREATE TABLE users (login_id TEXT PRIMARY KEY, level INTEGER, exp INTEGER, point INTEGER)")
         conn.execute("INSERT INTO users (login_id, level, exp, point) VALUES (?, ?, ?, ?)", ("user-1", 1, 450, 50))
 
-        env = load_functions(
-            ["get_required_exp_for_level", "get_level_point_reward", "update_exp_level"],
-            {
-                "get_db": lambda: conn,
-                "math": __import__("math"),
-                "BASE_EXP_PER_LEVEL": get_top_level_literal("BASE_EXP_PER_LEVEL"),
-                "LEVEL_EXP_GROWTH_RATE": get_top_level_literal("LEVEL_EXP_GROWTH_RATE"),
-                "BASE_LEVEL_UP_POINT_REWARD": get_top_level_literal("BASE_LEVEL_UP_POINT_REWARD"),
-                "LEVEL_REWARD_STEP": get_top_level_literal("LEVEL_REWARD_STEP"),
-                "LEVEL_REWARD_STEP_INTERVAL": get_top_level_literal("LEVEL_REWARD_STEP_INTERVAL"),
-            },
-        )
+        env = load_level_functions(["update_exp_level", "touch_user_identity"], {"get_db": lambda: conn})
 
         result = env["update_exp_level"]("user-1", 700)
 
@@ -118,18 +133,7 @@ class RewardAndMediaRegressionTests(unittest.TestCase):
         conn.execute("CREATE TABLE users (login_id TEXT PRIMARY KEY, level INTEGER, exp INTEGER, point INTEGER)")
         conn.execute("INSERT INTO users (login_id, level, exp, point) VALUES (?, ?, ?, ?)", ("user-2", 3, 10, 25))
 
-        env = load_functions(
-            ["get_required_exp_for_level", "get_level_point_reward", "update_exp_level"],
-            {
-                "get_db": lambda: conn,
-                "math": __import__("math"),
-                "BASE_EXP_PER_LEVEL": get_top_level_literal("BASE_EXP_PER_LEVEL"),
-                "LEVEL_EXP_GROWTH_RATE": get_top_level_literal("LEVEL_EXP_GROWTH_RATE"),
-                "BASE_LEVEL_UP_POINT_REWARD": get_top_level_literal("BASE_LEVEL_UP_POINT_REWARD"),
-                "LEVEL_REWARD_STEP": get_top_level_literal("LEVEL_REWARD_STEP"),
-                "LEVEL_REWARD_STEP_INTERVAL": get_top_level_literal("LEVEL_REWARD_STEP_INTERVAL"),
-            },
-        )
+        env = load_level_functions(["update_exp_level", "touch_user_identity"], {"get_db": lambda: conn})
 
         result = env["update_exp_level"]("user-2", -100)
 
@@ -140,6 +144,61 @@ class RewardAndMediaRegressionTests(unittest.TestCase):
         row = conn.execute("SELECT level, exp, point FROM users WHERE login_id = ?", ("user-2",)).fetchone()
         self.assertEqual(row, (2, 470, 25))
 
+    def test_level_table_matches_step_by_step_walk(self):
+        env = load_level_functions([])
+        required = env["get_required_exp_for_level"]
+
+        level, exp, total = 1, 0, 0
+        for _ in range(5000):
+            self.assertEqual(env["resolve_level"](total), (level, exp))
+            total += 37
+            exp += 37
+            while exp >= required(level):
+                exp -= required(level)
+                level += 1
+        self.assertEqual(env["get_level_up_reward"](1, 6), 100 * 4 + 120)
+        self.assertEqual(env["get_level_up_reward"](6, 2), 0)
+        self.assertEqual(env["resolve_level"](-10), (1, 0))
+
+    def test_large_exp_grant_resolves_in_one_update(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE users (login_id TEXT PRIMARY KEY, level INTEGER, exp INTEGER, point INTEGER)")
+        conn.execute("INSERT INTO users (login_id, level, exp, point) VALUES (?, ?, ?, ?)", ("user-3", 1, 0, 0))
+        env = load_level_functions(["update_exp_level", "touch_user_identity"], {"get_db": lambda: conn})
+
+        result = env["update_exp_level"]("user-3", 10_000_000)
+
+        self.assertEqual(env["get_total_exp"](result["level"], result["exp"]), 10_000_000)
+        self.assertLess(result["exp"], env["get_required_exp_for_level"](result["level"]))
+        self.assertEqual(result["point_reward"], env["get_level_up_reward"](1, result["level"]))
+
+    def test_recompute_levels_rebuilds_from_post_and_comment_counts(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE users (login_id TEXT PRIMARY KEY, level INTEGER, exp INTEGER, point INTEGER)")
+        conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, author TEXT)")
+        conn.execute("CREATE TABLE comments (id INTEGER PRIMARY KEY, author TEXT)")
+        conn.executemany(
+            "INSERT INTO users (login_id, level, exp, point) VALUES (?, ?, ?, ?)",
+            [("writer", 1, 0, 5), ("drifted", 4, 100, 7), ("steady", 1, 60, 0), ("__guest__", 1, 0, 0)],
+        )
+        conn.executemany("INSERT INTO posts (author) VALUES (?)", [("writer",)] * 12 + [("steady",), ("__guest__",)])
+        conn.executemany("INSERT INTO comments (author) VALUES (?)", [("writer",)] * 3 + [("steady",)])
+        cache = {"writer": object(), "steady": object()}
+        env = load_level_functions(["recompute_levels", "touch_user_identity"], {"get_db": lambda: conn, "user_identity_cache": cache})
+
+        changed = env["recompute_levels"]()
+
+        self.assertEqual(changed, 2)
+        rows = {row[0]: row[1:] for row in conn.execute("SELECT login_id, level, exp, point FROM users")}
+        # writer: 12 * 50 + 3 * 10 = 630 EXP -> 레벨 2 (500) + 130, 레벨업 보상 100
+        self.assertEqual(rows["writer"], (2, 130, 105))
+        # drifted: 글/댓글 0 -> 레벨 1로 내려가지만 포인트는 회수하지 않음
+        self.assertEqual(rows["drifted"], (1, 0, 7))
+        self.assertEqual(rows["steady"], (1, 60, 0))
+        self.assertEqual(rows["__guest__"], (1, 0, 0))
+        self.assertNotIn("writer", cache)
+        self.assertIn("steady", cache)
+
     def test_normalize_rich_media_tags_keeps_only_trusted_iframes_and_lazy_loads_media(self):
         env = load_functions(
             ["set_html_tag_attr", "normalize_rich_media_tags"],
@@ -196,33 +255,36 @@ class RewardAndMediaRegressionTests(unittest.TestCase):
         self.assertNotIn("'video'", POST_WRITE_JS)
         self.assertNotIn("'video'", TEMPLATE_POST_EDIT_GUEST)
 
-    def test_rate_limit_returns_retry_after_for_api_requests(self):
-        class FakeTTLCache(dict):
-            def __init__(self, maxsize, ttl):
-                super().__init__()
-                self.maxsize = maxsize
-                self.ttl = ttl
-
-        request_state = types.SimpleNamespace(method="POST", is_json=True, path="/api/test")
-
-        def fake_jsonify(payload):
-            return DummyJsonResponse(payload)
+    def make_rate_limit_env(self, request_state, now):
+        conn = sqlite3.connect(":memory:", isolation_level=None)
+        conn.execute("CREATE TABLE rate_limit_buckets (bucket_key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, full_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE rate_limit_rejections (policy TEXT PRIMARY KEY, count INTEGER NOT NULL DEFAULT 0, last_rejected_at REAL)")
 
         env = load_functions(
-            ["rate_limit"],
+            ["consume_rate_limit_token", "record_rate_limit_rejection", "rate_limit"],
             {
-                "TTLCache": FakeTTLCache,
+                "math": __import__("math"),
+                "sqlite3": sqlite3,
+                "time": types.SimpleNamespace(time=lambda: now[0]),
                 "wraps": wraps,
                 "request": request_state,
                 "get_client_identifier": lambda: "ip:test",
-                "jsonify": fake_jsonify,
+                "get_rate_limit_db": lambda: conn,
+                "jsonify": lambda payload: DummyJsonResponse(payload),
                 "Response": DummyResponse,
+                "RATE_LIMIT_POLICIES": {"test_route": {"limit": 2, "window": 60}},
             },
         )
+        return env, conn
+
+    def test_rate_limit_returns_retry_after_for_api_requests(self):
+        request_state = types.SimpleNamespace(method="POST", is_json=True, path="/api/test")
+        now = [1000.0]
+        env, conn = self.make_rate_limit_env(request_state, now)
 
         calls = []
 
-        @env["rate_limit"](limit=2, window_seconds=60)
+        @env["rate_limit"]("test_route")
         def handler():
             calls.append("ok")
             return "ok"
@@ -233,8 +295,46 @@ class RewardAndMediaRegressionTests(unittest.TestCase):
 
         self.assertEqual(calls, ["ok", "ok"])
         self.assertEqual(blocked.status_code, 429)
-        self.assertEqual(blocked.headers["Retry-After"], "60")
+        # 2회/60초 버킷은 30초마다 1회씩 다시 채워짐
+        self.assertEqual(blocked.headers["Retry-After"], "30")
         self.assertEqual(blocked.json["status"], "error")
+        self.assertEqual(conn.execute("SELECT count FROM rate_limit_rejections WHERE policy = 'test_route'").fetchone()[0], 1)
+
+    def test_rate_limit_token_bucket_refills_gradually_instead_of_resetting(self):
+        request_state = types.SimpleNamespace(method="POST", is_json=True, path="/api/test")
+        now = [1000.0]
+        env, _ = self.make_rate_limit_env(request_state, now)
+        consume = env["consume_rate_limit_token"]
+
+        self.assertEqual(consume("k", 2, 60), (True, 0))
+        self.assertEqual(consume("k", 2, 60), (True, 0))
+        self.assertEqual(consume("k", 2, 60), (False, 30))
+
+        now[0] += 30
+        self.assertEqual(consume("k", 2, 60), (True, 0))
+        self.assertFalse(consume("k", 2, 60)[0])
+
+        # 다른 키(다른 사용자)는 독립적으로 계산
+        self.assertEqual(consume("other", 2, 60), (True, 0))
+
+    def test_rate_limit_token_bucket_charges_cost(self):
+        request_state = types.SimpleNamespace(method="POST", is_json=True, path="/api/test")
+        now = [1000.0]
+        env, _ = self.make_rate_limit_env(request_state, now)
+        consume = env["consume_rate_limit_token"]
+
+        self.assertEqual(consume("bytes", 1000, 100, cost=600), (True, 0))
+        # 남은 400으로는 600을 못 꺼냄: 200이 더 차야 함 (초당 10)
+        self.assertEqual(consume("bytes", 1000, 100, cost=600), (False, 20))
+        self.assertEqual(consume("bytes", 1000, 100, cost=400), (True, 0))
+
+    def test_rate_limit_policies_cover_every_decorated_route(self):
+        policies = get_top_level_literal("RATE_LIMIT_POLICIES")
+        used = set(re.findall(r"@rate_limit\('(\w+)'\)", APP_SOURCE))
+
+        self.assertTrue(used)
+        self.assertEqual(used - set(policies), set())
+        self.assertNotRegex(APP_SOURCE, r"@rate_limit\(limit=")
 
     def test_apply_security_headers_sets_csp_hsts_and_static_cache_headers(self):
         request_state = types.SimpleNamespace(path="/static/images/demo.webp", is_secure=True)
@@ -266,12 +366,229 @@ class RewardAndMediaRegressionTests(unittest.TestCase):
         self.assertEqual(secured.cache_control.max_age, 31536000)
         self.assertTrue(secured.cache_control.immutable)
 
+    def test_thumbnail_paths_share_static_cache_headers(self):
+        request_state = types.SimpleNamespace(path="/thumb/64/images/profiles/a.webp", is_secure=False)
+        app_state = types.SimpleNamespace(config={"SEND_FILE_MAX_AGE_DEFAULT": 31536000}, after_request=lambda fn: fn)
+        env = load_functions(["apply_security_headers"], {"request": request_state, "app": app_state})
+
+        secured = env["apply_security_headers"](DummyResponse())
+
+        self.assertTrue(secured.cache_control.immutable)
+        self.assertEqual(secured.cache_control.max_age, 31536000)
+
+        for status in (302, 404):
+            failed = env["apply_security_headers"](DummyResponse(status=status))
+            self.assertFalse(failed.cache_control.public)
+            self.assertIsNone(failed.cache_control.max_age)
+
+    def test_profile_thumbnail_cache_is_lru_capped_and_cleared_on_change(self):
+        import os
+        import tempfile
+
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        state = {"bytes": None}
+        env = load_functions(
+            ["get_profile_thumb_path", "evict_profile_thumbnails", "remove_profile_thumbnails"],
+            {
+                "os": os,
+                "PROFILE_THUMB_SIZES": get_top_level_literal("PROFILE_THUMB_SIZES"),
+                "PROFILE_THUMB_CACHE_FOLDER": folder.name,
+                "PROFILE_THUMB_CACHE_MAX_BYTES": 1000,
+                "PROFILE_THUMB_CACHE_TARGET_RATIO": 0.6,
+                "profile_thumb_cache_state": state,
+            },
+        )
+        paths = {}
+        for age, image in enumerate(["images/profiles/old.webp", "images/profiles/mid.webp", "images/profiles/new.webp"]):
+            paths[image] = env["get_profile_thumb_path"](image, 64)
+            Path(paths[image]).write_bytes(b"x" * 300)
+            os.utime(paths[image], (1000 + age, 1000 + age))
+
+        self.assertEqual(env["evict_profile_thumbnails"](), 0)
+        self.assertEqual(state["bytes"], 900)
+
+        Path(env["get_profile_thumb_path"]("images/profiles/new.webp", 160)).write_bytes(b"x" * 300)
+        self.assertEqual(env["evict_profile_thumbnails"](300), 2)
+        self.assertFalse(os.path.exists(paths["images/profiles/old.webp"]))
+        self.assertFalse(os.path.exists(paths["images/profiles/mid.webp"]))
+        self.assertEqual(state["bytes"], 600)
+
+        env["remove_profile_thumbnails"]("images/profiles/new.webp")
+        self.assertEqual(os.listdir(folder.name), [])
+        self.assertEqual(state["bytes"], 0)
+
+    def test_animated_etacons_are_resized_and_capped_when_saved_as_webp(self):
+        class FakeFrame:
+            def __init__(self, duration):
+                self.info = {"duration": duration} if duration is not None else {}
+                self.size = (800, 800)
+                self.saved = None
+
+            def convert(self, mode):
+                return FakeFrame(self.info.get("duration"))
+
+            def thumbnail(self, size, resample):
+                self.size = (min(self.size[0], size[0]), min(self.size[1], size[1]))
+
+            def save(self, path, **kwargs):
+                self.saved = (path, kwargs)
+
+        def run(durations):
+            frames = [FakeFrame(d) for d in durations]
+            image = types.SimpleNamespace(info={"loop": 0}, frames=frames)
+            env = load_functions(["save_animated_webp"], {
+                "ImageSequence": types.SimpleNamespace(Iterator=lambda img: iter(img.frames)),
+                "RESAMPLING_LANCZOS": 1,
+                "ETACON_MAX_FRAMES": get_top_level_literal("ETACON_MAX_FRAMES"),
+                "ETACON_MAX_DURATION_MS": get_top_level_literal("ETACON_MAX_DURATION_MS"),
+                "ETACON_DEFAULT_FRAME_MS": get_top_level_literal("ETACON_DEFAULT_FRAME_MS"),
+            })
+            saved_count = env["save_animated_webp"](image, "out.webp", (512, 512))
+            return saved_count, frames
+
+        count, frames = run([50] * 500)
+        self.assertEqual(count, get_top_level_literal("ETACON_MAX_FRAMES"))
+
+        count, frames = run([1000] * 20)
+        self.assertEqual(count, get_top_level_literal("ETACON_MAX_DURATION_MS") // 1000)
+
+        count, _ = run([None, 0, 40])
+        self.assertEqual(count, 3)
+
+    def test_animated_etacon_output_is_webp_with_per_frame_durations(self):
+        saved = {}
+
+        class FakeFrame:
+            info = {"duration": 0}
+
+            def convert(self, mode):
+                frame = FakeFrame()
+                frame.mode = mode
+                return frame
+
+            def thumbnail(self, size, resample):
+                self.thumb = size
+
+            def save(self, path, **kwargs):
+                saved.update(kwargs, path=path)
+
+        env = load_functions(["save_animated_webp"], {
+            "ImageSequence": types.SimpleNamespace(Iterator=lambda img: iter([FakeFrame(), FakeFrame()])),
+            "RESAMPLING_LANCZOS": 1,
+            "ETACON_MAX_FRAMES": 80,
+            "ETACON_MAX_DURATION_MS": 8000,
+            "ETACON_DEFAULT_FRAME_MS": 100,
+        })
+        env["save_animated_webp"](types.SimpleNamespace(info={}), "x.webp", (512, 512))
+
+        self.assertEqual(saved["format"], "WEBP")
+        self.assertTrue(saved["save_all"])
+        self.assertEqual(saved["duration"], [100, 100])
+        self.assertEqual(len(saved["append_images"]), 1)
+        self.assertEqual(saved["append_images"][0].thumb, (512, 512))
+
+    def test_etacon_size_column_migration_is_idempotent(self):
+        conn = sqlite3.connect(":memory:")
+        env = load_functions(["ensure_etacon_size_columns"])
+        env["ensure_etacon_size_columns"](conn)  # 테이블이 없으면 아무것도 하지 않음
+        conn.execute("CREATE TABLE etacons (id INTEGER PRIMARY KEY, pack_id INTEGER, image_path TEXT, code TEXT)")
+        env["ensure_etacon_size_columns"](conn)
+        env["ensure_etacon_size_columns"](conn)
+        self.assertIn("original_bytes", [row[1] for row in conn.execute("PRAGMA table_info(etacons)")])
+
     def test_etacon_limit_constant_and_template_copy_match_100(self):
         self.assertEqual(get_top_level_literal("MAX_ETACONS_PER_PACK"), 100)
         self.assertIn("1팩당 최대 100개", TEMPLATE_REQUEST)
         self.assertIn("const MAX_ETACON_FILES = 100;", TEMPLATE_REQUEST)
         self.assertIn("this.files.length > MAX_ETACON_FILES", TEMPLATE_REQUEST)
 
+    def test_etacon_sprite_ref_uses_percentage_background_coordinates(self):
+        env = load_functions(["get_etacon_sprite_ref"])
+        manifest = {
+            "image": "images/etacons/pack_7/sprite_abcd1234.webp",
+            "cell": 160,
+            "columns": 10,
+            "rows": 3,
+            "items": {"~7_0": [0, 0], "~7_13": [3, 1], "~7_29": [9, 2]},
+        }
+
+        first = env["get_etacon_sprite_ref"](manifest, "~7_0")
+        middle = env["get_etacon_sprite_ref"](manifest, "~7_13")
+        last = env["get_etacon_sprite_ref"](manifest, "~7_29")
+
+        self.assertEqual(first["image"], manifest["image"])
+        self.assertEqual(first["background_size"], "1000% 300%")
+        self.assertEqual(first["background_position"], "0% 0%")
+        self.assertEqual(middle["background_position"], "33.3333% 50%")
+        self.assertEqual(last["background_position"], "100% 100%")
+        self.assertIsNone(env["get_etacon_sprite_ref"](manifest, "~7_99"))
+        self.assertIsNone(env["get_etacon_sprite_ref"](None, "~7_0"))
+
+    def test_single_row_etacon_sprite_and_pack_id_parsing(self):
+        env = load_functions(["get_etacon_sprite_ref", "parse_etacon_pack_id"])
+        manifest = {"image": "images/etacons/pack_2/sprite.webp", "columns": 1, "rows": 1, "items": {"~2_0": [0, 0]}}
+
+        self.assertEqual(env["get_etacon_sprite_ref"](manifest, "~2_0")["background_position"], "0% 0%")
+        self.assertEqual(env["parse_etacon_pack_id"]("~15_3"), 15)
+        self.assertIsNone(env["parse_etacon_pack_id"]("~abc_1"))
+        self.assertIsNone(env["parse_etacon_pack_id"](None))
+
+    def test_etacon_sprite_manifest_reloads_when_rebuilt_elsewhere(self):
+        import json
+        import os
+        import tempfile
+
+        class FakeCache:
+            def memoize(self, timeout=None):
+                def decorator(func):
+                    memo = {}
+
+                    @wraps(func)
+                    def wrapper(*args):
+                        if args not in memo:
+                            memo[args] = func(*args)
+                        return memo[args]
+                    return wrapper
+                return decorator
+
+        with tempfile.TemporaryDirectory() as tmp:
+            env = load_functions(
+                ["get_etacon_sprite_stamp", "load_etacon_sprite_manifest", "read_etacon_sprite_manifest"],
+                {
+                    "os": os,
+                    "json": json,
+                    "cache": FakeCache(),
+                    "ETACON_SPRITE_MANIFEST_NAME": "sprite.json",
+                    "get_etacon_pack_folder": lambda pack_id: os.path.join(tmp, f"pack_{pack_id}"),
+                },
+            )
+            self.assertEqual(env["get_etacon_sprite_stamp"](3), 0)
+            self.assertIsNone(env["load_etacon_sprite_manifest"](3))
+
+            os.makedirs(os.path.join(tmp, "pack_3"))
+            manifest_path = os.path.join(tmp, "pack_3", "sprite.json")
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"image": "sprite_old.webp"}, f)
+            os.utime(manifest_path, ns=(1_000_000_000, 1_000_000_000))
+            first_stamp = env["get_etacon_sprite_stamp"](3)
+            self.assertEqual(env["load_etacon_sprite_manifest"](3)["image"], "sprite_old.webp")
+
+            # 다른 프로세스(flask build-etacon-sprites)가 다시 만든 경우: 메모리 무효화 없이도 새 매니페스트를 읽어야 함
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump({"image": "sprite_new.webp"}, f)
+            os.utime(manifest_path, ns=(2_000_000_000, 2_000_000_000))
+
+            self.assertNotEqual(env["get_etacon_sprite_stamp"](3), first_stamp)
+            self.assertEqual(env["load_etacon_sprite_manifest"](3)["image"], "sprite_new.webp")
+
+    def test_my_etacons_etag_includes_sprite_stamps(self):
+        source = ast.get_source_segment(APP_SOURCE, next(
+            node for node in APP_TREE.body if isinstance(node, ast.FunctionDef) and node.name == "my_etacons"
+        ))
+        self.assertIn("get_etacon_sprite_stamp(", source)
+        self.assertIn("*sprite_stamps", source)
+
     def test_etacon_detail_images_use_async_decoding(self):
         self.assertGreaterEqual(TEMPLATE_SHOP.count('decoding="async"'), 2)
 
@@ -0,0 +1,318 @@
+import ast
+import bisect
+import contextlib
+import html
+import re
+import sqlite3
+import types
+import unittest
+from pathlib import Path
+
+
+APP_PATH = Path(__file__).resolve().parents[1] / "app.py"
+APP_SOURCE = APP_PATH.read_text(encoding="utf-8")
+APP_TREE = ast.parse(APP_SOURCE, filename=str(APP_PATH))
+
+
+def load_functions(function_names, extra_globals=None):
+    env = {"__builtins__": __builtins__}
+    if extra_globals:
+        env.update(extra_globals)
+
+    wanted = set(function_names)
+    for node in APP_TREE.body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in wanted:
+            module = ast.Module(body=[node], type_ignores=[])
+            ast.fix_missing_locations(module)
+            exec(compile(module, filename=str(APP_PATH), mode="exec"), env)
+    return env
+
+
+def get_top_level_value(name):
+    for node in APP_TREE.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id == name:
+                    return eval(compile(ast.Expression(node.value), str(APP_PATH), "eval"), {"re": re})
+    raise KeyError(name)
+
+
+class FakeMarkup(str):
+    def __add__(self, other):
+        return FakeMarkup(str(self) + str(other))
+
+
+SEARCH_FUNCTIONS = [
+    "html_to_search_text", "tokenize_search_text", "build_search_match_query",
+    "highlight_search_terms", "build_search_snippet", "init_post_search", "sync_post_search_index",
+]
+
+
+def load_search_env(conn=None):
+    env_globals = {
+        "re": re,
+        "html": html,
+        "Markup": FakeMarkup,
+        "get_db": lambda: conn,
+        "app": types.SimpleNamespace(app_context=contextlib.nullcontext),
+    }
+    for name in ("SEARCH_TOKEN_RE", "HTML_TAG_RE", "POST_SEARCH_SNIPPET_CHARS", "POST_SEARCH_SYNC_BATCH",
+                 "POST_SEARCH_TOKENIZER_VERSION"):
+        env_globals[name] = get_top_level_value(name)
+    return load_functions(SEARCH_FUNCTIONS, env_globals)
+
+
+class SearchTokenizerTests(unittest.TestCase):
+    def setUp(self):
+        self.env = load_search_env()
+
+    def test_hangul_is_split_into_bigrams_and_other_words_are_kept(self):
+        tokenize = self.env["tokenize_search_text"]
+
+        self.assertEqual(tokenize("시험은"), ["시험", "험은"])
+        self.assertEqual(tokenize("밥"), ["밥"])
+        self.assertEqual(tokenize("Python3 중간고사!"), ["python3", "중간", "간고", "고사"])
+        # 색인에는 한글 구간의 끝 음절도 들어감
+        self.assertEqual(tokenize("시험은 밥", index=True), ["시험", "험은", "은", "밥"])
+
+    def test_match_query_uses_phrases_and_strips_syntax(self):
+        build = self.env["build_search_match_query"]
+
+        self.assertEqual(build("중간고사 python"), '"중간 간고 고사" AND "python"')
+        self.assertEqual(build('밥 "OR" NEAR('), '"밥"* AND "or" AND "near"')
+        self.assertIsNone(build("!!! ..."))
+        # 검색어 중간에서 끝나는 한글 구간은 색인과 같은 끝 음절 토큰을 포함
+        self.assertEqual(build("수학a"), '"수학 학 a"')
+
+    def test_snippet_escapes_html_and_marks_terms(self):
+        snippet = self.env["build_search_snippet"]("가" * 100 + " <b>시험</b> 끝", "시험", width=40)
+
+        self.assertTrue(snippet.startswith("…"))
+        self.assertIn("&lt;b&gt;<mark>시험</mark>&lt;/b&gt;", snippet)
+        self.assertEqual(str(self.env["highlight_search_terms"]("Flask 팁", "flask")), "<mark>Flask</mark> 팁")
+
+
+class PostSearchIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT, content TEXT, view_count INTEGER DEFAULT 0)")
+        self.conn.execute("INSERT INTO posts (id, title, content) VALUES (1, '기존 글', '<p>시험을 망쳤다</p>')")
+        self.env = load_search_env(self.conn)
+        self.env["init_post_search"]()
+
+    def search(self, query):
+        match = self.env["build_search_match_query"](query)
+        return [row[0] for row in self.conn.execute(
+            "SELECT rowid FROM posts_search WHERE posts_search MATCH ? ORDER BY bm25(posts_search, 3.0, 1.0)", (match,)
+        )]
+
+    def test_existing_posts_are_backfilled_and_particles_match(self):
+        self.assertEqual(self.search("시험"), [1])
+        self.assertEqual(self.search("망쳤"), [1])
+        self.assertEqual(self.search("험망"), [])
+
+    def test_triggers_queue_writes_and_sync_applies_them(self):
+        self.conn.execute("INSERT INTO posts (id, title, content) VALUES (2, '시험 범위 정리', '<p>본문</p>')")
+        self.conn.execute("UPDATE posts SET title = '수정된 제목', content = '<p>급식 메뉴</p>' WHERE id = 1")
+        self.conn.execute("UPDATE posts SET view_count = view_count + 1 WHERE id = 2")
+        self.assertEqual(self.conn.execute("SELECT post_id FROM posts_search_pending ORDER BY post_id").fetchall(), [(1,), (2,)])
+
+        self.assertEqual(self.env["sync_post_search_index"](self.conn), 2)
+        self.assertEqual(self.search("시험"), [2])
+        self.assertEqual(self.search("급식"), [1])
+
+        self.conn.execute("DELETE FROM posts WHERE id = 2")
+        self.assertEqual(self.search("시험"), [])
+        self.assertEqual(self.env["sync_post_search_index"](self.conn), 0)
+
+    def test_single_syllable_matches_anywhere_in_a_word(self):
+        self.conn.execute("INSERT INTO posts (id, title, content) VALUES (2, '수학 시험', '<p>과학</p>')")
+        self.conn.execute("INSERT INTO posts (id, title, content) VALUES (3, '학교', '<p>수학a 문제</p>')")
+        self.env["sync_post_search_index"](self.conn)
+
+        self.assertEqual(sorted(self.search("학")), [2, 3])
+        self.assertEqual(sorted(self.search("험")), [1, 2])
+        self.assertEqual(self.search("수학a"), [3])
+        self.assertEqual(sorted(self.search("수학")), [2, 3])
+
+    def test_posts_are_reindexed_when_the_tokenizer_version_changes(self):
+        self.conn.execute("DELETE FROM posts_search")
+        self.conn.execute("UPDATE posts_search_meta SET value = 1")
+
+        self.env["init_post_search"]()
+
+        self.assertEqual(self.search("시험"), [1])
+        self.assertEqual(self.conn.execute("SELECT value FROM posts_search_meta").fetchone()[0], 2)
+
+    def test_title_hits_rank_above_body_hits(self):
+        self.conn.execute("INSERT INTO posts (id, title, content) VALUES (2, '잡담', '<p>오늘 시험 어땠어</p>')")
+        self.conn.execute("INSERT INTO posts (id, title, content) VALUES (3, '시험 후기', '<p>잡담</p>')")
+        self.env["sync_post_search_index"](self.conn)
+
+        self.assertEqual(self.search("시험")[0], 3)
+
+
+class SearchSourceMergeTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript("""
+            CREATE TABLE users (login_id TEXT PRIMARY KEY, nickname TEXT, status TEXT);
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT, content TEXT, author TEXT, guest_nickname TEXT,
+                                board_id INTEGER, updated_at TEXT, comment_count INTEGER DEFAULT 0, view_count INTEGER DEFAULT 0,
+                                target_grade INTEGER DEFAULT 0);
+            CREATE TABLE reactions (id INTEGER PRIMARY KEY, target_type TEXT, target_id INTEGER, reaction_type TEXT);
+            INSERT INTO users VALUES ('kim', '시험왕', 'active'), ('lee', '평범', 'active'), ('bad', '시험꾼', 'banned');
+            INSERT INTO posts (id, title, content, author, guest_nickname, board_id, updated_at) VALUES
+                (1, '시험 범위', '<p>내용</p>', 'lee', NULL, 1, '2026-01-01 00:00:00'),
+                (2, '잡담', '<p>아무말</p>', 'kim', NULL, 1, '2026-01-03 00:00:00'),
+                (3, '익명 잡담', '<p>아무말</p>', 'kim', NULL, 3, '2026-01-04 00:00:00'),
+                (4, '손님 글', '<p>아무말</p>', '__guest__', '시험손님', 1, '2026-01-02 00:00:00'),
+                (5, '시험 끝', '<p>내용</p>', 'kim', NULL, 1, '2026-01-05 00:00:00'),
+                (6, '시험 망함', '<p>내용</p>', 'bad', NULL, 1, '2026-01-06 00:00:00');
+            INSERT INTO reactions (target_type, target_id, reaction_type) VALUES
+                ('post', 2, 'like'), ('post', 2, 'like'), ('post', 2, 'dislike');
+        """)
+        env = load_search_env(self.conn)
+        env["init_post_search"]()
+        env.update({
+            "GUEST_USER_ID": "__guest__",
+            "POST_SEARCH_TITLE_WEIGHT": 3.0,
+            "POST_SEARCH_BODY_WEIGHT": 1.0,
+            "get_board": lambda board_id: {"board_name": f"board-{board_id}"},
+        })
+        for name in ("SEARCH_MAX_RESULTS", "SEARCH_MAX_AUTHORS", "ANONYMOUS_BOARD_ID", "SEARCH_VISIBLE_AUTHOR_FILTER"):
+            env[name] = get_top_level_value(name)
+        self.env = load_functions(
+            ["find_search_results", "filter_search_results", "load_search_result_posts", "get_user_grade",
+             "can_view_target_grade"],
+            env,
+        )
+
+    def find_ids(self, query, user=None):
+        results = self.env["find_search_results"](self.conn.cursor(), query)
+        return self.env["filter_search_results"](results, user)
+
+    def add_graded_posts(self):
+        self.conn.executescript("""
+            INSERT INTO posts (id, title, content, author, board_id, updated_at, target_grade) VALUES
+                (7, '30기 공지', '<p>비밀 시험 정보</p>', 'lee', 1, '2026-01-07 00:00:00', 30),
+                (8, '시험 대비 30기', '<p>내용</p>', 'lee', 1, '2026-01-08 00:00:00', 30);
+        """)
+        self.env["sync_post_search_index"](self.conn)
+
+    def test_graded_posts_match_body_only_for_viewers_who_can_open_them(self):
+        self.add_graded_posts()
+        outsider = {"login_id": "kim", "role": "user", "gen": "31"}
+        classmate = {"login_id": "park", "role": "user", "gen": "30"}
+        author = {"login_id": "lee", "role": "user", "gen": None}
+        admin = {"login_id": "root", "role": "admin", "gen": "0"}
+
+        # 다른 기수: 본문에만 있는 "비밀"로는 찾을 수 없고, 제목에 있는 "시험"으로는 제목만 걸림
+        self.assertEqual(self.find_ids("비밀", outsider), [])
+        self.assertIn(8, self.find_ids("시험", outsider))
+        self.assertNotIn(7, self.find_ids("시험", outsider))
+        for allowed in (classmate, author, admin):
+            self.assertEqual(self.find_ids("비밀", allowed), [7])
+
+    def test_one_cached_result_list_is_filtered_per_viewer(self):
+        self.add_graded_posts()
+        # search()는 정규화된 검색어만으로 캐시하므로, 한 번 찾은 목록을 여러 사용자가 공유
+        results = self.env["find_search_results"](self.conn.cursor(), "비밀")
+        filter_results = self.env["filter_search_results"]
+
+        self.assertEqual(filter_results(results, {"login_id": "park", "role": "user", "gen": "30"}), [7])
+        self.assertEqual(filter_results(results, {"login_id": "kim", "role": "user", "gen": "31"}), [])
+        self.assertEqual(filter_results(results, {"login_id": "root", "role": "admin", "gen": "1"}), [7])
+        self.assertEqual(results, self.env["find_search_results"](self.conn.cursor(), "비밀"))
+
+    def test_snippet_visibility_follows_post_detail_rule(self):
+        can_view = self.env["can_view_target_grade"]
+        outsider = {"login_id": "kim", "role": "user", "gen": "31"}
+
+        self.assertTrue(can_view(outsider, 0, "lee"))
+        self.assertTrue(can_view(None, None, "lee"))
+        self.assertFalse(can_view(None, 30, "lee"))
+        self.assertFalse(can_view(outsider, 30, "lee"))
+        self.assertFalse(can_view({"login_id": "kim", "role": "user", "gen": None}, 30, "lee"))
+        self.assertTrue(can_view({"login_id": "park", "role": "user", "gen": "30"}, 30, "lee"))
+        self.assertTrue(can_view({"login_id": "lee", "role": "user", "gen": "29"}, 30, "lee"))
+        self.assertTrue(can_view({"login_id": "root", "role": "admin", "gen": "1"}, 30, "lee"))
+
+        self.add_graded_posts()
+        posts = self.env["load_search_result_posts"](self.conn.cursor(), [7])
+        self.assertEqual(posts[0]["target_grade"], 30)
+
+    def test_sources_are_merged_fts_first_then_newest_author_hits(self):
+        ids = self.find_ids("시험")
+
+        # FTS: 5, 1 (정지 사용자 글 6 제외) / 닉네임: kim의 2 (익명 게시판 3 제외, 5는 중복) / 게스트: 4
+        self.assertCountEqual(ids[:2], [5, 1])
+        self.assertEqual(ids[2:], [2, 4])
+
+    def test_page_is_hydrated_in_id_order_without_joins_on_board(self):
+        posts = self.env["load_search_result_posts"](self.conn.cursor(), [4, 99, 2])
+
+        self.assertEqual([post["id"] for post in posts], [4, 2])
+        self.assertEqual(posts[1]["net_reactions"], 1)
+        self.assertEqual(posts[1]["board_name"], "board-1")
+
+
+class SearchSuggestTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.executescript("""
+            CREATE TABLE posts (id INTEGER PRIMARY KEY, title TEXT);
+            CREATE TABLE users (login_id TEXT PRIMARY KEY, nickname TEXT, status TEXT);
+            INSERT INTO posts VALUES (1, '기말고사 범위 정리'), (2, '기숙사 점호 시간'), (3, '2학기 기말고사 후기');
+            INSERT INTO users VALUES ('a', '기린', 'active'), ('b', '기차', 'banned'), ('__guest__', '기게스트', 'active');
+        """)
+        env_globals = {
+            "bisect": bisect,
+            "get_db": lambda: self.conn,
+            "GUEST_USER_ID": "__guest__",
+            "get_boards": lambda: [{"board_id": 7, "board_name": "기숙사 게시판"}, {"board_id": 8, "board_name": "자유"}],
+        }
+        for name in ("SEARCH_SUGGEST_LIMIT", "SEARCH_SUGGEST_SCAN_LIMIT", "SEARCH_SUGGEST_KEYS_PER_TITLE"):
+            env_globals[name] = get_top_level_value(name)
+        self.env = load_functions(
+            ["PrefixIndex", "normalize_search_query", "get_suggestion_keys", "build_search_suggest_index",
+             "add_post_suggestion", "remove_post_suggestion", "add_nickname_suggestion", "remove_nickname_suggestion",
+             "get_search_suggestions"],
+            env_globals,
+        )
+        index = self.env["PrefixIndex"]
+        self.env["search_suggest_index"] = {"titles": index(), "nicknames": index(), "post_titles": {}}
+        self.env["build_search_suggest_index"]()
+
+    def test_prefix_matches_titles_from_any_leading_word_newest_first(self):
+        suggestions = self.env["get_search_suggestions"]("기말")
+
+        self.assertEqual([item["id"] for item in suggestions["titles"]], [3, 1])
+        self.assertEqual(suggestions["nicknames"], [])
+        self.assertEqual(self.env["get_search_suggestions"]("  ")["titles"], [])
+
+    def test_boards_and_active_nicknames_are_suggested(self):
+        suggestions = self.env["get_search_suggestions"]("기")
+
+        self.assertEqual(suggestions["boards"], [{"id": 7, "name": "기숙사 게시판"}])
+        self.assertEqual(suggestions["nicknames"], ["기린"])
+
+    def test_incremental_updates_follow_edits_deletes_and_signups(self):
+        add_post, remove_post = self.env["add_post_suggestion"], self.env["remove_post_suggestion"]
+
+        add_post(2, "점호 폐지 건의")
+        add_post(4, "기말 대비 스터디")
+        remove_post(1)
+        self.env["add_nickname_suggestion"]("기러기")
+        self.env["remove_nickname_suggestion"]("기린")
+
+        suggestions = self.env["get_search_suggestions"]("기")
+        self.assertEqual([item["title"] for item in suggestions["titles"]], ["기말 대비 스터디", "2학기 기말고사 후기"])
+        self.assertEqual(suggestions["nicknames"], ["기러기"])
+        self.assertEqual([item["id"] for item in self.env["get_search_suggestions"]("점호")["titles"]], [2])
+        self.assertEqual(len(self.env["search_suggest_index"]["titles"]), 3 + 3 + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()